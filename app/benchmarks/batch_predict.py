@@ -0,0 +1,55 @@
+"""Throughput of batch scoring: chunked CSV read, encoding, prediction and CSV output.
+
+Run from the app directory:
+    python -m benchmarks.batch_predict [--rows 2000000] [--chunk-rows 100000]
+A model is trained on a synthetic table, then a scoring file of --rows rows is streamed through it.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from sklearn.tree import DecisionTreeClassifier
+
+from benchmarks.csv_engines import generate_csv
+from services.CsvReader import read_csv_chunks
+from services.DataPreprocessor import DataPreprocessor
+from services.ModelPipeline import ModelPipeline
+
+
+def train_pipeline(path):
+    data = DataPreprocessor(read_csv_chunks(path, 50_000).get_chunk())
+    X, y, feature_names = data.prepare_data("label")
+    model = DecisionTreeClassifier(random_state=0, max_depth=8).fit(X.to_numpy(), y)
+    return ModelPipeline(model, data.numeric_columns, data.categories, feature_names,
+                         data.label_encoder.classes_.tolist(), "label")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "score.csv")
+        # generated in a child process, so the peak RSS below is the scoring's own
+        generator = multiprocessing.Process(target=generate_csv, args=(path, args.rows))
+        generator.start()
+        generator.join()
+        pipeline = train_pipeline(path)
+
+        started = time.perf_counter()
+        chunks = read_csv_chunks(path, args.chunk_rows, dtypes=pipeline.input_dtypes, usecols=pipeline.csv_columns)
+        n_bytes = sum(len(piece) for piece in pipeline.predict_csv(chunks))
+        seconds = time.perf_counter() - started
+
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.rows} rows in {seconds:.2f}s: {args.rows / seconds:,.0f} rows/s, "
+          f"{n_bytes / 2 ** 20:.1f} MiB of predictions, peak RSS {peak_mib:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare CSV parse engines on the same file.
+
+Run from the app directory:
+    python -m benchmarks.csv_engines [path.csv] [--rows 2000000] [--repeat 3]
+Without a path a synthetic file with numeric and categorical columns is generated.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from services.CsvReader import read_csv
+from services.SchemaProbe import SchemaProbe
+
+
+def generate_csv(path, rows):
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "age": rng.integers(15, 75, rows),
+        "ratio": rng.random(rows).round(4),
+        "sex": rng.choice(["F", "M"], rows),
+        "bp": rng.choice(["HIGH", "LOW", "NORMAL"], rows),
+        "city": rng.choice([f"city_{i}" for i in range(200)], rows),
+        "score": rng.normal(size=rows).round(3),
+        "label": rng.choice(["drugA", "drugB", "drugX", "drugY"], rows),
+    }).to_csv(path, index=False)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmpdir, "bench.csv")
+            generate_csv(path, args.rows)
+
+        hints = SchemaProbe(path).dtype_hints()
+        reference = pd.read_csv(path)
+
+        cases = {
+            "c (current)": lambda: read_csv(path, engine="c"),
+            "pyarrow": lambda: read_csv(path, engine="pyarrow"),
+            "pyarrow + probe dtypes": lambda: read_csv(path, engine="pyarrow", dtypes=hints),
+        }
+
+        print(f"{os.path.getsize(path) / 2 ** 20:.1f} MiB, {len(reference)} rows, {pa.cpu_count()} arrow threads")
+        baseline = None
+        for name, func in cases.items():
+            frame = func()
+            pd.testing.assert_frame_equal(frame.astype(object).where(frame.notna(), None),
+                                          reference.astype(object).where(reference.notna(), None))
+            seconds = best_of(args.repeat, func)
+            baseline = baseline or seconds
+            print(f"{name:<24} {seconds:8.3f}s  x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""DOT generation time of PrintGraph against the recursive generator it replaced, on trees with thousands of nodes.
+
+Run from the app directory:
+    python -m benchmarks.print_graph [--rows 30000] [--categories 200]
+tests/test_print_graph.py checks that both generators write the same DOT source.
+"""
+import argparse
+import sys
+
+from sklearn.tree import DecisionTreeClassifier
+
+from benchmarks.csv_engines import best_of
+from benchmarks.recursive_print_graph import RecursivePrintGraph, one_hot_table
+from services.PrintGraph import PrintGraph
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=30_000)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    X, y = one_hot_table(args.rows, args.categories)
+    feature_names = X.columns.tolist()
+    class_names = sorted(set(y))
+    # the recursive generator needs a frame per tree level
+    sys.setrecursionlimit(100_000)
+
+    print(f"{'max_depth':>9} {'nodes':>7} {'depth':>5} {'recursive':>11} {'iterative':>11}")
+    for max_depth in (8, 14, 20, None):
+        clf = DecisionTreeClassifier(random_state=0, max_depth=max_depth).fit(X.to_numpy(), y)
+        iterative = PrintGraph(clf, feature_names, class_names)
+        recursive = RecursivePrintGraph(clf, feature_names, class_names)
+
+        new = best_of(args.repeat, iterative.to_dot)
+        old = best_of(args.repeat, recursive.to_dot)
+        print(f"{str(max_depth):>9} {clf.tree_.node_count:>7} {clf.tree_.max_depth:>5} "
+              f"{old * 1e3:>8.1f} ms {new * 1e3:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""The recursive DOT generator PrintGraph replaced, kept as the reference its output is compared against.
+
+benchmarks/print_graph.py times both generators, tests/test_print_graph.py checks they write the same DOT source.
+"""
+import numpy as np
+import pandas as pd
+
+from services.PrintGraph import PrintGraph
+
+
+class RecursivePrintGraph(PrintGraph):
+    """The previous generator: string concatenation and two deep copies of the category sets per split."""
+
+    def _recurse(self, node, parent=None, parent_label=None, allowed_categories_map=None):
+        if allowed_categories_map is None:
+            allowed_categories_map = {b: cats.copy() for b, cats in self.base_categories.items()}
+
+        if self.clf.tree_.feature[node] != -2:
+            feat = self.feature_names[self.clf.tree_.feature[node]]
+            base, category = self._split_feature(feat)
+            threshold = self.clf.tree_.threshold[node]
+            left = self.clf.tree_.children_left[node]
+            right = self.clf.tree_.children_right[node]
+
+            self.dot_str += f'"{node}" [label="{base}\n≤ {threshold:.2f}"];\n'
+            if parent is not None:
+                self.dot_str += f'"{parent}" -> "{node}" [label="{parent_label}"];\n'
+
+            if category and abs(threshold - 0.5) < 1e-5:
+                allowed_left = {k: v.copy() for k, v in allowed_categories_map.items()}
+                allowed_right = {k: v.copy() for k, v in allowed_categories_map.items()}
+
+                allowed_left[base].discard(category)
+                allowed_right[base] = {category}
+
+                cats = sorted(allowed_left[base])
+                if len(cats) == 0:
+                    left_label = f"{base} ≠ {category}"
+                elif len(cats) == 1:
+                    left_label = f"{cats[0]}"
+                else:
+                    left_label = f"{base} in {{{', '.join(cats)}}}"
+                right_label = f"{category}"
+
+                self._recurse(left, node, left_label, allowed_left)
+                self._recurse(right, node, right_label, allowed_right)
+            else:
+                left_label = f"≤ {threshold:.2f}"
+                right_label = f"> {threshold:.2f}"
+                self._recurse(left, node, left_label, allowed_categories_map)
+                self._recurse(right, node, right_label, allowed_categories_map)
+        else:
+            value = self.clf.tree_.value[node]
+            class_index = int(value.argmax())
+            label = self.class_names[class_index]
+            self.dot_str += f'"{node}" [label="{label}", style=filled, fillcolor="lightgreen"];\n'
+            if parent is not None:
+                self.dot_str += f'"{parent}" -> "{node}" [label="{parent_label}"];\n'
+
+    def to_dot(self):
+        self.dot_str = 'digraph Tree {\n'
+        self.dot_str += 'node [shape=box, style="rounded, filled", color="lightblue", fontname="helvetica"];\n'
+        self._recurse(0)
+        self.dot_str += '}'
+        return self.dot_str
+
+
+def one_hot_table(rows, n_categories, seed=0):
+    rng = np.random.default_rng(seed)
+    raw = pd.DataFrame({
+        "age": rng.integers(15, 75, rows),
+        "score": rng.normal(size=rows).round(3),
+        "city": rng.choice([f"c{i}" for i in range(n_categories)], rows),
+        "shop": rng.choice([f"s{i}" for i in range(n_categories // 2)], rows),
+        "sex": rng.choice(["F", "M"], rows),
+    })
+    labels = rng.choice(["drugA", "drugB", "drugX", "drugY"], rows)
+    X = pd.get_dummies(raw, columns=["city", "shop", "sex"], dtype=np.float32)
+    return X, labels
@@ -0,0 +1,73 @@
+"""Latency of the compiled tree against the model's own predict, for single rows and small batches.
+
+Run from the app directory:
+    python -m benchmarks.tree_inference [--train-rows 50000] [--max-depth 12]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+from benchmarks.csv_engines import generate_csv
+from services.CsvReader import read_csv_chunks
+from services.DataPreprocessor import DataPreprocessor
+from services.ModelPipeline import ModelPipeline
+from services.TreeCompiler import CompiledTree
+
+
+def per_call(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--train-rows", type=int, default=50_000)
+    parser.add_argument("--max-depth", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "train.csv")
+        generate_csv(path, args.train_rows)
+        frame = read_csv_chunks(path, args.train_rows).get_chunk()
+
+    data = DataPreprocessor(frame)
+    X, y, feature_names = data.prepare_data("label")
+    model = DecisionTreeClassifier(random_state=0, max_depth=args.max_depth).fit(X.to_numpy(), y)
+    pipeline = ModelPipeline(model, data.numeric_columns, data.categories, feature_names,
+                             data.label_encoder.classes_.tolist(), "label")
+
+    started = time.perf_counter()
+    compiled = CompiledTree(pipeline)
+    print(f"{model.tree_.node_count} nodes, depth {model.tree_.max_depth}, "
+          f"compiled in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    raw = frame[pipeline.input_columns]
+    rows = raw.to_dict("records")
+    assert [compiled.predict_row(row) for row in rows] == pipeline.predict(raw)
+    assert compiled.predict(raw) == pipeline.predict(raw)
+
+    features = pipeline.transform(raw.iloc[:1])
+    print(f"{'rows':>8} {'model.predict':>15} {'pipeline':>12} {'compiled':>12} {'row by row':>12}")
+    single = per_call(lambda: model.predict(features), 2000)
+    print(f"{1:>8} {single * 1e6:>12.1f} us {per_call(lambda: pipeline.predict(raw.iloc[:1]), 500) * 1e6:>9.1f} us "
+          f"{per_call(lambda: compiled.predict_row(rows[0]), 20000) * 1e6:>9.1f} us")
+    for n in (10, 100, 1000, 10_000):
+        batch = raw.iloc[:n]
+        features = pipeline.transform(batch)
+        repeat = max(10, 20_000 // n)
+        print(f"{n:>8} {per_call(lambda: model.predict(features), repeat) * 1e6:>12.1f} us "
+              f"{per_call(lambda: pipeline.predict(batch), repeat) * 1e6:>9.1f} us "
+              f"{per_call(lambda: compiled.predict(batch), repeat) * 1e6:>9.1f} us "
+              f"{per_call(lambda: [compiled.predict_row(row) for row in rows[:n]], repeat) * 1e6:>9.1f} us")
+    print("model.predict is timed on already encoded features, pipeline and compiled start from raw rows")
+    np.testing.assert_array_equal(compiled.predict_codes(raw), pipeline.predict_codes(raw))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,14 @@ from celery import Celery
 from database import Base, db
 from dotenv import load_dotenv
 
-from models import Blacklisted_tokens_model, file_model, refresh_token_model, temp_file_model, user_model, user_action
+from models import Blacklisted_tokens_model, dataset_model, file_model, refresh_token_model, temp_file_model, trained_model, user_model, user_action
 Base.metadata.create_all(bind=db)
 
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL")
+# task progress is read by the websocket while the task runs, then only kept for a late reader
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", str(24 * 3600)))
 
 celery_app = Celery(
     "task",
@@ -1,146 +1,202 @@
-import base64
 import json
 import os
-import shutil
-import tempfile
-from datetime import datetime, timezone, timedelta
-from time import sleep
+from time import perf_counter, sleep
 
-from celery_app.config import celery_app, r
+from celery.utils.log import get_task_logger
+from celery_app.config import celery_app, r, PROGRESS_TTL_SECONDS
 
 import pandas as pd
 from database import SessionLocal
 from matplotlib.pyplot import close
-from models.file_model import UserFile
 from models.temp_file_model import TempFile
-from services.DataPreprocessor import DataPreprocessor
+from services.ChunkedPreprocessor import ChunkedPreprocessor, use_out_of_core
+from services.DataPreprocessor import APPROXIMATE_PROFILE_MIN_ROWS, DataPreprocessor
+from services.DatasetArtifact import load_dataset
+from services.DatasetStore import save_user_file, remove_files, dataset_dtypes
+from services.FeatureSelection import SelectionType
+from services.GraphStore import GraphStore
+from services.ModelPipeline import ModelPipeline
+from services.ModelStore import cached_analysis, save_model
 from services.ModelTrainer import ModelTrainer
+from services.ParameterSearch import parse_search_type
 from services.PrintGraph import PrintGraph
+from services.ResultCache import ResultCache, analysis_key
 from services.send_action import send_action
 
-@celery_app.task(bind=True)
-def analyse_data(self,file_id: int, tmp_path: str, target_column: str, save_file: bool, user_id: int,original_filename: str, type_search: bool, db=None):
-    # sleep(10)
-    r.set(f"task:{self.request.id}:progress",
-          json.dumps({'progress': 0, 'detail': 'starting'}))
+logger = get_task_logger(__name__)
+result_cache = ResultCache(r)
+graph_store = GraphStore(r)
 
-    if db is None:
-        db = SessionLocal()
-    try:
-        r.set(f"task:{self.request.id}:progress",
-              json.dumps({'progress': 5, 'detail': 'read csv file'}))
+
+def stopped_early(search_report):
+    # a search cut short by its time budget scores a different set of candidates under another load
+    return any(report["stopped_early"] for report in search_report.values())
+
+def run_analysis(task_id, tmp_path, artifact_path, target_column, type_search, dtypes=None,
+                 feature_selection=SelectionType.BACKWARD, db=None, cache_key=None, user_id=None):
+    if use_out_of_core(tmp_path):
+        r.set(f"task:{task_id}:progress",
+              json.dumps({'progress': 10, 'detail': 'data pre-processing'}), ex=PROGRESS_TTL_SECONDS)
+        # the encoded matrix is memory-mapped next to the stored dataset
+        data_prepare = ChunkedPreprocessor(tmp_path, artifact_path, work_dir=os.path.dirname(tmp_path),
+                                           dtypes=dtypes)
+
+        if target_column not in data_prepare.columns:
+            raise ValueError("Selected column not found in dataset")
+    else:
         try:
-            pd_data = pd.read_csv(tmp_path)
+            pd_data = load_dataset(tmp_path, artifact_path, dtypes=dtypes)
         except Exception as e:
             raise RuntimeError(f"Failed to read CSV file: {str(e)}")
 
         if target_column not in pd_data.columns:
             raise ValueError("Selected column not found in dataset")
 
-        r.set(f"task:{self.request.id}:progress",
-              json.dumps({'progress': 10, 'detail': 'data pre-processing'}))
-        data_prepare = DataPreprocessor(pd_data)
-
-
-        try:
-            X, y, final_data = data_prepare.prepare_data(target_column)
-        except pd.errors.ParserError:
-            raise Exception("Invalid CSV format.")
-        except ValueError as e:
-            raise ValueError(f"{str(e)}")
+        r.set(f"task:{task_id}:progress",
+              json.dumps({'progress': 10, 'detail': 'data pre-processing'}), ex=PROGRESS_TTL_SECONDS)
+        data_prepare = DataPreprocessor(pd_data, approximate_profile=len(pd_data) >= APPROXIMATE_PROFILE_MIN_ROWS)
 
-        r.set(f"task:{self.request.id}:progress",
-              json.dumps({'progress': 20, 'detail': 'Training model'}))
 
-        analyze_data = ModelTrainer(X, y, checked=type_search)
-        full_metrics = analyze_data.train_model()
+    try:
+        X, y, feature_names = data_prepare.prepare_data(target_column)
+    except pd.errors.ParserError:
+        raise Exception("Invalid CSV format.")
+    except ValueError as e:
+        raise ValueError(f"{str(e)}")
+
+    r.set(f"task:{task_id}:progress",
+          json.dumps({'progress': 20, 'detail': 'Training model'}), ex=PROGRESS_TTL_SECONDS)
+
+    analyze_data = ModelTrainer(X, y, search_type=type_search, feature_names=feature_names,
+                                selection_type=feature_selection)
+    timings = {}
+    started = perf_counter()
+    full_metrics = analyze_data.train_model()
+    timings["search"] = perf_counter() - started
+
+    r.set(f"task:{task_id}:progress",
+          json.dumps({'progress': 40, 'detail': 'Evaluating selected columns'}), ex=PROGRESS_TTL_SECONDS)
+
+    started = perf_counter()
+    selected_columns = analyze_data.find_best_attributes()
+    timings["feature_selection"] = perf_counter() - started
+
+    started = perf_counter()
+    selected_metrics = analyze_data.train_model(selected_columns)
+    timings["retrain"] = perf_counter() - started
+
+    graph = PrintGraph(
+        analyze_data.model,
+        feature_names=analyze_data.used_features,
+        class_names=data_prepare.label_encoder.inverse_transform(range(len(data_prepare.label_encoder.classes_))),
+        all_feature_names=feature_names
+    )
+    # the image is rendered after the result is published, or when the graph endpoint first asks for it
+    graph_key = graph_store.add(graph.to_dot())
+
+    pipeline = ModelPipeline(
+        analyze_data.model,
+        numeric_columns=data_prepare.numeric_columns,
+        categories=data_prepare.categories,
+        used_features=analyze_data.used_features,
+        classes=data_prepare.label_encoder.classes_.tolist(),
+        target_column=target_column,
+        bool_columns=data_prepare.bool_columns,
+    )
+    search_report = dict(zip(["full_model", "selected_columns"], analyze_data.search_reports))
+    if stopped_early(search_report):
+        # the model is not the one this analysis gives under no time pressure, it is not kept under its key
+        cache_key = None
+    model_id = save_model(db, pipeline, user_id, cache_key).id if db is not None else None
+
+    return {
+        "model_id": model_id,
+        "graph_id": graph_key,
+        "full_model_metrics": {k: f"{v:.3f}" for k, v in full_metrics.items()},
+        "selected_columns_metrics": {k: f"{v:.3f}" for k, v in selected_metrics.items()},
+        "best_columns_sorted": analyze_data.sort_best_column(),
+        "memory_report": data_prepare.memory_report,
+        "feature_selection": analyze_data.selection_type.value,
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "search_report": search_report,
+        "search_sample": analyze_data.sample_report,
+        "tree_engine": analyze_data.engine.value,
+    }
 
-        r.set(f"task:{self.request.id}:progress",
-              json.dumps({'progress': 40, 'detail': 'Evaluating selected columns'}))
 
-        selected_columns = analyze_data.find_best_attributes()
-        selected_metrics = analyze_data.train_model(selected_columns)
+@celery_app.task(bind=True)
+def analyse_data(self,file_id: int, tmp_path: str, target_column: str, save_file: bool, user_id: int,original_filename: str, type_search: str,
+                 feature_selection: str = SelectionType.BACKWARD.value, db=None):
+    # sleep(10)
+    r.set(f"task:{self.request.id}:progress",
+          json.dumps({'progress': 0, 'detail': 'starting'}), ex=PROGRESS_TTL_SECONDS)
 
+    if db is None:
+        db = SessionLocal()
+    try:
         r.set(f"task:{self.request.id}:progress",
-              json.dumps({'progress': 70, 'detail': 'Generating graph'}))
-
-        graph = PrintGraph(
-            analyze_data.model,
-            feature_names=analyze_data.used_features,
-            class_names=data_prepare.label_encoder.inverse_transform(range(len(data_prepare.label_encoder.classes_))),
-            all_feature_names=final_data.drop(columns=target_column).columns
-        )
-        with tempfile.TemporaryDirectory() as tmpdir:
-            output_path = os.path.join(tmpdir, "tree")
-            graph.save(output_path, format_file="png")
-
-            final_path = output_path + ".png"
-            if not os.path.exists(final_path):
-                raise ValueError("Graph image not created")
-
-            with open(final_path, "rb") as f:
-                img_bytes = f.read()
-            img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-
+              json.dumps({'progress': 5, 'detail': 'read csv file'}), ex=PROGRESS_TTL_SECONDS)
+        temp_file = db.query(TempFile).filter(TempFile.id == file_id).first()
+        artifact_path = temp_file.artifact_path if temp_file else None
+        type_search = parse_search_type(type_search).value
+        feature_selection = SelectionType(feature_selection).value
+        cache_key = analysis_key(temp_file, target_column=target_column, type_search=type_search,
+                                 feature_selection=feature_selection)
+        result = cached_analysis(db, result_cache, graph_store, cache_key, user_id)
+        if result is None:
+            dtypes = dataset_dtypes(temp_file.dataset) if temp_file else None
+            result = run_analysis(self.request.id, tmp_path, artifact_path, target_column, type_search, dtypes,
+                                  feature_selection, db, cache_key, user_id)
+            if cache_key and not stopped_early(result["search_report"]):
+                result_cache.set(cache_key, result)
 
         if save_file:
             r.set(f"task:{self.request.id}:progress",
-                  json.dumps({'progress': 90, 'detail': 'Save file to database'}))
-
-            storage_dir = os.path.join(os.getenv("STORAGE_DIR"), str(user_id))
-            os.makedirs(storage_dir, exist_ok=True)
-            dest_path = os.path.join(storage_dir, original_filename)
-
-            shutil.move(tmp_path, dest_path)
-
-            new_file = UserFile(
-                user_id=user_id,
-                filename=original_filename,
-                storage_path=os.path.join(f"{user_id}", original_filename),
-                size_bytes=os.path.getsize(dest_path),
-                expires_at = datetime.now(timezone.utc) + timedelta(days=30)
-            )
-            db.add(new_file)
-            db.commit()
-        else:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-
-        result = {
-                "image_base64": img_b64,
-                "full_model_metrics": {k: f"{v:.3f}" for k, v in full_metrics.items()},
-                "selected_columns_metrics": {k: f"{v:.3f}" for k, v in selected_metrics.items()},
-                "best_columns_sorted": analyze_data.sort_best_column()
-            }
+                  json.dumps({'progress': 90, 'detail': 'Save file to database'}), ex=PROGRESS_TTL_SECONDS)
+
+            if temp_file is None or temp_file.dataset is None:
+                raise ValueError("Uploaded CSV not found")
+            save_user_file(db, temp_file, user_id, original_filename)
 
         r.set(f"task:{self.request.id}:progress",
-              json.dumps({'progress': 100, 'detail': 'Analysis complete', "result": result}))
-        return result
+              json.dumps({'progress': 100, 'detail': 'Analysis complete', "result": result}), ex=PROGRESS_TTL_SECONDS)
     except Exception as e:
         r.set(f"task:{self.request.id}:progress",
-              json.dumps({'progress': -1, 'detail': str(e), 'status': 'failed'}))
+              json.dumps({'progress': -1, 'detail': str(e), 'status': 'failed'}), ex=PROGRESS_TTL_SECONDS)
         raise
     finally:
         try:
             file = db.query(TempFile).filter(TempFile.id == file_id).first()
             if file:
                 try:
-                    if getattr(file, "tmp_path", None) and os.path.exists(file.tmp_path):
-                        os.remove(file.tmp_path)
+                    # stored datasets are shared between uploads, the cleanup service removes unused ones
+                    if file.dataset_id is None:
+                        remove_files(file.tmp_path, file.artifact_path)
                 except Exception as cleanup_error:
                     r.set(f"task:{self.request.id}:progress",
-                          json.dumps({'progress': -1, 'detail': f'Cleanup error: {cleanup_error}', 'status': 'failed'}))
+                          json.dumps({'progress': -1, 'detail': f'Cleanup error: {cleanup_error}', 'status': 'failed'}), ex=PROGRESS_TTL_SECONDS)
                 try:
                     db.delete(file)
                     db.commit()
                 except Exception as db_error:
                     db.rollback()
                     r.set(f"task:{self.request.id}:progress",
-                          json.dumps({'progress': -1, 'detail': f'Cleanup error: {db_error}', 'status': 'failed'}))
+                          json.dumps({'progress': -1, 'detail': f'Cleanup error: {db_error}', 'status': 'failed'}), ex=PROGRESS_TTL_SECONDS)
 
         except Exception:
             pass
         finally:
             db.close()
 
+    try:
+        render_graph.delay(result["graph_id"])
+    except Exception:
+        # the analysis is already published, the graph endpoint renders the image on its first request
+        logger.exception("Could not queue rendering of graph %s", result["graph_id"])
+    return result
+
 
+@celery_app.task
+def render_graph(graph_id: str, format_file: str = None):
+    # warms the graph cache, so the first view of a new tree does not wait for dot
+    graph_store.image(graph_id, format_file)
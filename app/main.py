@@ -1,17 +1,32 @@
-from fastapi import FastAPI
-from routers import auth, user, file, ws
-from models import Blacklisted_tokens_model, file_model, refresh_token_model, temp_file_model, user_model, user_action
+import os
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from routers import auth, user, file, graph, model, ws
+from models import Blacklisted_tokens_model, dataset_model, file_model, refresh_token_model, temp_file_model, trained_model, user_model, user_action
 from dotenv import load_dotenv
 load_dotenv()
 from database import Base, db
+from utils.upload import content_length_exceeded, max_upload_size
 
 Base.metadata.create_all(bind=db)
 
 app = FastAPI()
 
+@app.middleware("http")
+async def reject_large_uploads(request: Request, call_next):
+    is_upload = request.url.path.startswith("/file/upload-csv") or request.url.path.endswith("/predict-csv")
+    if is_upload and os.getenv("MAX_UPLOAD_SIZE"):
+        if content_length_exceeded(request.headers.get("content-length"), max_upload_size()):
+            return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                content={"detail": "File too large"})
+    return await call_next(request)
+
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(user.router, prefix="/user", tags=["User"])
 app.include_router(file.router, prefix="/file", tags=["Files"])
+app.include_router(model.router, prefix="/model", tags=["Models"])
+app.include_router(graph.router, prefix="/graph", tags=["Graphs"])
 app.include_router(ws.router, tags=["WebSocket"])
 
 @app.get("/")
@@ -0,0 +1,17 @@
+from database import Base
+from sqlalchemy import Column, Integer, String, DateTime, func, BIGINT, Text
+
+
+class Dataset(Base):
+    __tablename__ = "datasets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)
+    storage_path = Column(String, nullable=False)
+    artifact_path = Column(String, nullable=True)
+    size_bytes = Column(BIGINT)
+    columns = Column(Text, nullable=True)
+    dtypes = Column(Text, nullable=True)
+    validation_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -8,8 +8,11 @@ class TempFile(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id", ondelete="SET NULL"), nullable=True)
     tmp_path = Column(String, nullable=False)
     original_filename = Column(String, nullable=False)
+    artifact_path = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    dataset = relationship("Dataset")
     user = relationship("User", back_populates="temp_files")
\ No newline at end of file
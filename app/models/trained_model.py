@@ -0,0 +1,15 @@
+from database import Base
+from sqlalchemy import Column, Integer, String, DateTime, func, Text, ForeignKey
+
+
+class TrainedModel(Base):
+    __tablename__ = "trained_models"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True, nullable=True)
+    analysis_key = Column(String(64), index=True, nullable=True)
+    storage_path = Column(String, nullable=False)
+    target_column = Column(String, nullable=False)
+    input_columns = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
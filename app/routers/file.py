@@ -1,4 +1,5 @@
 from datetime import timezone, datetime, timedelta
+import json
 import os
 import shutil
 import uuid
@@ -10,28 +11,33 @@ from services.ModelTrainer import ModelTrainer
 from services.PrintGraph import PrintGraph
 from database import SessionLocal, get_db
 from dependencies import get_current_user
-from fastapi import UploadFile, File, status
+from fastapi import Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from models.file_model import UserFile
 
 from fastapi.params import Depends
 from fastapi.responses import JSONResponse
 import pandas as pd
-import io
-from services.DataPreprocessor import DataPreprocessor
+from services.DatasetStore import store_dataset, dataset_dir, dataset_columns, storage_path, save_user_file
+from services.ModelStore import cached_analysis
+from services.ResultCache import analysis_key
 from fastapi import APIRouter
 from models.temp_file_model import TempFile
 from models.user_model import User
 from schemas.file_schema import ReturnFile
 from schemas.user_schama import TargetColumnRequest
-from celery_app.tasks import analyse_data
-import tempfile
+from celery_app.config import r, PROGRESS_TTL_SECONDS
+from celery_app.tasks import analyse_data, result_cache, graph_store
 from fastapi import BackgroundTasks
 import base64
 
 from services.send_action import send_action
+from utils.upload import spool_upload, max_upload_size, UploadTooLargeError
 from starlette.responses import FileResponse
 
 router = APIRouter()
+
 @router.post("/upload-csv/show_column",
              summary="Insert csv file to select decision column",
              description="""
@@ -62,22 +68,35 @@ router = APIRouter()
                        }
                        }
 
-             })
-async def upload_csv(file: UploadFile = File(...),
+             },
+             # the file field is read from the request stream, so it is described here instead of by a File parameter
+             openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+                 "type": "object",
+                 "required": ["file"],
+                 "properties": {"file": {"type": "string", "format": "binary"}},
+             }}}}})
+async def upload_csv(request: Request,
                      user: User = Depends(get_current_user),
                      db: SessionLocal = Depends(get_db)):
-    if file.content_type != "text/csv":
-        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "The file must be in CSV format."})
-
+    # the body is streamed straight to disk instead of being parsed into a form first
     try:
-        data = await file.read()
+        upload = await spool_upload(request, "file", max_upload_size(), directory=dataset_dir())
+    except UploadTooLargeError:
+        return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            content={"detail": "File too large"})
+    except Exception:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Not Found error"})
 
-        if len(data) > int(os.getenv("MAX_UPLOAD_SIZE")):
-            return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                                content={"detail": "File too large"})
+    if upload is None:
+        raise RequestValidationError([{"type": "missing", "loc": ("body", "file"), "msg": "Field required",
+                                       "input": None}])
+    if upload.content_type != "text/csv":
+        os.remove(upload.path)
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "The file must be in CSV format."})
 
-        data_decoded = data.decode('utf-8')
-        pd_data = pd.read_csv(io.StringIO(data_decoded))
+    # probing, the artifact write and the database work block, the event loop keeps serving other requests
+    try:
+        dataset = await run_in_threadpool(store_dataset, db, upload.path, upload.content_hash, upload.size)
     except pandas.errors.EmptyDataError:
         return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Uploaded file is empty"})
     except pd.errors.ParserError:
@@ -85,26 +104,23 @@ async def upload_csv(file: UploadFile = File(...),
     except Exception:
         return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Not Found error"})
 
-    unique_filename = f"{user.id}_{uuid.uuid4().hex}_{file.filename}"
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False, encoding="utf-8") as tmp_file:
-        tmp_file.write(data_decoded)
-        tmp_path = tmp_file.name
+    if dataset.validation_error:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": dataset.validation_error})
+
+    unique_filename = f"{user.id}_{uuid.uuid4().hex}_{upload.filename}"
 
     temp_file = TempFile(
         user_id = user.id,
-        tmp_path = tmp_path,
-        original_filename = unique_filename
+        dataset_id = dataset.id,
+        tmp_path = storage_path(dataset.storage_path),
+        original_filename = unique_filename,
+        artifact_path = storage_path(dataset.artifact_path) if dataset.artifact_path else None
     )
     db.add(temp_file)
     db.commit()
     db.refresh(temp_file)
 
-    try:
-        data_prepare = DataPreprocessor(pd_data)
-    except ValueError as error:
-        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(error)})
-
-    return JSONResponse(status_code=status.HTTP_200_OK, content={"columns": data_prepare.show_file_columns(), "file_id": temp_file.id})
+    return JSONResponse(status_code=status.HTTP_200_OK, content={"columns": dataset_columns(dataset), "file_id": temp_file.id})
 
 
 @router.post("/start-analysis", summary="add the decision tree generation task to the queue",
@@ -114,7 +130,8 @@ async def upload_csv(file: UploadFile = File(...),
              responses={
                  404: {"description": "Uploaded CSV not found"},
                  500: {"description": "internal microservice error"},
-                 200: {"description": "the user's task ID was returned"}
+                 200: {"description": "the user's task ID was returned, "
+                                      "a result cached for the same dataset and settings is returned at once"}
              })
 def start_analysis(request: TargetColumnRequest,
                             user: User = Depends(get_current_user),
@@ -133,7 +150,21 @@ def start_analysis(request: TargetColumnRequest,
     tmp_path = file.tmp_path
     original_filename = file.original_filename
 
-    task = analyse_data.delay(file.id, tmp_path, request.target_column, request.save_file, user.id,original_filename, request.type_search)
+    cache_key = analysis_key(file, target_column=request.target_column, type_search=request.type_search.value,
+                             feature_selection=request.feature_selection.value)
+    result = cached_analysis(db, result_cache, graph_store, cache_key, user.id)
+    if result is not None:
+        task_id = uuid.uuid4().hex
+        if request.save_file:
+            save_user_file(db, file, user.id, original_filename)
+        db.delete(file)
+        db.commit()
+        r.set(f"task:{task_id}:progress",
+              json.dumps({'progress': 100, 'detail': 'Analysis complete', "result": result}), ex=PROGRESS_TTL_SECONDS)
+        return {"task_id": task_id, "cached": True, "result": result}
+
+    task = analyse_data.delay(file.id, tmp_path, request.target_column, request.save_file, user.id,original_filename, request.type_search.value,
+                               request.feature_selection.value)
     return {"task_id": task.id}
 
 
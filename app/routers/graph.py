@@ -0,0 +1,39 @@
+from typing import Optional
+
+from dependencies import get_current_user
+from fastapi import APIRouter, Response, status
+from fastapi.params import Depends
+from fastapi.responses import JSONResponse
+from models.user_model import User
+from services.GraphRenderer import graph_format
+from celery_app.tasks import graph_store
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml", "dot": "text/vnd.graphviz"}
+
+router = APIRouter()
+
+
+@router.get("/{graph_id}",
+            summary="Get the decision tree graph of an analysis",
+            description="""
+                            Returns the graph whose id is in the analysis result, as an image (png or svg) or as
+                            its DOT source. Images are rendered on the first request and cached for identical trees.
+                          """,
+            responses={
+                400: {"description": "Unknown format"},
+                401: {"description": "Not authenticated"},
+                404: {"description": "Graph not found"},
+                200: {"description": "The graph", "content": {media_type: {} for media_type in MEDIA_TYPES.values()}},
+            })
+def get_graph(graph_id: str,
+              format: Optional[str] = None,
+              user: User = Depends(get_current_user)):
+    try:
+        format = "dot" if format == "dot" else graph_format(format)
+    except ValueError as e:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(e)})
+
+    content = graph_store.dot(graph_id) if format == "dot" else graph_store.image(graph_id, format)
+    if content is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Graph not found"})
+    return Response(content=content, media_type=MEDIA_TYPES[format])
@@ -0,0 +1,142 @@
+import itertools
+import os
+
+import pandas as pd
+from database import SessionLocal, get_db
+from dependencies import get_current_user
+from fastapi import APIRouter, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.params import Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+from models.trained_model import TrainedModel
+from models.user_model import User
+from schemas.model_schema import PredictRequest, PredictResponse
+from services.CsvReader import read_csv_chunks
+from services.ModelStore import load_pipeline, touch_model
+from utils.upload import spool_upload, max_upload_size, UploadTooLargeError
+
+PREDICT_CHUNK_ROWS = int(os.getenv("PREDICT_CHUNK_ROWS", "100000"))
+# first field of the row ending a prediction stream that failed after the response started
+PREDICT_ERROR_MARKER = "#error:"
+
+router = APIRouter()
+
+
+def open_scoring_file(path):
+    """The spooled upload opened for reading, its name is unlinked so closing the stream deletes it."""
+    source = open(path, "rb")
+    os.remove(path)
+    return source
+
+
+def first_chunk(pipeline, source):
+    """The chunk reader and its first chunk, checked against the model before the response starts."""
+    chunks = read_csv_chunks(source, PREDICT_CHUNK_ROWS, dtypes=pipeline.input_dtypes,
+                             usecols=pipeline.csv_columns)
+    first = next(chunks)
+    pipeline.transform(first)
+    return first, chunks
+
+
+def stream_predictions(pipeline, source, chunks):
+    try:
+        yield from pipeline.predict_csv(chunks)
+    except (ValueError, pd.errors.ParserError) as e:
+        # the status line is already sent, a row the first chunk did not show fails with a last marker row
+        yield f"{PREDICT_ERROR_MARKER} {' '.join(str(e).split())}\n"
+    finally:
+        source.close()
+
+
+@router.post("/{model_id}/predict", response_model=PredictResponse,
+             summary="Classify rows with a trained decision tree",
+             description="""
+                            Applies the model trained by an analysis, whose id is returned in the analysis result,
+                            to the given rows. Categorical columns are encoded the same way as in training.
+                          """,
+             responses={
+                 400: {"description": "Rows do not match the columns the model was trained on"},
+                 401: {"description": "Not authenticated"},
+                 404: {"description": "Model not found"},
+             })
+def predict(model_id: int,
+            request: PredictRequest,
+            user: User = Depends(get_current_user),
+            db: SessionLocal = Depends(get_db)):
+    model = db.query(TrainedModel).filter(TrainedModel.id == model_id, TrainedModel.user_id == user.id).first()
+    if model is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Model not found"})
+
+    try:
+        pipeline = load_pipeline(model)
+    except FileNotFoundError:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Model not found"})
+    touch_model(db, model)
+
+    try:
+        predictions = pipeline.predict_rows(request.rows)
+    except ValueError as e:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(e)})
+
+    return PredictResponse(model_id=model.id, target_column=model.target_column, predictions=predictions)
+
+
+@router.post("/{model_id}/predict-csv",
+             summary="Score a CSV file with a trained decision tree",
+             description="""
+                            Reads the uploaded CSV in chunks and streams back a CSV with one prediction per input row,
+                            in the same order. Only the columns the model uses are parsed.
+                            A file that fails to parse after the first chunk ends with a row starting with "#error:".
+                          """,
+             responses={
+                 400: {"description": "The file does not match the columns the model was trained on"},
+                 401: {"description": "Not authenticated"},
+                 404: {"description": "Model not found"},
+                 200: {"description": "Predictions streamed as CSV", "content": {"text/csv": {}}},
+                 413: {"description": "Upload file is too large"},
+             },
+             # the file field is read from the request stream, so it is described here instead of by a File parameter
+             openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+                 "type": "object",
+                 "required": ["file"],
+                 "properties": {"file": {"type": "string", "format": "binary"}},
+             }}}}})
+async def predict_csv(model_id: int,
+                      request: Request,
+                      user: User = Depends(get_current_user),
+                      db: SessionLocal = Depends(get_db)):
+    model = db.query(TrainedModel).filter(TrainedModel.id == model_id, TrainedModel.user_id == user.id).first()
+    if model is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Model not found"})
+
+    try:
+        pipeline = await run_in_threadpool(load_pipeline, model)
+    except FileNotFoundError:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Model not found"})
+    touch_model(db, model)
+
+    # the body is streamed straight to disk, the response reads the one copy
+    try:
+        upload = await spool_upload(request, "file", max_upload_size(), directory=os.getenv("STORAGE_DIR"))
+    except UploadTooLargeError:
+        return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            content={"detail": "File too large"})
+    if upload is None:
+        raise RequestValidationError([{"type": "missing", "loc": ("body", "file"), "msg": "Field required",
+                                       "input": None}])
+    source = open_scoring_file(upload.path)
+
+    # the first chunk is read up front, a file that does not fit the model fails before the response starts
+    try:
+        first, chunks = await run_in_threadpool(first_chunk, pipeline, source)
+    except pd.errors.EmptyDataError:
+        source.close()
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Uploaded file is empty"})
+    except (ValueError, pd.errors.ParserError) as e:
+        source.close()
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(e)})
+
+    return StreamingResponse(stream_predictions(pipeline, source, itertools.chain([first], chunks)),
+                             media_type="text/csv",
+                             headers={"Content-Disposition": 'attachment; filename="predictions.csv"'})
@@ -0,0 +1,15 @@
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+
+class PredictRequest(BaseModel):
+    rows: list[dict[str, Any]] = Field(..., min_length=1,
+                                       example=[{"Age": 47, "Sex": "M", "BP": "LOW", "Cholesterol": "HIGH", "Na_to_K": 10.1}],
+                                       description="Rows to classify, with the columns of the analysed dataset")
+
+
+class PredictResponse(BaseModel):
+    model_id: int = Field(..., example=1, description="Trained model identification number")
+    target_column: str = Field(..., example="Drug", description="Column the model predicts")
+    predictions: list[Any] = Field(..., example=["drugC"], description="Predicted class of every row, in order")
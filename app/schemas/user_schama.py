@@ -4,6 +4,9 @@ from pydantic import BaseModel, EmailStr, Field, field_validator
 from datetime import datetime
 from typing import Optional
 
+from services.FeatureSelection import SelectionType
+from services.ParameterSearch import SearchType, parse_search_type
+
 
 def password_validator(value: str) -> str:
     errors = []
@@ -68,14 +71,32 @@ class TargetColumnRequest(BaseModel):
 
     file_id: int = Field(..., example=1, description="file identification number")
 
-    type_search: bool = Field(..., example=True,
-                              description="The value determines how the model should be trained, "
-                                          "whether it should randomly select values or check each"
-                                          "one in turn and choose the best one.")
+    type_search: SearchType = Field(..., example="grid",
+                                    description="The value determines how the model should be trained: "
+                                                "'grid' checks each parameter combination in turn, "
+                                                "'random' samples combinations, 'halving' drops most "
+                                                "combinations after cheap evaluations on samples of the data, "
+                                                "'pruning' grows one tree per depth/leaf size setting and "
+                                                "scores every ccp_alpha of its pruning path. "
+                                                "The boolean values of older clients mean 'grid' (true) "
+                                                "and 'random' (false).")
 
     save_file: bool = Field(..., example=True,
                             description="A value that specifies whether the file should be saved on the server disk.")
 
+    feature_selection: SelectionType = Field(SelectionType.BACKWARD, example="backward",
+                                             description="How the best columns are chosen: 'backward' removes "
+                                                         "columns one by one with cross-validation, 'importance' "
+                                                         "drops the least important columns of the tree in a few "
+                                                         "rounds and is much faster on wide data.")
+
+    @field_validator("type_search", mode="before")
+    @classmethod
+    def bool_search_type(cls, value):
+        if isinstance(value, bool):
+            return parse_search_type(value)
+        return value
+
 class MessageResponse(BaseModel):
     detail: str = Field(..., example="Operation completed successfully",
                         description="Message displayed after the command has been successfully executed ")
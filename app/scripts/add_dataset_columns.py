@@ -0,0 +1,35 @@
+"""Adds the stored-dataset columns to tables created before them.
+
+Base.metadata.create_all only creates missing tables, an existing database needs these columns once:
+    cd app && python -m scripts.add_dataset_columns
+"""
+import sqlalchemy as sa
+
+from database import Base, db
+from models import Blacklisted_tokens_model, dataset_model, file_model, refresh_token_model, temp_file_model, trained_model, user_model, user_action
+
+NEW_COLUMNS = {
+    "temp_files": {
+        "dataset_id": "INTEGER REFERENCES datasets(id) ON DELETE SET NULL",
+        "artifact_path": "VARCHAR",
+    },
+    "user_files": {
+        "dataset_id": "INTEGER REFERENCES datasets(id) ON DELETE SET NULL",
+    },
+}
+
+
+def add_dataset_columns(engine):
+    # the datasets table the new columns reference
+    Base.metadata.create_all(bind=engine)
+    inspector = sa.inspect(engine)
+    with engine.begin() as connection:
+        for table, columns in NEW_COLUMNS.items():
+            present = {column["name"] for column in inspector.get_columns(table)}
+            for name, definition in columns.items():
+                if name not in present:
+                    connection.execute(sa.text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
+
+
+if __name__ == "__main__":
+    add_dataset_columns(db)
@@ -0,0 +1,168 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from services.DataPreprocessor import (MAX_CATEGORIES, likely_id_mask, validate_column_names, validate_shape,
+                                       validate_categorical_columns, validate_class_counts)
+from services.DatasetArtifact import CHUNK_ROWS, iter_dataset_chunks
+from services.HyperLogLog import HyperLogLog
+from services.ModelTrainer import RANDOM_STATE, take_rows
+from services.SchemaProbe import merge_dtypes
+
+OUT_OF_CORE_THRESHOLD_BYTES = int(os.getenv("OUT_OF_CORE_THRESHOLD_BYTES", str(1024 * 1024 * 1024)))
+TRAIN_MEMORY_BYTES = int(os.getenv("TRAIN_MEMORY_BYTES", str(512 * 1024 * 1024)))
+
+
+def use_out_of_core(csv_path):
+    return os.path.getsize(csv_path) > OUT_OF_CORE_THRESHOLD_BYTES
+
+
+class ChunkedPreprocessor:
+    """DataPreprocessor for files larger than memory.
+
+    The first pass over the chunks collects dtypes, cardinalities and value counts, the second one
+    writes the encoded feature matrix into a disk-backed memmap, column-major as the trees read it.
+    """
+
+    def __init__(self, csv_path, artifact_path=None, work_dir=None, chunk_rows=CHUNK_ROWS,
+                 train_memory_bytes=TRAIN_MEMORY_BYTES, dtypes=None):
+        self.csv_path = csv_path
+        self.artifact_path = artifact_path
+        self.dtype_hints = dtypes
+        self.work_dir = work_dir
+        self.chunk_rows = chunk_rows
+        self.train_memory_bytes = train_memory_bytes
+
+        self._scan()
+
+        validate_column_names(self.columns)
+        validate_shape(self.row_count, len(self.columns))
+
+        n_unique = np.array([
+            len(self.value_counts[col]) if self.value_counts[col] is not None
+            else max(self._sketches[col].count(), MAX_CATEGORIES + 1)
+            for col in self.columns
+        ])
+        mask = likely_id_mask(self.columns, n_unique, self.row_count, pd.Series(self.dtypes)[self.columns])
+        self.dropped_ids = [col for col, is_id in zip(self.columns, mask) if is_id]
+        self.data_columns = [col for col in self.columns if col not in self.dropped_ids]
+
+        self.categorical_columns = [col for col in self.data_columns if str(self.dtypes[col]) in ["object", "category"]]
+        validate_categorical_columns(self.categorical_columns)
+
+        self.decision_column = None
+        self.label_encoder = LabelEncoder()
+        self.numeric_columns = None
+        self.bool_columns = None
+        self.categories = None
+        self.memory_report = {"input_bytes": os.path.getsize(csv_path), "out_of_core": True}
+
+    def _chunks(self):
+        return iter_dataset_chunks(self.csv_path, self.artifact_path, self.chunk_rows, self.dtype_hints)
+
+    def _scan(self):
+        self.columns = None
+        self.row_count = 0
+        for chunk in self._chunks():
+            if self.columns is None:
+                self.columns = list(chunk.columns)
+                self.dtypes = dict.fromkeys(self.columns)
+                self.value_counts = {col: pd.Series(dtype="int64") for col in self.columns}
+                self._sketches = {col: HyperLogLog() for col in self.columns}
+
+            self.row_count += len(chunk)
+            for col in self.columns:
+                values = chunk[col]
+                self.dtypes[col] = merge_dtypes(self.dtypes[col], values.dtype)
+                self._sketches[col].add(values)
+                if self.value_counts[col] is not None:
+                    counts = self.value_counts[col].add(values.value_counts(dropna=False), fill_value=0)
+                    # past this many values the column is an id or a continuous feature, never a class or category
+                    self.value_counts[col] = counts if len(counts) <= MAX_CATEGORIES else None
+
+        if self.columns is None:
+            raise ValueError("Uploaded dataset is empty.")
+
+    def _vocabulary(self, col):
+        values = self.value_counts[col].index
+        # same order as OneHotEncoder: sorted categories, missing values last
+        return sorted(values.dropna()), values.hasnans
+
+    def validate_target_column(self, target: str, min_samples_per_class: int = 2, max_classes: int = 20):
+        if target not in self.data_columns:
+            raise ValueError(f"Target column '{target}' not found in dataset.")
+
+        counts = self.value_counts[target]
+        if counts is None:
+            raise ValueError(f"Too many unique classes in target column (>{MAX_CATEGORIES}).")
+        if counts.index.hasnans:
+            raise ValueError("Target column contains missing values.")
+
+        validate_class_counts(counts.sort_index().to_numpy(), min_samples_per_class, max_classes)
+
+    def prepare_data(self, decision_column):
+        self.validate_target_column(decision_column)
+        self.decision_column = decision_column
+        self.label_encoder.classes_ = np.asarray(sorted(self.value_counts[decision_column].index))
+
+        categorical_column = [col for col in self.categorical_columns if col != decision_column]
+        numeric_column = [col for col in self.data_columns if col not in categorical_column and col != decision_column]
+
+        vocabularies = {col: self._vocabulary(col) for col in categorical_column}
+        self.numeric_columns = numeric_column
+        self.bool_columns = [col for col in numeric_column if pd.api.types.is_bool_dtype(self.dtypes[col])]
+        self.categories = {col: categories + ([np.nan] if has_nan else [])
+                           for col, (categories, has_nan) in vocabularies.items()}
+        feature_names = list(numeric_column)
+        offsets = {}
+        for col, (categories, has_nan) in vocabularies.items():
+            offsets[col] = len(feature_names)
+            feature_names += [f"{col}_{category}" for category in categories] + ([f"{col}_nan"] if has_nan else [])
+
+        # an unlinked temporary file, the space is released together with the memmap
+        X = np.memmap(tempfile.TemporaryFile(dir=self.work_dir), dtype=np.float32, mode="w+",
+                      shape=(self.row_count, len(feature_names)), order="F")
+        y = np.empty(self.row_count, dtype=np.int16)
+
+        start = 0
+        for chunk in self._chunks():
+            rows = np.arange(start, start + len(chunk))
+            X[start:start + len(chunk), :len(numeric_column)] = chunk[numeric_column].to_numpy(dtype=np.float32)
+            for col, (categories, has_nan) in vocabularies.items():
+                codes = pd.Categorical(chunk[col], categories=categories).codes.astype(np.int64)
+                if has_nan:
+                    codes[codes < 0] = len(categories)
+                X[rows, offsets[col] + codes] = 1
+            y[start:start + len(chunk)] = pd.Categorical(chunk[decision_column],
+                                                         categories=self.label_encoder.classes_).codes
+            start += len(chunk)
+        X.flush()
+
+        X, y = self._training_rows(X, y)
+        self.memory_report.update({
+            "features_bytes": self.row_count * len(feature_names) * 4,
+            "float64_features_bytes": self.row_count * len(feature_names) * 8,
+            "sparse": False,
+            "training_rows": len(y),
+        })
+
+        return X, pd.Series(y), pd.Index(feature_names)
+
+    def _training_rows(self, X, y):
+        """The memmap itself when it fits the training budget, a stratified sample of its rows otherwise."""
+        row_bytes = max(X.shape[1] * X.itemsize, 1)
+        if X.nbytes <= self.train_memory_bytes:
+            return X, y
+
+        n_rows = max(self.train_memory_bytes // row_bytes, 2 * len(self.label_encoder.classes_))
+        rows, _ = train_test_split(np.arange(len(y)), train_size=int(n_rows), stratify=y, random_state=RANDOM_STATE)
+        # sorted rows read each column of the memmap front to back
+        rows.sort()
+        return take_rows(X, rows), y[rows]
+
+    def show_file_columns(self):
+        return list(self.data_columns)
@@ -0,0 +1,124 @@
+import heapq
+
+import numpy as np
+
+TREE_LEAF = -1
+
+
+def tree_parents(tree):
+    parent = np.full(tree.node_count, TREE_LEAF, dtype=np.intp)
+    internal = np.flatnonzero(tree.children_left != TREE_LEAF)
+    parent[tree.children_left[internal]] = internal
+    parent[tree.children_right[internal]] = internal
+    return parent
+
+
+def pruning_thresholds(tree):
+    """Smallest ccp_alpha at which each node of a grown tree is a leaf of the pruned tree.
+
+    Replays sklearn's weakest-link pruning (same arithmetic and tie-breaking as
+    DecisionTreeClassifier(ccp_alpha=...)). sklearn stops at the first step whose effective alpha
+    exceeds ccp_alpha, so a node pruned at step k is a leaf from the largest effective alpha of
+    steps 1..k on. Leaves get 0; nodes removed together with an ancestor keep inf, since on every
+    path the ancestor is reached first.
+    """
+    n_nodes = tree.node_count
+    children_left = tree.children_left
+    children_right = tree.children_right
+    weighted = tree.weighted_n_node_samples
+    r_node = weighted * tree.impurity / weighted[0]
+    parent = tree_parents(tree)
+    is_leaf = children_left == TREE_LEAF
+
+    # every leaf adds itself to all of its ancestors, in leaf order, like sklearn does
+    r_branch = np.where(is_leaf, r_node, 0.0)
+    n_leaves = np.zeros(n_nodes, dtype=np.intp)
+    leaves = np.flatnonzero(is_leaf)
+    pairs_ancestor, pairs_leaf = [], []
+    ancestors = parent[leaves]
+    current = leaves
+    while (ancestors != TREE_LEAF).any():
+        keep = ancestors != TREE_LEAF
+        current, ancestors = current[keep], ancestors[keep]
+        pairs_ancestor.append(ancestors)
+        pairs_leaf.append(current)
+        ancestors = parent[ancestors]
+    if pairs_ancestor:
+        pairs_ancestor = np.concatenate(pairs_ancestor)
+        order = np.argsort(np.concatenate(pairs_leaf), kind="stable")
+        np.add.at(r_branch, pairs_ancestor[order], r_node[np.concatenate(pairs_leaf)[order]])
+        np.add.at(n_leaves, pairs_ancestor, 1)
+
+    thresholds = np.where(is_leaf, 0.0, np.inf)
+    in_tree = np.ones(n_nodes, dtype=bool)
+    version = np.zeros(n_nodes, dtype=np.intp)
+
+    def effective_alpha(node):
+        return (r_node[node] - r_branch[node]) / (n_leaves[node] - 1)
+
+    heap = [(effective_alpha(node), node, 0) for node in np.flatnonzero(~is_leaf)]
+    heapq.heapify(heap)
+    running_max = 0.0
+
+    while heap:
+        alpha, node, node_version = heapq.heappop(heap)
+        if not in_tree[node] or is_leaf[node] or node_version != version[node]:
+            continue
+
+        running_max = max(running_max, alpha)
+        thresholds[node] = running_max
+
+        stack = [children_left[node], children_right[node]]
+        while stack:
+            child = stack.pop()
+            if not in_tree[child]:
+                continue
+            in_tree[child] = False
+            if children_left[child] != TREE_LEAF:
+                stack += [children_left[child], children_right[child]]
+        is_leaf[node] = True
+
+        n_pruned_leaves = n_leaves[node] - 1
+        n_leaves[node] = 0
+        r_diff = r_node[node] - r_branch[node]
+        r_branch[node] = r_node[node]
+
+        ancestor = parent[node]
+        while ancestor != TREE_LEAF:
+            n_leaves[ancestor] -= n_pruned_leaves
+            r_branch[ancestor] += r_diff
+            version[ancestor] += 1
+            heapq.heappush(heap, (effective_alpha(ancestor), ancestor, version[ancestor]))
+            ancestor = parent[ancestor]
+
+    return thresholds
+
+
+def candidate_alphas(thresholds, max_alphas=None):
+    """One alpha inside each interval of the pruning path (geometric midpoints), unpruned tree first."""
+    steps = np.unique(thresholds[np.isfinite(thresholds) & (thresholds > 0)])
+    # the last step leaves only the root, never a useful classifier
+    alphas = np.concatenate([[0.0], np.sqrt(steps[:-1] * steps[1:])])
+    if max_alphas is not None and len(alphas) > max_alphas:
+        alphas = alphas[np.unique(np.linspace(0, len(alphas) - 1, max_alphas).round().astype(int))]
+    return alphas
+
+
+def pruned_accuracy(estimator, X, y, thresholds, alphas):
+    """Accuracy of the estimator pruned at each alpha, from one decision_path of the grown tree."""
+    path = estimator.decision_path(X).tocsr()
+    path.sort_indices()
+    # children are numbered after their parents, so ascending node ids run from the root down
+    nodes = path.indices
+    row_starts = path.indptr[:-1]
+    node_class = estimator.classes_[estimator.tree_.value[:, 0, :].argmax(axis=1)]
+    node_thresholds = thresholds[nodes]
+    positions = np.arange(len(nodes))
+    y = np.asarray(y)
+
+    scores = np.empty(len(alphas))
+    for i, alpha in enumerate(alphas):
+        # the first node on the path that is a leaf of the pruned tree gives the prediction
+        first_leaf = np.minimum.reduceat(np.where(node_thresholds <= alpha, positions, len(nodes)), row_starts)
+        scores[i] = np.mean(node_class[nodes[first_leaf]] == y)
+    return scores
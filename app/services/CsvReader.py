@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+CSV_ENGINES = ("c", "pyarrow")
+CSV_ENGINE = os.getenv("CSV_ENGINE", "c")
+CSV_THREADS = int(os.getenv("CSV_THREADS", "0"))
+
+# the strings pandas.read_csv reads as missing by default
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+# arrow types of the dtype hints, a hinted text column is never parsed as dates or numbers
+ARROW_TYPES = {"object": pa.string(), "float64": pa.float64(), "int64": pa.int64(), "bool": pa.bool_()}
+
+if CSV_THREADS > 0:
+    pa.set_cpu_count(CSV_THREADS)
+
+
+def csv_engine(engine=None):
+    engine = engine or CSV_ENGINE
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}', expected one of {', '.join(CSV_ENGINES)}.")
+    return engine
+
+
+def read_csv_arrow(path, dtypes=None) -> pd.DataFrame:
+    column_types = {col: ARROW_TYPES[str(dtype)] for col, dtype in (dtypes or {}).items()
+                    if str(dtype) in ARROW_TYPES}
+    table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+        column_types=column_types,
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+    ))
+    frame = table.to_pandas()
+    # missing text comes back as None, the C parser reads it as NaN
+    for col in frame.columns[frame.dtypes == "object"]:
+        frame[col] = frame[col].where(frame[col].notna(), np.nan)
+    return frame
+
+
+def read_csv(path, engine=None, dtypes=None) -> pd.DataFrame:
+    """Read a whole CSV with the configured engine, pandas' C parser unless CSV_ENGINE says otherwise.
+
+    The pyarrow engine parses blocks on all cores (CSV_THREADS caps it). Dtype hints from the schema probe
+    spare it type inference, which only looks at the first block and reads some columns differently from
+    the C parser. The C parser stays the reference: it reads whatever arrow refuses.
+    """
+    if csv_engine(engine) == "pyarrow":
+        try:
+            return read_csv_arrow(path, dtypes)
+        except (pa.ArrowException, ValueError, TypeError):
+            pass
+    return pd.read_csv(path)
+
+
+def read_csv_chunks(path, chunk_rows, dtypes=None, usecols=None):
+    """Chunked reads stay on the C parser, the hints keep every chunk on the same dtypes."""
+    return pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes, usecols=usecols)
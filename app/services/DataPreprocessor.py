@@ -1,83 +1,188 @@
+import os
+
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.preprocessing import OneHotEncoder, LabelEncoder
 from sklearn.preprocessing import LabelEncoder
 
+from services.HyperLogLog import HyperLogLog
 
-def detect_and_drop_id(table):
-    potential_ids = []
+MAX_CATEGORIES = 1000
+SPARSE_THRESHOLD_BYTES = int(os.getenv("SPARSE_THRESHOLD_BYTES", str(256 * 1024 * 1024)))
+# from this many rows columns are profiled with HyperLogLog sketches instead of exact distinct counts
+APPROXIMATE_PROFILE_MIN_ROWS = int(os.getenv("APPROXIMATE_PROFILE_MIN_ROWS", str(1_000_000)))
 
-    for col in table.columns:
-        name_match = "id" in col.lower() or "uuid" in col.lower()
-        high_uniqueness = table[col].nunique() / len(table) > 0.8
-        too_many_uniques = table[col].nunique() > 1000
-        likely_id_type = table[col].dtype in ["int64", "object"]
 
-        if (name_match or high_uniqueness or too_many_uniques) and likely_id_type:
-            potential_ids.append(col)
+def likely_id_mask(names, n_unique, n_rows, dtypes):
+    names = pd.Index(names).astype(str).str.lower()
+    name_match = names.str.contains("id") | names.str.contains("uuid")
+    high_uniqueness = n_unique / n_rows > 0.8
+    too_many_uniques = n_unique > MAX_CATEGORIES
+    likely_id_type = dtypes.map(lambda dtype: dtype in ["int64", "object"] or isinstance(dtype, pd.CategoricalDtype))
 
-    return table.drop(columns=potential_ids), potential_ids
+    return (name_match | high_uniqueness | too_many_uniques) & likely_id_type
 
 
-class DataPreprocessor:
+def profile_columns(table, approximate=False):
+    """Cardinality, dtype class and id heuristics for all columns in one pass."""
+    dtypes = table.dtypes
+
+    if approximate:
+        sketches = {col: HyperLogLog() for col in table.columns}
+        for col, sketch in sketches.items():
+            sketch.add(table[col])
+        n_unique = pd.Series({col: sketch.count() for col, sketch in sketches.items()}, dtype="int64")
+    else:
+        n_unique = table.nunique()
+
+    return pd.DataFrame({
+        "dtype": dtypes,
+        "n_unique": n_unique,
+        "categorical": dtypes.map(lambda dtype: dtype == "object" or isinstance(dtype, pd.CategoricalDtype)),
+        "likely_id": likely_id_mask(table.columns, n_unique, max(len(table), 1), dtypes),
+    }, index=table.columns)
+
+
+def nbytes(data):
+    if sparse.issparse(data):
+        return int(data.data.nbytes + data.indices.nbytes + data.indptr.nbytes)
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(deep=True, index=False).sum())
+    return int(data.nbytes)
+
+
+def detect_and_drop_id(table, approximate=False):
+    profile = profile_columns(table, approximate=approximate)
+    potential_ids = profile.index[profile["likely_id"]].tolist()
+
+    return table.drop(columns=potential_ids), potential_ids, profile.drop(index=potential_ids)
+
+
+def validate_column_names(columns):
+    if any(col is None or str(col).strip() == "" or str(col).startswith("Unnamed") for col in columns):
+        raise ValueError("The CSV file must contain valid column names in the first row.")
+
+    if len(columns) != len(set(columns)):
+        raise ValueError("CSV file contains duplicate column names.")
+
 
-    def __init__(self, data: pd.DataFrame):
-        if any(col is None or str(col).strip() == "" or str(col).startswith("Unnamed") for col in data.columns):
-            raise ValueError("The CSV file must contain valid column names in the first row.")
+def validate_shape(n_rows, n_columns):
+    if n_rows == 0 or n_columns == 0:
+        raise ValueError("Uploaded dataset is empty.")
 
-        if len(data.columns) != len(set(data.columns)):
-            raise ValueError("CSV file contains duplicate column names.")
+    if n_columns < 2:
+        raise ValueError("Dataset must have at least 2 columns.")
 
-        if data.empty:
-            raise ValueError("Uploaded dataset is empty.")
+    if n_rows < 20:
+        raise ValueError("Dataset must have at least 20 rows.")
 
-        if data.shape[1] < 2:
-            raise ValueError("Dataset must have at least 2 columns.")
 
-        if len(data) < 20:
-            raise ValueError("Dataset must have at least 20 rows.")
+def validate_categorical_columns(categorical_columns):
+    if len(categorical_columns) == 0:
+        raise ValueError("No categorical columns in the data, at least one required")
 
-        self.data, self.dropped_ids = detect_and_drop_id(data)
 
-        categorical_columns = self.data.select_dtypes(include=["object", "category"]).columns.tolist()
-        if len(categorical_columns) == 0:
-            raise ValueError("No categorical columns in the data, at least one required")
+def validate_class_counts(class_counts, min_samples_per_class=2, max_classes=20):
+    if len(class_counts) < 2:
+        raise ValueError("Target column must have at least 2 unique classes.")
+
+    if (np.asarray(class_counts) < min_samples_per_class).any():
+        raise ValueError("Each class in target must have at least 2 samples.")
+
+    if len(class_counts) > max_classes:
+        raise ValueError(f"Too many unique classes in target column ({len(class_counts)}).")
+
+
+class DataPreprocessor:
+
+    def __init__(self, data: pd.DataFrame, approximate_profile=False):
+        validate_column_names(data.columns)
+        validate_shape(len(data), data.shape[1])
+        self.memory_report = {"input_bytes": nbytes(data)}
+
+        self.data, self.dropped_ids, self.profile = detect_and_drop_id(data, approximate=approximate_profile)
+
+        self.categorical_columns = self.profile.index[self.profile["categorical"]].tolist()
+        validate_categorical_columns(self.categorical_columns)
 
         self.decision_column = None
         self.label_encoder = LabelEncoder()
+        self.numeric_columns = None
+        self.bool_columns = None
+        self.categories = None
+        self._target_codes = {}
+
+    def _factorize_target(self, target):
+        if target not in self._target_codes:
+            codes, classes = pd.factorize(self.data[target], sort=True)
+            self._target_codes[target] = (codes, np.asarray(classes))
+        return self._target_codes[target]
 
     def validate_target_column(self, target: str, min_samples_per_class: int =2, max_classes: int = 20):
         if target not in self.data.columns:
             raise ValueError(f"Target column '{target}' not found in dataset.")
 
-        y = self.data[target]
-        class_counts = y.value_counts()
-
-        if len(class_counts) < 2:
+        if int(self.profile.at[target, "n_unique"]) < 2:
             raise ValueError("Target column must have at least 2 unique classes.")
 
-        if (class_counts < min_samples_per_class).any():
-            raise ValueError("Each class in target must have at least 2 samples.")
+        codes, classes = self._factorize_target(target)
+        validate_class_counts(np.bincount(codes[codes >= 0], minlength=len(classes)), min_samples_per_class, max_classes)
 
-        if len(class_counts) > max_classes:
-            raise ValueError(f"Too many unique classes in target column ({len(class_counts)}).")
+    def use_sparse(self, categorical_columns, numeric_columns, itemsize=8):
+        """One-hot columns go sparse once their dense copy would exceed the threshold."""
+        if self.data[numeric_columns].isna().any().any():
+            # trees handle missing values on dense input only
+            return False
+        n_encoded = int(self.profile.loc[categorical_columns, "n_unique"].sum()) + len(categorical_columns)
+        return len(self.data) * n_encoded * itemsize > SPARSE_THRESHOLD_BYTES
 
-    def prepare_data(self, decision_column):
+    def prepare_data(self, decision_column, sparse_output=None, compact=True):
         self.validate_target_column(decision_column)
         self.decision_column = decision_column
-        self.data[self.decision_column] = self.label_encoder.fit_transform(self.data[self.decision_column])
-        categorical_column = self.data.select_dtypes(include=["object", "category"]).columns.tolist()
 
-        encoder = OneHotEncoder(drop=None, sparse_output=False)
+        codes, classes = self._factorize_target(decision_column)
+        if (codes < 0).any():
+            self.data[self.decision_column] = self.label_encoder.fit_transform(self.data[self.decision_column])
+        else:
+            self.label_encoder.classes_ = classes
+            self.data[self.decision_column] = codes
+        categorical_column = [col for col in self.categorical_columns if col != self.decision_column]
+        numeric_column = [col for col in self.data.columns if col not in categorical_column and col != decision_column]
+
+        # trees split on float32 anyway, so compact features lose nothing and skip sklearn's conversion copy
+        numeric_dtype = np.float32 if compact else np.float64
+        indicator_dtype = np.uint8 if compact else np.float64
+
+        if sparse_output is None:
+            sparse_output = self.use_sparse(categorical_column, numeric_column, np.dtype(indicator_dtype).itemsize)
+        if sparse_output:
+            # stacked with the numeric block, indicators share its dtype
+            indicator_dtype = numeric_dtype
+
+        encoder = OneHotEncoder(drop=None, sparse_output=sparse_output, dtype=indicator_dtype)
         encoded_array = encoder.fit_transform(self.data[categorical_column])
         encoded_cols = encoder.get_feature_names_out(categorical_column)
-
-        encoded_df = pd.DataFrame(encoded_array, columns=encoded_cols)
-        final_data = pd.concat([self.data.drop(columns=categorical_column).reset_index(drop=True), encoded_df], axis=1)
-
-        X = final_data.drop(columns=self.decision_column)
-        y = final_data[self.decision_column]
-
-        return X, y, final_data
+        self.numeric_columns = numeric_column
+        self.bool_columns = [col for col in numeric_column if pd.api.types.is_bool_dtype(self.data[col])]
+        self.categories = {col: list(categories) for col, categories in zip(categorical_column, encoder.categories_)}
+        feature_names = pd.Index(numeric_column + list(encoded_cols))
+        y = self.data[self.decision_column].reset_index(drop=True)
+
+        if sparse_output:
+            numeric = sparse.csc_matrix(self.data[numeric_column].to_numpy(dtype=numeric_dtype))
+            X = sparse.hstack([numeric, encoded_array], format="csc")
+        else:
+            numeric = self.data[numeric_column].astype(numeric_dtype).reset_index(drop=True)
+            X = pd.concat([numeric, pd.DataFrame(encoded_array, columns=encoded_cols)], axis=1)
+
+        self.memory_report.update({
+            "features_bytes": nbytes(X),
+            "float64_features_bytes": X.shape[0] * X.shape[1] * 8,
+            "sparse": bool(sparse_output),
+        })
+
+        return X, y, feature_names
 
     def show_file_columns(self):
         return list(self.data.columns)
\ No newline at end of file
@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+from services.CsvReader import NA_VALUES, read_csv, read_csv_chunks
+
+ARTIFACT_SUFFIX = ".arrow"
+CHUNK_ROWS = 100_000
+
+
+def artifact_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ARTIFACT_SUFFIX
+
+
+def open_csv_batches(csv_path, column_names, string_columns=()):
+    """Stream record batches parsed the same way pandas.read_csv reads the file."""
+    return pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(column_names=list(column_names), skip_rows=1),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={col: pa.string() for col in string_columns},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+
+
+class ArtifactWriter:
+    def __init__(self, artifact_path, schema):
+        self.artifact_path = artifact_path
+        self.writer = pa.ipc.new_file(artifact_path, schema)
+
+    def write(self, batch):
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+    def discard(self):
+        try:
+            self.writer.close()
+        except pa.ArrowException:
+            pass
+        if os.path.exists(self.artifact_path):
+            os.remove(self.artifact_path)
+
+
+def to_categoricals(frame: pd.DataFrame) -> pd.DataFrame:
+    """Store text columns as pandas categories, each distinct string is kept once."""
+    for col in frame.columns[frame.dtypes == "object"]:
+        frame[col] = frame[col].astype("category")
+    return frame
+
+
+def load_artifact(artifact_path) -> pd.DataFrame:
+    with pa.memory_map(artifact_path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def load_dataset(csv_path, artifact_path=None, categorical=True, dtypes=None) -> pd.DataFrame:
+    if artifact_path and os.path.exists(artifact_path):
+        frame = load_artifact(artifact_path)
+    else:
+        frame = read_csv(csv_path, dtypes=dtypes)
+    return to_categoricals(frame) if categorical else frame
+
+
+def iter_dataset_chunks(csv_path, artifact_path=None, chunk_rows=CHUNK_ROWS, dtypes=None):
+    """Yield the dataset as consecutive DataFrames without holding it whole in memory."""
+    if artifact_path and os.path.exists(artifact_path):
+        with pa.memory_map(artifact_path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+    else:
+        yield from read_csv_chunks(csv_path, chunk_rows, dtypes=dtypes)
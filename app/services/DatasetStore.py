@@ -0,0 +1,123 @@
+import json
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from models.dataset_model import Dataset
+from models.file_model import UserFile
+from services.DatasetArtifact import artifact_path_for
+from services.SchemaProbe import SchemaProbe
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+DATASET_DIR = "datasets"
+
+
+def storage_path(relative_path):
+    return os.path.join(os.getenv("STORAGE_DIR"), relative_path)
+
+
+def dataset_dir():
+    path = storage_path(DATASET_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def remove_files(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _touch_dataset(db, content_hash):
+    """The stored dataset of the content, marked as used so the cleanup service keeps it."""
+    dataset = db.query(Dataset).filter(Dataset.content_hash == content_hash).first()
+    if dataset is None:
+        return None
+    dataset.last_used_at = datetime.now(timezone.utc)
+    try:
+        db.commit()
+    except StaleDataError:
+        # the cleanup service removed the row in the meantime
+        db.rollback()
+        return None
+    return dataset
+
+
+def store_dataset(db, tmp_path, content_hash, size_bytes):
+    """Return the dataset holding the uploaded content, parsing it only the first time it is seen."""
+    dataset = _touch_dataset(db, content_hash)
+    if dataset is not None and os.path.exists(storage_path(dataset.storage_path)):
+        os.remove(tmp_path)
+        return dataset
+
+    # every upload stores its files under its own name, so concurrent uploads of the same content never
+    # write or remove each other's files, the one committed first is kept
+    relative_path = os.path.join(DATASET_DIR, f"{content_hash}-{uuid.uuid4().hex[:12]}.csv")
+    blob_path = storage_path(relative_path)
+    os.replace(tmp_path, blob_path)
+
+    try:
+        schema = SchemaProbe(blob_path, artifact_path=artifact_path_for(blob_path))
+    except Exception:
+        remove_files(blob_path, artifact_path_for(blob_path))
+        raise
+
+    try:
+        schema.validate()
+        validation_error = None
+    except ValueError as error:
+        validation_error = str(error)
+
+    fields = {
+        "storage_path": relative_path,
+        "artifact_path": os.path.relpath(schema.artifact_path, storage_path("")) if schema.artifact_path else None,
+        "size_bytes": size_bytes,
+        "columns": json.dumps(schema.show_file_columns()),
+        "dtypes": json.dumps(schema.dtype_hints()),
+        "validation_error": validation_error,
+    }
+    while True:
+        if dataset is None:
+            dataset = Dataset(content_hash=content_hash)
+            db.add(dataset)
+        for name, value in fields.items():
+            setattr(dataset, name, value)
+        dataset.last_used_at = datetime.now(timezone.utc)
+        try:
+            db.commit()
+            return dataset
+        except StaleDataError:
+            # the row whose files were missing was removed by the cleanup service, store the content anew
+            db.rollback()
+            dataset = None
+        except IntegrityError:
+            # the same content was stored by a concurrent upload, its files are used instead of ours
+            db.rollback()
+            remove_files(blob_path, schema.artifact_path)
+            return db.query(Dataset).filter(Dataset.content_hash == content_hash).first()
+
+
+def dataset_columns(dataset):
+    return json.loads(dataset.columns)
+
+
+def dataset_dtypes(dataset):
+    if dataset is None or not dataset.dtypes:
+        return None
+    return json.loads(dataset.dtypes)
+
+
+def save_user_file(db, temp_file, user_id, original_filename):
+    dataset = temp_file.dataset
+    new_file = UserFile(
+        user_id=user_id,
+        dataset_id=dataset.id,
+        filename=original_filename,
+        storage_path=dataset.storage_path,
+        size_bytes=dataset.size_bytes,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=30)
+    )
+    db.add(new_file)
+    db.commit()
+    return new_file
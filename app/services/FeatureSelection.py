@@ -0,0 +1,41 @@
+import math
+from enum import Enum
+
+from sklearn.feature_selection import RFECV, SequentialFeatureSelector
+
+# caps the CV fits of the importance mode at folds x rounds
+MAX_ELIMINATION_ROUNDS = 10
+
+
+class SelectionType(str, Enum):
+    BACKWARD = "backward"
+    IMPORTANCE = "importance"
+
+
+def backward_selector(estimator, n_features, folds, n_jobs):
+    """Drops one column at a time, every candidate scored with CV: O(p^2) fits."""
+    return SequentialFeatureSelector(
+        estimator,
+        direction="backward",
+        n_features_to_select="auto",
+        scoring="accuracy",
+        cv=folds,
+        n_jobs=n_jobs
+    )
+
+
+def importance_selector(estimator, n_features, folds, n_jobs, max_rounds=MAX_ELIMINATION_ROUNDS):
+    """Drops the least important columns by the tree's feature_importances_, in at most max_rounds steps."""
+    return RFECV(
+        estimator,
+        step=max(1, math.ceil(n_features / max_rounds)),
+        scoring="accuracy",
+        cv=folds,
+        n_jobs=n_jobs
+    )
+
+
+SELECTORS = {
+    SelectionType.BACKWARD: backward_selector,
+    SelectionType.IMPORTANCE: importance_selector,
+}
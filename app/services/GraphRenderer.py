@@ -0,0 +1,188 @@
+import atexit
+import os
+import select
+import struct
+import subprocess
+import threading
+import time
+
+GRAPH_FORMATS = ("png", "svg")
+GRAPH_FORMAT = os.getenv("GRAPH_FORMAT", "png")
+# dot processes kept per output format
+GRAPH_RENDERERS = int(os.getenv("GRAPH_RENDERERS", "1"))
+GRAPH_RENDER_TIMEOUT = float(os.getenv("GRAPH_RENDER_TIMEOUT_SECONDS", "60"))
+# after this many timeouts in a row the pool is skipped for a while, a dot holding its output back
+# would otherwise make every render wait for the timeout
+GRAPH_RENDER_MAX_TIMEOUTS = 3
+GRAPH_POOL_COOLDOWN = float(os.getenv("GRAPH_POOL_COOLDOWN_SECONDS", "300"))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+SVG_END = b"</svg>\n"
+
+
+def graph_format(format_file=None):
+    format_file = format_file or GRAPH_FORMAT
+    if format_file not in GRAPH_FORMATS:
+        raise ValueError(f"Unknown graph format '{format_file}', expected one of {', '.join(GRAPH_FORMATS)}.")
+    return format_file
+
+
+class DotRenderer:
+    """A long-lived dot process, rendering the graphs written to its stdin one after another.
+
+    dot writes each image as soon as the graph's closing brace is read. The end of an image is found from
+    its own structure: the IEND chunk of a PNG, the closing tag of an SVG.
+    """
+
+    def __init__(self, format_file):
+        self.format_file = format_file
+        self.process = subprocess.Popen(["dot", f"-T{format_file}"], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.buffer = bytearray()
+        self.deadline = None
+
+    def _fill(self):
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0 or not select.select([self.process.stdout], [], [], remaining)[0]:
+            raise TimeoutError("dot did not finish rendering in time")
+        data = os.read(self.process.stdout.fileno(), 1 << 16)
+        if not data:
+            raise EOFError("dot exited")
+        self.buffer += data
+
+    def _take(self, size):
+        while len(self.buffer) < size:
+            self._fill()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def _take_through(self, marker):
+        start = 0
+        while (end := self.buffer.find(marker, start)) < 0:
+            start = max(len(self.buffer) - len(marker) + 1, 0)
+            self._fill()
+        return self._take(end + len(marker))
+
+    def _read_png(self):
+        image = [self._take(len(PNG_SIGNATURE))]
+        if image[0] != PNG_SIGNATURE:
+            raise ValueError("dot did not write a PNG")
+        while True:
+            header = self._take(8)
+            length, chunk_type = struct.unpack(">I4s", header)
+            image += [header, self._take(length + 4)]
+            if chunk_type == b"IEND":
+                return b"".join(image)
+
+    def render(self, dot_source, timeout=GRAPH_RENDER_TIMEOUT):
+        self.deadline = time.monotonic() + timeout
+        self.process.stdin.write(dot_source.encode("utf-8") + b"\n")
+        self.process.stdin.flush()
+        return self._read_png() if self.format_file == "png" else self._take_through(SVG_END)
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class RendererPool:
+    def __init__(self, format_file, size=GRAPH_RENDERERS):
+        self.format_file = format_file
+        self.size = size
+        self.idle = []
+        self.started = 0
+        self.available = threading.Condition()
+        self.timeouts = 0
+        self.retry_at = 0.0
+
+    @property
+    def disabled(self):
+        return time.monotonic() < self.retry_at
+
+    def _acquire(self):
+        with self.available:
+            while not self.idle and self.started >= self.size:
+                self.available.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.started += 1
+        try:
+            return DotRenderer(self.format_file)
+        except OSError:
+            self._release(None)
+            raise
+
+    def _release(self, renderer):
+        with self.available:
+            if renderer is None:
+                self.started -= 1
+            else:
+                self.idle.append(renderer)
+            self.available.notify()
+
+    def _timed_out(self):
+        with self.available:
+            self.timeouts += 1
+            if self.timeouts >= GRAPH_RENDER_MAX_TIMEOUTS:
+                self.timeouts = 0
+                self.retry_at = time.monotonic() + GRAPH_POOL_COOLDOWN
+
+    def render(self, dot_source):
+        renderer = self._acquire()
+        try:
+            image = renderer.render(dot_source)
+        except Exception as error:
+            # the process state is unknown after a failure, the next render starts a fresh one
+            renderer.close()
+            self._release(None)
+            if isinstance(error, TimeoutError):
+                self._timed_out()
+            raise
+        self.timeouts = 0
+        self._release(renderer)
+        return image
+
+    def close(self):
+        with self.available:
+            while self.idle:
+                self.idle.pop().close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pipe_dot(dot_source, format_file, timeout=GRAPH_RENDER_TIMEOUT):
+    """Image bytes from a one-off dot process, killed once it runs past the timeout."""
+    return subprocess.run(["dot", f"-T{format_file}"], input=dot_source.encode("utf-8"), capture_output=True,
+                          check=True, timeout=timeout).stdout
+
+
+def render_dot(dot_source, format_file=None):
+    """Image bytes of a DOT graph, rendered by a pooled dot process.
+
+    A graph the pool cannot render (dot missing, a graph dot rejects) goes through a one-off dot process
+    within what is left of the same timeout, which raises subprocess's error if dot fails there too.
+    A pooled render that times out raises TimeoutError, the graph already had all of its time.
+    """
+    format_file = graph_format(format_file)
+    deadline = time.monotonic() + GRAPH_RENDER_TIMEOUT
+    with _pools_lock:
+        pool = _pools.setdefault(format_file, RendererPool(format_file))
+    if not pool.disabled:
+        try:
+            return pool.render(dot_source)
+        except TimeoutError:
+            # the failed renderer was replaced and the pool stays in use
+            raise
+        except (OSError, EOFError, ValueError):
+            pass
+    return pipe_dot(dot_source, format_file, timeout=max(deadline - time.monotonic(), 0))
+
+
+@atexit.register
+def close_renderers():
+    for pool in _pools.values():
+        pool.close()
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import time
+
+from services.GraphRenderer import GRAPH_RENDER_TIMEOUT, graph_format, render_dot
+from services.ResultCache import CACHE_TTL_SECONDS
+
+GRAPH_PREFIX = "graph"
+GRAPH_TTL_SECONDS = int(os.getenv("GRAPH_TTL_SECONDS", str(CACHE_TTL_SECONDS)))
+RENDER_POLL_SECONDS = 0.05
+
+
+def graph_id(dot_source):
+    return hashlib.sha256(dot_source.encode("utf-8")).hexdigest()
+
+
+class GraphStore:
+    """Tree graphs in redis: the DOT source of each analysed tree and its images, rendered on first request.
+
+    A graph is identified by the hash of its DOT source, which holds the tree structure and all labels, so
+    equal trees share one entry and each format of it is rendered once.
+    """
+
+    def __init__(self, redis_client, ttl=GRAPH_TTL_SECONDS):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def _key(self, graph, kind):
+        return f"{GRAPH_PREFIX}:{graph}:{kind}"
+
+    def add(self, dot_source):
+        graph = graph_id(dot_source)
+        self.redis.set(self._key(graph, "dot"), dot_source.encode("utf-8"), ex=self.ttl)
+        return graph
+
+    def touch(self, graph):
+        # a cached analysis result keeps its graph alive
+        self.redis.expire(self._key(graph, "dot"), self.ttl)
+
+    def dot(self, graph):
+        raw = self.redis.get(self._key(graph, "dot"))
+        if raw is None:
+            return None
+        self.touch(graph)
+        return raw.decode("utf-8")
+
+    def image(self, graph, format_file=None):
+        """Image bytes of a stored graph, None for an unknown graph."""
+        format_file = graph_format(format_file)
+        key = self._key(graph, format_file)
+        dot_source = self.dot(graph)
+        if dot_source is None:
+            return None
+
+        image = self.redis.get(key)
+        if image is None:
+            image = self._render_once(key, dot_source, format_file)
+        else:
+            self.redis.expire(key, self.ttl)
+        return image
+
+    def _render_once(self, key, dot_source, format_file):
+        # concurrent requests for the same image wait for the first render instead of repeating it
+        lock = f"{key}:lock"
+        deadline = time.monotonic() + GRAPH_RENDER_TIMEOUT
+        while not (acquired := self.redis.set(lock, b"1", nx=True, ex=max(int(2 * GRAPH_RENDER_TIMEOUT), 1))):
+            if time.monotonic() > deadline:
+                break
+            time.sleep(RENDER_POLL_SECONDS)
+            image = self.redis.get(key)
+            if image is not None:
+                return image
+
+        try:
+            image = self.redis.get(key)
+            if image is None:
+                image = render_dot(dot_source, format_file)
+                self.redis.set(key, image, ex=self.ttl)
+            return image
+        finally:
+            if acquired:
+                self.redis.delete(lock)
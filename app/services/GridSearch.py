@@ -1,11 +1,11 @@
-from services.ParameterSearch import ParameterSearch
-from sklearn.model_selection import GridSearchCV
-from sklearn.tree import DecisionTreeClassifier
+import numpy as np
+from services.ParameterSearch import ParameterSearch, SEARCH_TIME_BUDGET
+from sklearn.model_selection import GridSearchCV, ParameterGrid
 
 class GridSearch(ParameterSearch):
 
-    def __init__(self, cv=5, scoring='accuracy'):
-        super().__init__()
+    def __init__(self, cv=5, scoring='accuracy', n_jobs=1, time_budget=SEARCH_TIME_BUDGET, estimator=None):
+        super().__init__(time_budget=time_budget, estimator=estimator)
         self.param_grid = {
             'max_depth': [2, 3, 4, 5, None],
             'min_samples_leaf': [1, 5, 10],
@@ -13,13 +13,22 @@ class GridSearch(ParameterSearch):
         }
         self.cv = cv
         self.scoring = scoring
+        self.n_jobs = n_jobs
+
+    def candidates(self):
+        # shuffled, so a search cut short has still seen every region of the grid
+        grid = list(ParameterGrid(self.param_grid))
+        return [grid[i] for i in np.random.default_rng(0).permutation(len(grid))]
 
     def fit(self, X,y):
+        if self.time_budget is not None:
+            return self.fit_within_budget(X, y)
+
         self.search = GridSearchCV(
-            estimator=DecisionTreeClassifier(random_state=0),
+            estimator=self.estimator,
             param_grid=self.param_grid,
             cv=self.cv,
             scoring=self.scoring,
-            n_jobs=1
+            n_jobs=self.n_jobs
         )
         self.search.fit(X, y)
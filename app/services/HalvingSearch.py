@@ -0,0 +1,94 @@
+import math
+from time import perf_counter
+
+import numpy as np
+from joblib import Parallel
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV, check_cv
+
+from services.GridSearch import GridSearch
+from services.ParameterSearch import SEARCH_TIME_BUDGET, SearchResult
+
+
+def subsample_folds(folds, fraction, random_state=0):
+    """The folds with a fraction of their train and test rows, as sklearn's halving rounds use."""
+    rng = np.random.default_rng(random_state)
+    return [
+        tuple(np.sort(rng.choice(rows, max(1, int(fraction * len(rows))), replace=False)) for rows in (train, test))
+        for train, test in folds
+    ]
+
+
+class HalvingSearch(GridSearch):
+    """Successive halving over the grid: all candidates are scored on a small sample of rows and only
+    the best 1/factor of them is evaluated again on factor times more, up to the full training set."""
+
+    def __init__(self, cv=5, scoring='accuracy', n_jobs=1, factor=3, time_budget=SEARCH_TIME_BUDGET, estimator=None):
+        super().__init__(cv=cv, scoring=scoring, n_jobs=n_jobs, time_budget=time_budget, estimator=estimator)
+        self.factor = factor
+
+    def fit(self, X, y):
+        if self.time_budget is not None:
+            return self.fit_within_budget(X, y)
+
+        self.search = HalvingGridSearchCV(
+            estimator=self.estimator,
+            param_grid=self.param_grid,
+            factor=self.factor,
+            resource="n_samples",
+            min_resources="exhaust",
+            cv=self.cv,
+            scoring=self.scoring,
+            random_state=0,
+            n_jobs=self.n_jobs
+        )
+        self.search.fit(X, y)
+
+    def fit_within_budget(self, X, y):
+        """The halving rounds of fit, run one by one so the budget is checked between their batches.
+
+        When the budget runs out the best candidate of the last round scored so far is refit.
+        """
+        deadline = perf_counter() + self.time_budget
+        y = np.asarray(y)
+        folds = list(check_cv(self.cv, y, classifier=True).split(X, y))
+        candidates = self.candidates()
+        total = len(candidates)
+        n_rounds = 1 + int(math.log(total, self.factor) + 1e-9)
+        # the smallest round still has a few rows of every class in each fold
+        min_fraction = min(1.0, 2 * len(folds) * len(np.unique(y)) / len(y))
+
+        results = {"params": [], "mean_test_score": [], "std_test_score": [], "iter": []}
+        first_round, complete = 0, False
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            for round_ in range(n_rounds):
+                fraction = max(min_fraction, self.factor ** (round_ + 1 - n_rounds))
+                scores = self.score_candidates(parallel, candidates, X, y, subsample_folds(folds, fraction, round_),
+                                               deadline, min_scored=1 if round_ == 0 else 0)
+                if not scores:
+                    break
+                means = [fold_scores.mean() for fold_scores in scores]
+                results["params"] += candidates[:len(scores)]
+                results["mean_test_score"] += means
+                results["std_test_score"] += [fold_scores.std() for fold_scores in scores]
+                results["iter"] += [round_] * len(scores)
+                if round_ == 0:
+                    first_round = len(scores)
+                if len(scores) < len(candidates):
+                    break
+                # the survivors are scored best first, a round cut short has seen the most promising ones
+                order = np.argsort(means, kind="stable")[::-1]
+                candidates = [candidates[i] for i in order[:math.ceil(len(candidates) / self.factor)]]
+                complete = round_ == n_rounds - 1
+                if perf_counter() >= deadline:
+                    break
+
+        last = np.asarray(results["iter"]) == results["iter"][-1]
+        means = np.asarray(results["mean_test_score"])
+        best = int(np.flatnonzero(last)[np.argmax(means[last])])
+        best_params = results["params"][best]
+        best_estimator = clone(self.estimator).set_params(**best_params).fit(X, y)
+        cv_results = {name: values if name == "params" else np.asarray(values) for name, values in results.items()}
+        self.search = SearchResult(best_estimator, best_params, float(means[best]), cv_results)
+        self.report = self._make_report(first_round, total, stopped_early=not complete)
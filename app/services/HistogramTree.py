@@ -0,0 +1,327 @@
+import os
+from enum import Enum
+
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.utils.validation import check_is_fitted
+
+from services.CostComplexityPruning import TREE_LEAF, pruning_thresholds, tree_parents
+
+TREE_UNDEFINED = -2
+MAX_BINS = 256
+HISTOGRAM_CHUNK_ROWS = 65_536
+
+
+class TreeEngine(str, Enum):
+    SKLEARN = "sklearn"
+    HISTOGRAM = "histogram"
+
+
+TREE_ENGINE = TreeEngine(os.getenv("TREE_ENGINE", TreeEngine.SKLEARN.value))
+
+
+def feature_values(X, j):
+    if sparse.issparse(X):
+        return X[:, [j]].toarray().ravel()
+    return np.asarray(X[:, j], dtype=np.float64)
+
+
+def bin_edges(values, max_bins=MAX_BINS):
+    """Split points of one feature, the last of the max_bins codes is kept for missing values.
+
+    Features with few distinct values split halfway between neighbours like sklearn does, the others
+    at quantiles.
+    """
+    values = values[~np.isnan(values)]
+    distinct = np.unique(values)
+    if len(distinct) <= max_bins - 1:
+        return distinct[:-1] / 2 + distinct[1:] / 2
+    return np.unique(np.quantile(values, np.linspace(0, 1, max_bins - 1)[1:-1]))
+
+
+class BinMapper:
+    """Quantizes every feature into uint8 bin codes, fitted once per task."""
+
+    def __init__(self, max_bins=MAX_BINS):
+        self.max_bins = max_bins
+
+    def fit(self, X):
+        self.edges_ = [bin_edges(feature_values(X, j), self.max_bins) for j in range(X.shape[1])]
+        return self
+
+    def transform(self, X):
+        codes = np.empty(X.shape, dtype=np.uint8)
+        for j, edges in enumerate(self.edges_):
+            values = feature_values(X, j)
+            # code b holds the values in (edges[b - 1], edges[b]], so x <= edges[b] exactly when code <= b
+            codes[:, j] = np.searchsorted(edges, values, side="left")
+            codes[np.isnan(values), j] = self.max_bins - 1
+        return codes
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+
+class HistogramTree:
+    """Arrays of a grown tree, with the names and layout of sklearn's Tree."""
+
+    def __init__(self, feature, threshold, children_left, children_right, value, impurity, n_node_samples):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.impurity = impurity
+        self.n_node_samples = n_node_samples
+        self.weighted_n_node_samples = n_node_samples.astype(np.float64)
+        self.node_count = len(feature)
+        self.n_outputs = 1
+        self.n_classes = np.array([value.shape[2]])
+
+        depth = np.zeros(self.node_count, dtype=np.intp)
+        parent = tree_parents(self)
+        for node in range(1, self.node_count):
+            depth[node] = depth[parent[node]] + 1
+        self.max_depth = int(depth.max())
+
+    @property
+    def n_leaves(self):
+        return int(np.sum(self.children_left == TREE_LEAF))
+
+
+def histogram(codes, y, rows, n_classes, n_bins):
+    """Class counts per feature and bin of the given rows, shaped (features, bins, classes)."""
+    n_features = codes.shape[1]
+    hist = np.zeros(n_features * n_bins * n_classes, dtype=np.int64)
+    offsets = np.arange(n_features, dtype=np.int32) * (n_bins * n_classes)
+    for start in range(0, len(rows), HISTOGRAM_CHUNK_ROWS):
+        chunk = rows[start:start + HISTOGRAM_CHUNK_ROWS]
+        flat = codes[chunk].astype(np.int32) * n_classes + y[chunk, None] + offsets
+        hist += np.bincount(flat.ravel(), minlength=len(hist))
+    return hist.reshape(n_features, n_bins, n_classes)
+
+
+def best_split(hist, n_samples, min_samples_leaf):
+    """Feature and bin of the gini-best split "code <= bin", None when no split leaves enough samples on both sides."""
+    left = np.cumsum(hist[:, :-1], axis=1, dtype=np.float64)
+    right = hist[0].sum(axis=0) - left
+    n_left = left.sum(axis=2)
+    n_right = n_samples - n_left
+    valid = (n_left >= min_samples_leaf) & (n_right >= min_samples_leaf)
+    if not valid.any():
+        return None
+
+    # minimizing the children's weighted gini impurity is maximizing this
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proxy = (left ** 2).sum(axis=2) / n_left + (right ** 2).sum(axis=2) / n_right
+    feature, code = np.unravel_index(np.argmax(np.where(valid, proxy, -np.inf)), proxy.shape)
+    return int(feature), int(code)
+
+
+def small_node_split(codes, y, rows, n_classes, min_samples_leaf):
+    """best_split from the node's sorted codes, cheaper than a histogram for nodes with fewer rows than bins."""
+    node_codes = codes[rows]
+    order = np.argsort(node_codes, axis=0, kind="stable")
+    sorted_codes = np.take_along_axis(node_codes, order, axis=0)
+    one_hot = np.eye(n_classes)[y[rows]]
+    left = np.cumsum(one_hot[order], axis=0)[:-1]
+    right = one_hot.sum(axis=0) - left
+    n_left = np.arange(1, len(rows))[:, None]
+    n_right = len(rows) - n_left
+    # a split falls between two different codes only
+    valid = (sorted_codes[:-1] != sorted_codes[1:]) & (n_left >= min_samples_leaf) & (n_right >= min_samples_leaf)
+    if not valid.any():
+        return None
+
+    proxy = (left ** 2).sum(axis=2) / n_left + (right ** 2).sum(axis=2) / n_right
+    # feature major, like the histogram's argmax
+    feature, position = np.unravel_index(np.argmax(np.where(valid, proxy, -np.inf).T), proxy.T.shape)
+    return int(feature), int(sorted_codes[position, feature])
+
+
+def grow_tree(codes, y, n_classes, n_bins, max_depth=None, min_samples_leaf=1):
+    """Depth-first growth like sklearn's builder, with thresholds in bin codes.
+
+    Only the smaller child's histogram is counted, the larger one's is its parent's minus it. Nodes
+    with fewer rows than bins need no histogram.
+    """
+    max_depth = np.iinfo(np.int32).max if max_depth is None else max_depth
+    feature, threshold, left_child, right_child, counts = [], [], [], [], []
+
+    rows = np.arange(len(y))
+    stack = [(rows, histogram(codes, y, rows, n_classes, n_bins) if len(y) >= n_bins else None, TREE_LEAF, True, 0)]
+    while stack:
+        rows, hist, parent, is_left, depth = stack.pop()
+        node = len(feature)
+        if parent != TREE_LEAF:
+            (left_child if is_left else right_child)[parent] = node
+
+        node_counts = hist[0].sum(axis=0) if hist is not None else np.bincount(y[rows], minlength=n_classes)
+        counts.append(node_counts)
+        feature.append(TREE_UNDEFINED)
+        threshold.append(TREE_UNDEFINED)
+        left_child.append(TREE_LEAF)
+        right_child.append(TREE_LEAF)
+
+        n_samples = len(rows)
+        impurity = 1 - np.sum((node_counts / n_samples) ** 2)
+        if depth >= max_depth or n_samples < 2 * min_samples_leaf or impurity <= np.finfo(np.float64).eps:
+            continue
+        if hist is not None:
+            split = best_split(hist, n_samples, min_samples_leaf)
+        else:
+            split = small_node_split(codes, y, rows, n_classes, min_samples_leaf)
+        if split is None:
+            continue
+
+        feature[node], code = split
+        threshold[node] = code + 0.5
+        goes_left = codes[rows, feature[node]] <= code
+        left_rows, right_rows = rows[goes_left], rows[~goes_left]
+        left_hist = right_hist = None
+        if max(len(left_rows), len(right_rows)) >= n_bins:
+            if len(left_rows) <= len(right_rows):
+                left_hist = histogram(codes, y, left_rows, n_classes, n_bins)
+                right_hist = hist - left_hist
+            else:
+                right_hist = histogram(codes, y, right_rows, n_classes, n_bins)
+                left_hist = hist - right_hist
+            if len(left_rows) < n_bins:
+                left_hist = None
+            if len(right_rows) < n_bins:
+                right_hist = None
+
+        # the left child is popped first, so it gets the next node id
+        stack.append((right_rows, right_hist, node, False, depth + 1))
+        stack.append((left_rows, left_hist, node, True, depth + 1))
+
+    counts = np.array(counts, dtype=np.float64)
+    n_node_samples = counts.sum(axis=1)
+    fractions = counts / n_node_samples[:, None]
+    return HistogramTree(
+        feature=np.array(feature, dtype=np.intp),
+        threshold=np.array(threshold, dtype=np.float64),
+        children_left=np.array(left_child, dtype=np.intp),
+        children_right=np.array(right_child, dtype=np.intp),
+        value=fractions[:, None, :],
+        impurity=1 - np.sum(fractions ** 2, axis=1),
+        n_node_samples=n_node_samples.astype(np.intp),
+    )
+
+
+def prune_tree(tree, ccp_alpha):
+    """The tree sklearn's minimal cost complexity pruning leaves for ccp_alpha."""
+    becomes_leaf = pruning_thresholds(tree) <= ccp_alpha
+    parent = tree_parents(tree)
+    keep = np.ones(tree.node_count, dtype=bool)
+    # parents are numbered before their children
+    for node in range(1, tree.node_count):
+        keep[node] = keep[parent[node]] and not becomes_leaf[parent[node]]
+
+    new_id = np.cumsum(keep) - 1
+    leaf = becomes_leaf[keep]
+    children_left = tree.children_left[keep]
+    children_right = tree.children_right[keep]
+    internal = ~leaf & (children_left != TREE_LEAF)
+    return HistogramTree(
+        feature=np.where(internal, tree.feature[keep], TREE_UNDEFINED),
+        threshold=np.where(internal, tree.threshold[keep], TREE_UNDEFINED),
+        children_left=np.where(internal, new_id[children_left], TREE_LEAF),
+        children_right=np.where(internal, new_id[children_right], TREE_LEAF),
+        value=tree.value[keep],
+        impurity=tree.impurity[keep],
+        n_node_samples=tree.n_node_samples[keep],
+    )
+
+
+def thresholds_to_values(tree, edges):
+    """Turns thresholds in bin codes into feature values, edges being the bin edges of each of the tree's features.
+
+    A split past the last edge keeps every present value left and sends only the missing ones right,
+    its threshold becomes inf so NaN <= threshold stays false like the missing code's comparison.
+    """
+    for node in np.flatnonzero(tree.children_left != TREE_LEAF):
+        feature_edges = edges[tree.feature[node]]
+        code = int(tree.threshold[node])
+        tree.threshold[node] = feature_edges[code] if code < len(feature_edges) else np.inf
+
+
+class HistogramDecisionTreeClassifier(ClassifierMixin, BaseEstimator):
+    """Gini decision tree grown from uint8 histograms instead of sorted feature values.
+
+    A uint8 X is taken as the codes of a BinMapper fitted once per task and the thresholds stay in
+    bin codes until thresholds_to_values; any other X is binned by the tree itself. tree_ has the
+    arrays of sklearn's Tree, so PrintGraph and the pruning path read it the same way.
+    """
+
+    def __init__(self, max_depth=None, min_samples_leaf=1, ccp_alpha=0.0, max_bins=MAX_BINS):
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.ccp_alpha = ccp_alpha
+        self.max_bins = max_bins
+
+    def fit(self, X, y):
+        self.classes_, y = np.unique(np.asarray(y), return_inverse=True)
+        self.n_features_in_ = X.shape[1]
+
+        edges = None
+        if sparse.issparse(X) or X.dtype != np.uint8:
+            mapper = BinMapper(self.max_bins).fit(X)
+            X, edges = mapper.transform(X), mapper.edges_
+
+        self.tree_ = grow_tree(np.ascontiguousarray(X), y, len(self.classes_), self.max_bins,
+                               self.max_depth, self.min_samples_leaf)
+        if self.ccp_alpha > 0:
+            self.tree_ = prune_tree(self.tree_, self.ccp_alpha)
+        if edges is not None:
+            thresholds_to_values(self.tree_, edges)
+        return self
+
+    def _walk(self, X):
+        """Leaf of every row, and the row and node of every step of the rows' walks from the root."""
+        check_is_fitted(self, "tree_")
+        if sparse.issparse(X):
+            X = X.toarray()
+        tree = self.tree_
+        rows = np.arange(X.shape[0])
+        nodes = np.zeros(X.shape[0], dtype=np.intp)
+        leaves = nodes.copy()
+        path_rows, path_nodes = [rows], [nodes]
+        while True:
+            internal = tree.children_left[nodes] != TREE_LEAF
+            rows, nodes = rows[internal], nodes[internal]
+            if len(rows) == 0:
+                break
+            goes_left = X[rows, tree.feature[nodes]] <= tree.threshold[nodes]
+            nodes = np.where(goes_left, tree.children_left[nodes], tree.children_right[nodes])
+            leaves[rows] = nodes
+            path_rows.append(rows)
+            path_nodes.append(nodes)
+        return leaves, np.concatenate(path_rows), np.concatenate(path_nodes)
+
+    def apply(self, X):
+        return self._walk(X)[0]
+
+    def decision_path(self, X):
+        _, rows, nodes = self._walk(X)
+        return sparse.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, nodes)),
+                                 shape=(X.shape[0], self.tree_.node_count))
+
+    def predict_proba(self, X):
+        return self.tree_.value[self.apply(X), 0, :]
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    @property
+    def feature_importances_(self):
+        check_is_fitted(self, "tree_")
+        tree = self.tree_
+        internal = np.flatnonzero(tree.children_left != TREE_LEAF)
+        weighted_impurity = tree.weighted_n_node_samples * tree.impurity
+        decrease = (weighted_impurity[internal] - weighted_impurity[tree.children_left[internal]]
+                    - weighted_impurity[tree.children_right[internal]])
+        importances = np.bincount(tree.feature[internal], weights=decrease, minlength=self.n_features_in_)
+        total = importances.sum()
+        return importances / total if total > 0 else importances
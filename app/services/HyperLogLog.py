@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if hashes.size == 0:
+            return
+
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = (hashes << np.uint64(self.precision)) | np.uint64(1 << (self.precision - 1))
+        # bit length of the remaining bits, rank = number of leading zeros + 1
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (65 - bit_length).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, values: pd.Series):
+        values = values.dropna()
+        self.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros > 0:
+            estimate = self.m * np.log(self.m / zeros)
+
+        return int(round(estimate))
@@ -0,0 +1,133 @@
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+from services.TreeCompiler import CompiledTree
+
+# up to this many JSON rows are classified one by one with the compiled tree, larger batches are encoded for sklearn
+COMPILED_ROW_LIMIT = 1000
+
+
+def csv_field(value):
+    text = io.StringIO()
+    csv.writer(text, lineterminator="").writerow([value])
+    return text.getvalue()
+
+
+class ModelPipeline:
+    """A trained tree together with the encoding of raw rows into its features and the class names."""
+
+    def __init__(self, model, numeric_columns, categories, used_features, classes, target_column, bool_columns=()):
+        self.model = model
+        self.used_features = list(used_features)
+        self.classes = list(classes)
+        self.target_column = target_column
+        # numeric columns trained on True/False values, a CSV holds them as text a float parse rejects
+        self.bool_columns = [col for col in bool_columns if col in numeric_columns]
+
+        # every feature the model reads: a numeric column, or a column's one-hot indicator of one category
+        encodings = {col: (col, None) for col in numeric_columns}
+        for col, col_categories in categories.items():
+            for category in col_categories:
+                # None marks a numeric column, a missing-value category is kept as NaN
+                encodings[f"{col}_{category}"] = (col, np.nan if pd.isna(category) else category)
+        self.encodings = [encodings[feature] for feature in self.used_features]
+        # only the features the tree splits on are ever read, the others stay zero
+        self.split_features = np.unique(model.tree_.feature[model.tree_.feature >= 0]).tolist()
+        self.category_texts = self._category_texts(categories)
+        self._compiled = None
+
+    def _category_texts(self, categories):
+        # categories are matched as text, so values parsed from JSON match the categories read from the CSV
+        return {col: [str(category) for category in categories[col] if not pd.isna(category)]
+                for col, category in self._split_encodings() if category is not None}
+
+    def __getstate__(self):
+        # the compiled tree holds generated code, it is rebuilt after loading
+        return {**self.__dict__, "_compiled": None}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # pipelines saved before these attributes existed only hold the encodings of the used features
+        if "split_features" not in state:
+            self.split_features = np.unique(self.model.tree_.feature[self.model.tree_.feature >= 0]).tolist()
+        if "category_texts" not in state:
+            categories = {}
+            for col, category in self.encodings:
+                if category is not None:
+                    categories.setdefault(col, []).append(category)
+            self.category_texts = self._category_texts(categories)
+        if "bool_columns" not in state:
+            self.bool_columns = []
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled = CompiledTree(self)
+        return self._compiled
+
+    def _split_encodings(self):
+        return [self.encodings[i] for i in self.split_features]
+
+    @property
+    def input_columns(self):
+        return sorted({col for col, _ in self._split_encodings()})
+
+    @property
+    def csv_columns(self):
+        # a tree without splits reads no column, the first one is still parsed so chunks keep their rows
+        return self.input_columns or [0]
+
+    @property
+    def input_dtypes(self):
+        # a category column never parses as numbers, a bool column is read as it was in training
+        categorical = {col for col, category in self._split_encodings() if category is not None}
+        return {col: str if col in categorical else bool if col in self.bool_columns else np.float64
+                for col in self.input_columns}
+
+    def transform(self, frame: pd.DataFrame):
+        missing = [col for col in self.input_columns if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        X = np.zeros((len(frame), len(self.encodings)), dtype=np.float32, order="F")
+        codes = {}
+        for i in self.split_features:
+            col, category = self.encodings[i]
+            values = frame[col]
+            if category is None:
+                try:
+                    X[:, i] = pd.to_numeric(values)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Column '{col}' must be numeric.")
+            elif pd.isna(category):
+                X[:, i] = values.isna()
+            else:
+                if col not in codes:
+                    # one hashed lookup per column instead of a comparison per category
+                    codes[col] = pd.Categorical(values.astype(str).where(values.notna()),
+                                                categories=self.category_texts[col]).codes
+                X[:, i] = codes[col] == self.category_texts[col].index(str(category))
+        return X
+
+    def predict_codes(self, frame: pd.DataFrame):
+        return self.model.predict(self.transform(frame))
+
+    def predict(self, frame: pd.DataFrame):
+        return [self.classes[code] for code in self.predict_codes(frame)]
+
+    def predict_rows(self, rows):
+        if len(rows) <= COMPILED_ROW_LIMIT:
+            return [self.compiled.predict_row(row) for row in rows]
+        return self.predict(pd.DataFrame(rows))
+
+    def predict_csv(self, chunks):
+        """CSV text of the predictions for a stream of row chunks, one piece per chunk."""
+        yield csv_field(self.target_column) + "\n"
+        labels = np.array([csv_field(value) for value in self.classes], dtype=object)
+        for chunk in chunks:
+            if len(chunk):
+                yield "\n".join(labels[self.predict_codes(chunk)]) + "\n"
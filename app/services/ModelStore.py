@@ -0,0 +1,96 @@
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import joblib
+
+from models.trained_model import TrainedModel
+from services.DatasetStore import storage_path
+
+MODEL_DIR = "models"
+# loaded pipelines kept by the API process
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "32"))
+
+
+def _share_model(db, model, user_id):
+    """The user's row for a stored model, added when the model was trained for someone else."""
+    owned = model
+    if model.user_id != user_id:
+        owned = db.query(TrainedModel).filter(TrainedModel.storage_path == model.storage_path,
+                                              TrainedModel.user_id == user_id).first()
+    if owned is None:
+        owned = TrainedModel(
+            user_id=user_id,
+            analysis_key=model.analysis_key,
+            storage_path=model.storage_path,
+            target_column=model.target_column,
+            input_columns=model.input_columns,
+        )
+        db.add(owned)
+    touch_model(db, owned)
+    db.refresh(owned)
+    return owned
+
+
+def touch_model(db, model):
+    # the cleanup service removes models unused for a while
+    model.last_used_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def save_model(db, pipeline, user_id, analysis_key=None):
+    """Store the pipeline just trained, its graph and metrics are the ones published with its id.
+
+    Results served from the cache share the model file through link_model instead.
+    """
+    relative_path = os.path.join(MODEL_DIR, f"{uuid.uuid4().hex}.joblib")
+    os.makedirs(storage_path(MODEL_DIR), exist_ok=True)
+    joblib.dump(pipeline, storage_path(relative_path))
+
+    model = TrainedModel(
+        user_id=user_id,
+        analysis_key=analysis_key,
+        storage_path=relative_path,
+        target_column=pipeline.target_column,
+        input_columns=json.dumps(pipeline.input_columns),
+    )
+    db.add(model)
+    db.commit()
+    db.refresh(model)
+    return model
+
+
+def link_model(db, model_id, user_id):
+    """Id of the user's own model for the model of a cached result, both share the model file.
+
+    None when the model or its file was removed.
+    """
+    model = db.query(TrainedModel).filter(TrainedModel.id == model_id).first() if model_id is not None else None
+    if model is None or not os.path.exists(storage_path(model.storage_path)):
+        return None
+    return _share_model(db, model, user_id).id
+
+
+def cached_analysis(db, result_cache, graph_store, cache_key, user_id):
+    """Cached result of an analysis with the user's own model id, None when the analysis has to run."""
+    result = result_cache.get(cache_key) if cache_key else None
+    if result is None:
+        return None
+    # the cached model belongs to whoever ran the analysis first, a removed model means training again
+    model_id = link_model(db, result["model_id"], user_id)
+    if model_id is None:
+        return None
+    graph_store.touch(result["graph_id"])
+    return {**result, "model_id": model_id}
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _load_pipeline(path):
+    # model files are written once, so the path identifies the content
+    return joblib.load(path)
+
+
+def load_pipeline(model):
+    return _load_pipeline(storage_path(model.storage_path))
@@ -1,42 +1,161 @@
+import os
+
+import numpy as np
 import pandas as pd
 import sklearn
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.tree import DecisionTreeClassifier
+from .FeatureSelection import SELECTORS, SelectionType
 from .GridSearch import GridSearch
+from .HalvingSearch import HalvingSearch
+from .HistogramTree import TREE_ENGINE, BinMapper, HistogramDecisionTreeClassifier, TreeEngine, thresholds_to_values
+from .NeighbourhoodSearch import WARM_START_BUDGET, NeighbourhoodSearch
+from .ParallelConfig import n_jobs_for, shared_memory_jobs
+from .ParameterSearch import SEARCH_TIME_BUDGET, SearchType, parse_search_type
+from .PruningPathSearch import PruningPathSearch
 from .RandomSearch import RandomSearch
-from sklearn.feature_selection import SequentialFeatureSelector
+from sklearn.model_selection import StratifiedKFold
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 
 
+RANDOM_STATE = 0
+CV_FOLDS = 5
+# below this many training rows the search runs on all of them
+SUBSAMPLE_MIN_ROWS = int(os.getenv("SUBSAMPLE_MIN_ROWS", str(100_000)))
+# rows times features of the sample the search runs on, tree fits grow about linearly with both
+SEARCH_SAMPLE_CELLS = int(os.getenv("SEARCH_SAMPLE_CELLS", str(5_000_000)))
+
+SEARCHES = {
+    SearchType.GRID: GridSearch,
+    SearchType.RANDOM: RandomSearch,
+    SearchType.HALVING: HalvingSearch,
+    SearchType.PRUNING: PruningPathSearch,
+}
+
+
+def training_array(X):
+    """The float32 matrix trees fit on, column-major so each feature's values are contiguous."""
+    if sparse.issparse(X):
+        return sparse.csc_matrix(X, dtype=np.float32)
+    if isinstance(X, np.ndarray) and X.dtype == np.uint8:
+        # bin codes of the histogram engine, which gathers whole rows
+        return np.ascontiguousarray(X)
+    if isinstance(X, pd.DataFrame):
+        X = X.to_numpy(dtype=np.float32)
+    return np.asfortranarray(X, dtype=np.float32)
+
+
+def take_rows(X, rows):
+    """The rows as a training matrix, a column-major matrix is gathered column by column without a row-major copy."""
+    if isinstance(X, np.ndarray) and X.dtype == np.float32 and X.flags.f_contiguous:
+        taken = np.empty((len(rows), X.shape[1]), dtype=np.float32, order="F")
+        for j in range(X.shape[1]):
+            taken[:, j] = X[:, j][rows]
+        return taken
+    return training_array(X[rows])
+
+
+def search_sample_size(X, max_cells=SEARCH_SAMPLE_CELLS, min_rows=SUBSAMPLE_MIN_ROWS):
+    """Rows the search runs on, from the shape of the data alone so the same dataset always trains the same model."""
+    n_rows, n_features = X.shape
+    if n_rows <= min_rows:
+        return n_rows
+    return int(min(n_rows, max(min_rows, max_cells // max(n_features, 1))))
+
+
 class ModelTrainer:
-    def __init__(self, X , y,checked = True):
-        self.X = X
-        self.y = y
-        self.X_train, self.X_test, self.y_train, self.y_test = sklearn.model_selection.train_test_split(self.X, self.y, test_size=0.3,                                                                   stratify=self.y)
-        self.checked = checked
+    def __init__(self, X , y, search_type=SearchType.GRID, random_state=RANDOM_STATE, feature_names=None, n_jobs=None,
+                 selection_type=SelectionType.BACKWARD, warm_start_budget=WARM_START_BUDGET,
+                 time_budget=SEARCH_TIME_BUDGET, engine=None):
+        self.feature_names = pd.Index(feature_names if feature_names is not None else X.columns)
+        # a column-major float32 matrix, such as the out-of-core memmap, is used as it is
+        X = training_array(X)
+        self.y = np.asarray(y)
+        # the split is made on row indices, each side is gathered once straight from X
+        train, test = sklearn.model_selection.train_test_split(np.arange(len(self.y)), test_size=0.3,
+                                                               stratify=self.y, random_state=random_state)
+        self.X_train, self.X_test = take_rows(X, train), take_rows(X, test)
+        self.y_train, self.y_test = self.y[train], self.y[test]
+        self.engine = TreeEngine(engine or TREE_ENGINE)
+        self.bin_mapper = None
+        if self.engine is TreeEngine.HISTOGRAM:
+            # features are quantized once, every fit of the task grows its tree from the bin codes
+            self.bin_mapper = BinMapper().fit(self.X_train)
+            self.X_train = self.bin_mapper.transform(self.X_train)
+            self.X_test = self.bin_mapper.transform(self.X_test)
+            self.estimator = HistogramDecisionTreeClassifier()
+        else:
+            self.estimator = DecisionTreeClassifier(random_state=random_state)
+        self.X_search, self.y_search = self._search_sample(random_state)
+        # fold indices are computed once and shared by every search and the feature selection
+        self.folds = list(StratifiedKFold(n_splits=CV_FOLDS).split(self.X_search, self.y_search))
+        self.search_type = parse_search_type(search_type)
+        self.selection_type = SelectionType(selection_type)
+        self.warm_start_budget = warm_start_budget
+        self.time_budget = time_budget
+        self.search_reports = []
         self.model = None
         self.search = None
         self.used_features = None
+        self.n_jobs = n_jobs if n_jobs is not None else n_jobs_for(X)
+
+    def _search_sample(self, random_state):
+        """Stratified subsample of the training split the search and the feature selection run on."""
+        n_rows = search_sample_size(self.X_train, SEARCH_SAMPLE_CELLS, SUBSAMPLE_MIN_ROWS)
+        if n_rows >= len(self.y_train):
+            return self.X_train, self.y_train
+
+        rows, _ = sklearn.model_selection.train_test_split(np.arange(len(self.y_train)), train_size=n_rows,
+                                                           stratify=self.y_train, random_state=random_state)
+        rows.sort()
+        return take_rows(self.X_train, rows), self.y_train[rows]
+
+    @property
+    def sample_report(self):
+        return {"search_rows": len(self.y_search), "training_rows": len(self.y_train)}
+
+    def _select_columns(self, X, columns):
+        return X[:, self.feature_names.get_indexer(columns)]
 
     def train_model(self, best_columns = None):
 
-        if self.checked:
-            self.search = GridSearch()
+        if best_columns is not None and len(best_columns) > 0 and self.search is not None and self.warm_start_budget > 0:
+            # the best params barely move on the selected columns, search only around the first result
+            self.search = NeighbourhoodSearch(self.search.get_best_params(), self.search.get_cv_results(),
+                                              budget=self.warm_start_budget, cv=self.folds, n_jobs=self.n_jobs,
+                                              time_budget=self.time_budget, estimator=self.estimator)
         else:
-            self.search = RandomSearch()
+            self.search = SEARCHES[self.search_type](cv=self.folds, n_jobs=self.n_jobs, time_budget=self.time_budget,
+                                                     estimator=self.estimator)
 
         if best_columns is not None and len(best_columns) > 0:
-            X_train = self.X_train[best_columns]
-            X_test = self.X_test[best_columns]
+            X_train = training_array(self._select_columns(self.X_train, best_columns))
+            X_search = X_train
+            if self.X_search is not self.X_train:
+                X_search = training_array(self._select_columns(self.X_search, best_columns))
+            X_test = self._select_columns(self.X_test, best_columns)
+            self.used_features = pd.Index(best_columns)
         else:
+            X_search = self.X_search
             X_train = self.X_train
             X_test = self.X_test
+            self.used_features = self.feature_names
 
-        self.used_features = X_train.columns
-
-        self.search.fit(X_train, self.y_train)
+        with shared_memory_jobs():
+            self.search.fit(X_search, self.y_search)
         self.model = self.search.get_best_model()
+        if len(self.y_search) < len(self.y_train):
+            # only the chosen configuration sees every training row
+            self.model = clone(self.model).fit(X_train, self.y_train)
+        self.search_reports.append(self.search.get_report())
         y_predict = self.model.predict(X_test)
+        if self.bin_mapper is not None:
+            # from here on the model is read and applied on feature values, not bin codes
+            thresholds_to_values(self.model.tree_, [self.bin_mapper.edges_[i]
+                                                    for i in self.feature_names.get_indexer(self.used_features)])
 
-        if len(self.y.unique()) == 2:
+        if len(np.unique(self.y)) == 2:
             average = 'binary'
         else:
             average = 'weighted'
@@ -50,16 +169,10 @@ class ModelTrainer:
 
 
     def find_best_attributes(self):
-        sfs = SequentialFeatureSelector(
-            self.model,
-            direction="backward",
-            n_features_to_select="auto",
-            scoring="accuracy",
-            cv=5,
-            n_jobs=1
-        )
-        sfs.fit(self.X_train,self.y_train)
-        selected_columns = self.X.columns[sfs.get_support()]
+        selector = SELECTORS[self.selection_type](self.model, len(self.feature_names), self.folds, self.n_jobs)
+        with shared_memory_jobs():
+            selector.fit(self.X_search, self.y_search)
+        selected_columns = self.feature_names[selector.get_support()]
 
         return selected_columns
 
@@ -0,0 +1,93 @@
+import itertools
+import os
+
+import numpy as np
+from sklearn.model_selection import GridSearchCV, ParameterGrid
+
+from services.ParameterSearch import ParameterSearch, SEARCH_TIME_BUDGET
+
+WARM_START_BUDGET = int(os.getenv("WARM_START_BUDGET", "10"))
+
+
+def neighbours(value):
+    if value is None or isinstance(value, bool):
+        return [value]
+    if isinstance(value, (int, np.integer)):
+        return sorted({max(1, int(value) - 1), int(value), int(value) + 1})
+    if value == 0:
+        return [0.0]
+    return [value / 2, float(value), value * 2]
+
+
+def params_key(params):
+    return tuple(sorted(params.items()))
+
+
+def previous_scores(cv_results):
+    """Mean CV score of each candidate of an earlier search, from its last (full data) round."""
+    keep = np.ones(len(cv_results["params"]), dtype=bool)
+    if "iter" in cv_results:
+        keep = np.asarray(cv_results["iter"]) == np.max(cv_results["iter"])
+    return {
+        params_key(params): (mean, std)
+        for params, mean, std, kept in zip(cv_results["params"], cv_results["mean_test_score"],
+                                           cv_results["std_test_score"], keep)
+        if kept
+    }
+
+
+def neighbourhood(best_params, cv_results=None, budget=WARM_START_BUDGET):
+    """Candidates around the best params of an earlier search, closest first.
+
+    Neighbours the earlier search already scored worse than the best by more than its standard
+    deviation are skipped.
+    """
+    names = sorted(best_params)
+    values = [neighbours(best_params[name]) for name in names]
+    centers = [options.index(best_params[name]) for name, options in zip(names, values)]
+
+    scores = previous_scores(cv_results) if cv_results is not None else {}
+    best_mean, best_std = scores.get(params_key(best_params), (None, 0.0))
+
+    candidates = []
+    for combination in itertools.product(*[range(len(options)) for options in values]):
+        params = {name: options[i] for name, options, i in zip(names, values, combination)}
+        previous = scores.get(params_key(params))
+        if previous is not None and best_mean is not None and previous[0] < best_mean - best_std:
+            continue
+        distance = sum(abs(i - center) for i, center in zip(combination, centers))
+        candidates.append((distance, params))
+
+    candidates.sort(key=lambda candidate: candidate[0])
+    return [params for _, params in candidates[:budget]]
+
+
+class NeighbourhoodSearch(ParameterSearch):
+    """Warm-started search: only the closest neighbours of an earlier search's best params are tried."""
+
+    def __init__(self, best_params, cv_results=None, budget=WARM_START_BUDGET, cv=5, scoring='accuracy', n_jobs=1,
+                 time_budget=SEARCH_TIME_BUDGET, estimator=None):
+        super().__init__(time_budget=time_budget, estimator=estimator)
+        self.param_grid = [
+            {name: [value] for name, value in params.items()}
+            for params in neighbourhood(best_params, cv_results, budget)
+        ]
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+
+    def candidates(self):
+        return list(ParameterGrid(self.param_grid))
+
+    def fit(self, X, y):
+        if self.time_budget is not None:
+            return self.fit_within_budget(X, y)
+
+        self.search = GridSearchCV(
+            estimator=self.estimator,
+            param_grid=self.param_grid,
+            cv=self.cv,
+            scoring=self.scoring,
+            n_jobs=self.n_jobs
+        )
+        self.search.fit(X, y)
@@ -0,0 +1,70 @@
+import math
+import os
+from contextlib import contextmanager
+
+from joblib import parallel_config
+
+# set to the celery worker's --concurrency, the solo pool runs one task at a time
+WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", "1"))
+SEARCH_N_JOBS = int(os.getenv("SEARCH_N_JOBS", "0"))
+PARALLEL_MIN_CELLS = int(os.getenv("PARALLEL_MIN_CELLS", str(200_000)))
+# arrays above this size are memory-mapped into the job processes instead of pickled
+MMAP_MIN_BYTES = "1M"
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def cgroup_cpu_limit():
+    try:
+        with open(CGROUP_V2_CPU_MAX) as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(CGROUP_V1_CPU_QUOTA) as f:
+            quota = int(f.read())
+        with open(CGROUP_V1_CPU_PERIOD) as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.floor(limit)))
+    return cpus
+
+
+def worker_n_jobs(concurrency=WORKER_CONCURRENCY):
+    """Cores one task may use, the container's quota split between the tasks the worker runs at once."""
+    if SEARCH_N_JOBS > 0:
+        return SEARCH_N_JOBS
+    return max(1, available_cpus() // max(concurrency, 1))
+
+
+def n_jobs_for(X):
+    n_rows, n_columns = X.shape
+    if n_rows * n_columns < PARALLEL_MIN_CELLS:
+        # starting processes costs more than a search over a small matrix
+        return 1
+    return worker_n_jobs()
+
+
+@contextmanager
+def shared_memory_jobs():
+    with parallel_config(backend="loky", max_nbytes=MMAP_MIN_BYTES, mmap_mode="r", inner_max_num_threads=1):
+        yield
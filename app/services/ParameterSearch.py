@@ -1,10 +1,102 @@
+import os
+from enum import Enum
+from time import perf_counter
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.model_selection import cross_val_score
+from sklearn.tree import DecisionTreeClassifier
+
+# wall-clock seconds per search, unset means unbounded; the feature selection is never bounded
+SEARCH_TIME_BUDGET = float(os.getenv("SEARCH_TIME_BUDGET_SECONDS", "0")) or None
+
+
+class SearchType(str, Enum):
+    GRID = "grid"
+    RANDOM = "random"
+    HALVING = "halving"
+    PRUNING = "pruning"
+
+
+def parse_search_type(value):
+    # requests from before the enum sent a bool: true for the grid, false for random search
+    if isinstance(value, bool):
+        return SearchType.GRID if value else SearchType.RANDOM
+    return SearchType(value)
+
+
+class SearchResult:
+    """Outcome of a search that does not run through an sklearn *SearchCV, with the same attribute names."""
+
+    def __init__(self, best_estimator, best_params, best_score, cv_results=None):
+        self.best_estimator_ = best_estimator
+        self.best_params_ = best_params
+        self.best_score_ = best_score
+        if cv_results is not None:
+            self.cv_results_ = cv_results
+
+
 class ParameterSearch:
-    def __init__(self):
+    def __init__(self, time_budget=SEARCH_TIME_BUDGET, estimator=None):
         self.search = None
+        self.estimator = estimator if estimator is not None else DecisionTreeClassifier(random_state=0)
+        self.time_budget = time_budget
+        self.report = None
 
     def fit(self, X, y):
         raise NotImplementedError
 
+    def candidates(self):
+        """Parameter sets in the order a time-budgeted search evaluates them, most informative first."""
+        raise NotImplementedError
+
+    def score_candidates(self, parallel, candidates, X, y, cv, deadline, min_scored=1):
+        """CV scores of the candidates, one batch per round of jobs until the deadline passes.
+
+        The budget is checked between batches, at least min_scored candidates are scored whatever the time.
+        """
+        batch_size = effective_n_jobs(self.n_jobs)
+        scores = []
+        while len(scores) < len(candidates) and (len(scores) < min_scored or perf_counter() < deadline):
+            batch = candidates[len(scores):len(scores) + batch_size]
+            scores += parallel(delayed(cross_val_score)(clone(self.estimator).set_params(**params), X, y,
+                                                        cv=cv, scoring=self.scoring) for params in batch)
+        return scores
+
+    def fit_within_budget(self, X, y):
+        """Score candidates until the time budget runs out, then refit the best so far."""
+        deadline = perf_counter() + self.time_budget
+        candidates = self.candidates()
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            scores = self.score_candidates(parallel, candidates, X, y, self.cv, deadline)
+        evaluated = candidates[:len(scores)]
+        means = np.array([fold_scores.mean() for fold_scores in scores])
+
+        best = int(np.argmax(means))
+        best_estimator = clone(self.estimator).set_params(**evaluated[best]).fit(X, y)
+        cv_results = {"params": evaluated, "mean_test_score": means,
+                      "std_test_score": np.array([fold_scores.std() for fold_scores in scores])}
+        self.search = SearchResult(best_estimator, evaluated[best], float(means[best]), cv_results)
+        self.report = self._make_report(len(evaluated), len(candidates))
+
+    def _make_report(self, evaluated, total, stopped_early=None):
+        return {
+            "candidates_evaluated": evaluated,
+            "candidates_total": total,
+            "time_budget": self.time_budget,
+            "stopped_early": evaluated < total if stopped_early is None else stopped_early,
+        }
+
+    def get_report(self):
+        if self.search is None:
+            raise ValueError("The model has not been trained")
+        if self.report is not None:
+            return self.report
+        # halving searches list a candidate once per round it survived
+        n_candidates = getattr(self.search, "n_candidates_", [len(self.search.cv_results_["params"])])[0]
+        return self._make_report(n_candidates, n_candidates)
+
     def get_best_model(self):
         if self.search is None:
             raise ValueError("The model has not been trained. First, call .fit(X, y).")
@@ -15,6 +107,11 @@ class ParameterSearch:
             raise ValueError("The model has not been trained")
         return self.search.best_params_
 
+    def get_cv_results(self):
+        if self.search is None:
+            raise ValueError("The model has not been trained")
+        return getattr(self.search, "cv_results_", None)
+
     def get_validation_score(self):
         if self.search is None:
             raise ValueError("Model nie został wytrenowany.")
@@ -1,5 +1,7 @@
 from graphviz import Source
 
+from services.GraphRenderer import render_dot
+
 
 class PrintGraph:
     def __init__(self, clf, feature_names, class_names, all_feature_names=None):
@@ -22,59 +24,69 @@ class PrintGraph:
                 categories.setdefault(base, set()).add(cat)
         return categories
 
-    def _recurse(self, node, parent=None, parent_label=None, allowed_categories_map=None):
-        if allowed_categories_map is None:
-            allowed_categories_map = {b: cats.copy() for b, cats in self.base_categories.items()}
-
-        if self.clf.tree_.feature[node] != -2:
-            feat = self.feature_names[self.clf.tree_.feature[node]]
-            base, category = self._split_feature(feat)
-            threshold = self.clf.tree_.threshold[node]
-            left = self.clf.tree_.children_left[node]
-            right = self.clf.tree_.children_right[node]
-
-            self.dot_str += f'"{node}" [label="{base}\n≤ {threshold:.2f}"];\n'
-            if parent is not None:
-                self.dot_str += f'"{parent}" -> "{node}" [label="{parent_label}"];\n'
-
-            if category and abs(threshold - 0.5) < 1e-5:
-                allowed_left = {k: v.copy() for k, v in allowed_categories_map.items()}
-                allowed_right = {k: v.copy() for k, v in allowed_categories_map.items()}
-
-                allowed_left[base].discard(category)
-                allowed_right[base] = {category}
-
-                cats = sorted(allowed_left[base])
-                if len(cats) == 0:
-                    left_label = f"{base} ≠ {category}"
-                elif len(cats) == 1:
-                    left_label = f"{cats[0]}"
+    def _walk(self, parts):
+        tree = self.clf.tree_
+        features = tree.feature.tolist()
+        thresholds = tree.threshold.tolist()
+        children_left = tree.children_left.tolist()
+        children_right = tree.children_right.tolist()
+        leaf_classes = tree.value.reshape(tree.node_count, -1).argmax(axis=1).tolist()
+        split_names = {}
+
+        # category sets are never changed in place, so a split only copies the dict and shares the sets
+        root_categories = {b: frozenset(cats) for b, cats in self.base_categories.items()}
+        stack = [(0, None, None, root_categories)]
+        while stack:
+            node, parent, parent_label, allowed_categories_map = stack.pop()
+
+            if features[node] != -2:
+                if features[node] not in split_names:
+                    split_names[features[node]] = self._split_feature(self.feature_names[features[node]])
+                base, category = split_names[features[node]]
+                threshold = thresholds[node]
+
+                parts.append(f'"{node}" [label="{base}\n≤ {threshold:.2f}"];\n')
+                if parent is not None:
+                    parts.append(f'"{parent}" -> "{node}" [label="{parent_label}"];\n')
+
+                if category and abs(threshold - 0.5) < 1e-5:
+                    allowed_left = {**allowed_categories_map, base: allowed_categories_map[base] - {category}}
+                    allowed_right = {**allowed_categories_map, base: frozenset([category])}
+
+                    cats = sorted(allowed_left[base])
+                    if len(cats) == 0:
+                        left_label = f"{base} ≠ {category}"
+                    elif len(cats) == 1:
+                        left_label = f"{cats[0]}"
+                    else:
+                        left_label = f"{base} in {{{', '.join(cats)}}}"
+                    right_label = f"{category}"
                 else:
-                    left_label = f"{base} in {{{', '.join(cats)}}}"
-                right_label = f"{category}"
+                    left_label = f"≤ {threshold:.2f}"
+                    right_label = f"> {threshold:.2f}"
+                    allowed_left = allowed_right = allowed_categories_map
 
-                self._recurse(left, node, left_label, allowed_left)
-                self._recurse(right, node, right_label, allowed_right)
+                # the left subtree is written first
+                stack.append((children_right[node], node, right_label, allowed_right))
+                stack.append((children_left[node], node, left_label, allowed_left))
             else:
-                left_label = f"≤ {threshold:.2f}"
-                right_label = f"> {threshold:.2f}"
-                self._recurse(left, node, left_label, allowed_categories_map)
-                self._recurse(right, node, right_label, allowed_categories_map)
-        else:
-            value = self.clf.tree_.value[node]
-            class_index = int(value.argmax())
-            label = self.class_names[class_index]
-            self.dot_str += f'"{node}" [label="{label}", style=filled, fillcolor="lightgreen"];\n'
-            if parent is not None:
-                self.dot_str += f'"{parent}" -> "{node}" [label="{parent_label}"];\n'
+                label = self.class_names[leaf_classes[node]]
+                parts.append(f'"{node}" [label="{label}", style=filled, fillcolor="lightgreen"];\n')
+                if parent is not None:
+                    parts.append(f'"{parent}" -> "{node}" [label="{parent_label}"];\n')
 
     def to_dot(self):
-        self.dot_str = 'digraph Tree {\n'
-        self.dot_str += 'node [shape=box, style="rounded, filled", color="lightblue", fontname="helvetica"];\n'
-        self._recurse(0)
-        self.dot_str += '}'
+        parts = ['digraph Tree {\n',
+                 'node [shape=box, style="rounded, filled", color="lightblue", fontname="helvetica"];\n']
+        self._walk(parts)
+        parts.append('}')
+        self.dot_str = ''.join(parts)
         return self.dot_str
 
+    def render(self, format_file=None):
+        """Obraz grafu w pamięci, bez plików tymczasowych."""
+        return render_dot(self.to_dot(), format_file)
+
     def save(self, filename="tree", format_file="png"):
         """Zapisz graf do pliku."""
         dot = self.to_dot()
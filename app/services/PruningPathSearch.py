@@ -0,0 +1,80 @@
+from time import perf_counter
+
+import numpy as np
+
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, check_cv
+
+from services.CostComplexityPruning import candidate_alphas, pruned_accuracy, pruning_thresholds
+from services.ParameterSearch import ParameterSearch, SearchResult, SEARCH_TIME_BUDGET
+
+MAX_ALPHAS = 100
+
+
+def score_setting(estimator, X, y, folds, params, max_alphas):
+    """Mean CV accuracy along the pruning path of one structural setting, one grown tree per fold."""
+    tree = clone(estimator).set_params(**params).fit(X, y)
+    alphas = candidate_alphas(pruning_thresholds(tree.tree_), max_alphas)
+
+    scores = np.zeros(len(alphas))
+    for train, test in folds:
+        # X is an ndarray or a CSC matrix, both index rows directly
+        fold_tree = clone(estimator).set_params(**params).fit(X[train], y[train])
+        scores += pruned_accuracy(fold_tree, X[test], y[test],
+                                  pruning_thresholds(fold_tree.tree_), alphas)
+    return alphas, scores / len(folds)
+
+
+class PruningPathSearch(ParameterSearch):
+    """Grid over the tree structure, ccp_alpha read off the cost complexity pruning path.
+
+    Pruning happens after a tree is grown, so every alpha on the path is scored by pruning the
+    fold's tree instead of fitting it again.
+    """
+
+    def __init__(self, cv=5, n_jobs=1, max_alphas=MAX_ALPHAS, time_budget=SEARCH_TIME_BUDGET, estimator=None):
+        super().__init__(time_budget=time_budget, estimator=estimator)
+        self.param_grid = {
+            'max_depth': [2, 3, 4, 5, None],
+            'min_samples_leaf': [1, 5, 10]
+        }
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.max_alphas = max_alphas
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        folds = list(check_cv(self.cv, y, classifier=True).split(X, y))
+        settings = self.candidates()
+
+        if self.time_budget is None:
+            results = Parallel(n_jobs=self.n_jobs)(
+                delayed(score_setting)(self.estimator, X, y, folds, params, self.max_alphas) for params in settings
+            )
+        else:
+            # one batch of settings per round of jobs, the budget is checked between batches
+            deadline = perf_counter() + self.time_budget
+            batch_size = effective_n_jobs(self.n_jobs)
+            results = []
+            with Parallel(n_jobs=self.n_jobs) as parallel:
+                while len(results) < len(settings) and (not results or perf_counter() < deadline):
+                    batch = settings[len(results):len(results) + batch_size]
+                    results += parallel(delayed(score_setting)(self.estimator, X, y, folds, params, self.max_alphas) for params in batch)
+
+        best_score, best_params = -np.inf, None
+        for params, (alphas, scores) in zip(settings, results):
+            # on ties the larger alpha wins, it gives the smaller tree
+            i = len(scores) - 1 - np.argmax(scores[::-1])
+            if scores[i] > best_score:
+                best_score, best_params = scores[i], {**params, 'ccp_alpha': float(alphas[i])}
+
+        best_estimator = clone(self.estimator).set_params(**best_params).fit(X, y)
+        self.search = SearchResult(best_estimator, best_params, float(best_score))
+        self.report = self._make_report(len(results), len(settings))
+
+    def candidates(self):
+        grid = list(ParameterGrid(self.param_grid))
+        if self.time_budget is None:
+            return grid
+        return [grid[i] for i in np.random.default_rng(0).permutation(len(grid))]
@@ -1,12 +1,11 @@
-from .ParameterSearch import ParameterSearch
-from sklearn.model_selection import RandomizedSearchCV
-from sklearn.tree import DecisionTreeClassifier
+from .ParameterSearch import ParameterSearch, SEARCH_TIME_BUDGET
+from sklearn.model_selection import ParameterSampler, RandomizedSearchCV
 from scipy.stats import randint, uniform
 
 class RandomSearch(ParameterSearch):
 
-    def __init__(self, n_iter = 20, cv=5, scoring='accuracy'):
-        super().__init__()
+    def __init__(self, n_iter = 20, cv=5, scoring='accuracy', n_jobs=1, time_budget=SEARCH_TIME_BUDGET, estimator=None):
+        super().__init__(time_budget=time_budget, estimator=estimator)
         self.param_distributions = {
             'max_depth': randint(2, 10),
             'min_samples_leaf': randint(1, 20),
@@ -16,17 +15,25 @@ class RandomSearch(ParameterSearch):
         self.n_inter = n_iter
         self.cv = cv
         self.scoring = scoring
+        self.n_jobs = n_jobs
 
 
+    def candidates(self):
+        # the same draws RandomizedSearchCV makes
+        return list(ParameterSampler(self.param_distributions, n_iter=self.n_inter, random_state=1))
+
     def fit(self, X, y):
+        if self.time_budget is not None:
+            return self.fit_within_budget(X, y)
+
         self.search = RandomizedSearchCV(
-            estimator=DecisionTreeClassifier(random_state=0),
+            estimator=self.estimator,
             param_distributions=self.param_distributions,
             n_iter=self.n_inter,  # liczba losowań (im więcej, tym lepiej)
             cv=self.cv,
             scoring=self.scoring,
             random_state=1,
-            n_jobs=1
+            n_jobs=self.n_jobs
         )
         self.search.fit(X, y)
 
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import time
+
+from services.ChunkedPreprocessor import OUT_OF_CORE_THRESHOLD_BYTES, TRAIN_MEMORY_BYTES
+from services.DataPreprocessor import APPROXIMATE_PROFILE_MIN_ROWS, SPARSE_THRESHOLD_BYTES
+from services.HistogramTree import TREE_ENGINE
+from services.ModelTrainer import SEARCH_SAMPLE_CELLS, SUBSAMPLE_MIN_ROWS
+from services.NeighbourhoodSearch import WARM_START_BUDGET
+from services.ParameterSearch import SEARCH_TIME_BUDGET
+
+CACHE_VERSION = 2
+CACHE_PREFIX = "analysis:cache"
+CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "500"))
+CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def analysis_settings():
+    """Worker settings that change the trained model, a result is only reused under the same ones."""
+    return {
+        "tree_engine": TREE_ENGINE.value,
+        "time_budget": SEARCH_TIME_BUDGET,
+        "subsample_min_rows": SUBSAMPLE_MIN_ROWS,
+        "search_sample_cells": SEARCH_SAMPLE_CELLS,
+        "warm_start_budget": WARM_START_BUDGET,
+        "sparse_threshold_bytes": SPARSE_THRESHOLD_BYTES,
+        "approximate_profile_min_rows": APPROXIMATE_PROFILE_MIN_ROWS,
+        "out_of_core_threshold_bytes": OUT_OF_CORE_THRESHOLD_BYTES,
+        "train_memory_bytes": TRAIN_MEMORY_BYTES,
+    }
+
+
+def analysis_cache_key(content_hash, **params):
+    payload = json.dumps({"version": CACHE_VERSION, "dataset": content_hash, "settings": analysis_settings(),
+                          **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def analysis_key(temp_file, **params):
+    if temp_file is None or temp_file.dataset is None:
+        return None
+    return analysis_cache_key(temp_file.dataset.content_hash, **params)
+
+
+class ResultCache:
+    """Analysis results in redis, bounded by entry count (LRU) and a sliding TTL."""
+
+    def __init__(self, redis_client, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.index_key = f"{CACHE_PREFIX}:index"
+
+    def _entry_key(self, key):
+        return f"{CACHE_PREFIX}:{key}"
+
+    def get(self, key):
+        raw = self.redis.get(self._entry_key(key))
+        if raw is None:
+            self.redis.zrem(self.index_key, key)
+            return None
+
+        self.redis.expire(self._entry_key(key), self.ttl)
+        self.redis.zadd(self.index_key, {key: time.time()})
+        return json.loads(raw)
+
+    def set(self, key, result):
+        self.redis.set(self._entry_key(key), json.dumps(result), ex=self.ttl)
+        self.redis.zadd(self.index_key, {key: time.time()})
+        self._evict()
+
+    def _evict(self):
+        overflow = self.redis.zcard(self.index_key) - self.max_entries
+        if overflow <= 0:
+            return
+
+        oldest = self.redis.zrange(self.index_key, 0, overflow - 1)
+        self.redis.delete(*[self._entry_key(key.decode() if isinstance(key, bytes) else key) for key in oldest])
+        self.redis.zrem(self.index_key, *oldest)
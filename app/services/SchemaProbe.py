@@ -0,0 +1,98 @@
+import pandas as pd
+import pyarrow as pa
+
+from services.DataPreprocessor import (likely_id_mask, validate_column_names, validate_shape,
+                                       validate_categorical_columns)
+from services.DatasetArtifact import ArtifactWriter, open_csv_batches
+from services.HyperLogLog import HyperLogLog
+
+SAMPLE_ROWS = 1000
+CHUNK_ROWS = 100_000
+
+
+def merge_dtypes(current, new):
+    if current is None or current == new:
+        return new
+    if "object" in (str(current), str(new)) or "bool" in (str(current), str(new)):
+        return pd.api.types.pandas_dtype("object")
+    return pd.api.types.pandas_dtype("float64")
+
+
+class SchemaProbe:
+
+    def __init__(self, path, artifact_path=None, sample_rows=SAMPLE_ROWS, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.sample = pd.read_csv(path, nrows=sample_rows)
+        self.columns = list(self.sample.columns)
+        self.chunk_rows = chunk_rows
+        self.artifact_path = None
+        self.dropped_ids = []
+
+        if artifact_path is not None:
+            try:
+                self._scan_to_artifact(artifact_path)
+                self.artifact_path = artifact_path
+            except pa.ArrowException:
+                # pandas is the reference parser, it reports the error or reads what arrow refused
+                pass
+
+        if self.artifact_path is None:
+            self._scan_chunks()
+
+        if self.row_count <= len(self.sample):
+            # the whole file fits in the sample, exact counts are free
+            self.cardinality = self.sample.nunique().to_dict()
+        else:
+            self.cardinality = {col: sketch.count() for col, sketch in self._sketches.items()}
+
+    def _reset(self):
+        self.row_count = 0
+        self.dtypes = dict.fromkeys(self.columns)
+        self._sketches = {col: HyperLogLog() for col in self.columns}
+
+    def _update(self, col, values: pd.Series):
+        self.dtypes[col] = merge_dtypes(self.dtypes[col], values.dtype)
+        self._sketches[col].add(values)
+
+    def _scan_chunks(self):
+        self._reset()
+        for chunk in pd.read_csv(self.path, chunksize=self.chunk_rows):
+            self.row_count += len(chunk)
+            for col in self.columns:
+                self._update(col, chunk[col])
+
+    def _scan_to_artifact(self, artifact_path):
+        self._reset()
+        string_columns = [col for col in self.columns if self.sample[col].dtype == "object"]
+        reader = open_csv_batches(self.path, self.columns, string_columns)
+        if any(pa.types.is_null(field.type) for field in reader.schema):
+            raise pa.ArrowInvalid("Column without values in the first block")
+        writer = ArtifactWriter(artifact_path, reader.schema)
+        try:
+            for batch in reader:
+                writer.write(batch)
+                self.row_count += batch.num_rows
+                for col, values in zip(self.columns, batch.columns):
+                    self._update(col, values.to_pandas())
+            writer.close()
+        except BaseException:
+            writer.discard()
+            raise
+
+    def validate(self):
+        validate_column_names(self.columns)
+        validate_shape(self.row_count, len(self.columns))
+
+        mask = likely_id_mask(self.columns, pd.Series(self.cardinality)[self.columns].to_numpy(), self.row_count,
+                              pd.Series(self.dtypes)[self.columns])
+        self.dropped_ids = [col for col, is_id in zip(self.columns, mask) if is_id]
+
+        categorical_columns = [col for col in self.show_file_columns()
+                               if str(self.dtypes[col]) in ["object", "category"]]
+        validate_categorical_columns(categorical_columns)
+
+    def dtype_hints(self):
+        return {col: str(dtype) for col, dtype in self.dtypes.items()}
+
+    def show_file_columns(self):
+        return [col for col in self.columns if col not in self.dropped_ids]
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+from services.CostComplexityPruning import TREE_LEAF
+
+# deeper trees are walked by a loop, nested ifs this deep come close to the parser's limit
+MAX_GENERATED_DEPTH = 60
+MISSING_CODE = -1
+UNKNOWN_CODE = -2
+
+
+def float32_cut(threshold):
+    """(cut, inclusive) such that float32(x) <= threshold exactly when x <= cut (inclusive) or x < cut.
+
+    sklearn compares features after casting them to float32, a float64 row value is compared to the
+    midpoint between the two float32 neighbours around the threshold instead.
+    """
+    below = np.float32(threshold)
+    if below > threshold:
+        below = np.nextafter(below, np.float32(-np.inf))
+    above = np.nextafter(below, np.float32(np.inf))
+    cut = float(below) / 2 + float(above) / 2
+    # a value halfway rounds to the float32 with the even mantissa
+    inclusive = int(np.array(below).view(np.uint32)) % 2 == 0
+    return cut, inclusive
+
+
+def category_codes(values, categories):
+    """Position of each value among the categories, MISSING_CODE for missing and UNKNOWN_CODE for unseen values."""
+    values = pd.Series(values)
+    missing = values.isna().to_numpy()
+    codes = pd.Categorical(values.astype(str).where(~missing), categories=categories).codes.astype(np.int32)
+    codes[(codes < 0) & ~missing] = UNKNOWN_CODE
+    codes[missing] = MISSING_CODE
+    return codes
+
+
+class CompiledTree:
+    """A pipeline's tree flattened to split tests on the raw columns.
+
+    A one-hot split "indicator <= 0.5" becomes "value != category", so rows are never expanded into
+    indicators. Batches are walked level by level with numpy, single rows by generated Python.
+    """
+
+    def __init__(self, pipeline):
+        tree = pipeline.model.tree_
+        self.classes = list(pipeline.classes)
+        self.columns = pipeline.input_columns
+        self.categories = pipeline.category_texts
+        self.children_left = tree.children_left
+        self.children_right = tree.children_right
+        self.leaf_class = tree.value[:, 0, :].argmax(axis=1)
+
+        n_nodes = tree.node_count
+        self.column = np.zeros(n_nodes, dtype=np.intp)
+        self.threshold = np.zeros(n_nodes, dtype=np.float64)
+        self.categorical = np.zeros(n_nodes, dtype=bool)
+        # sklearn sends missing values to one side chosen in training, trees without the array send them right
+        self.missing_left = np.asarray(getattr(tree, "missing_go_to_left", np.zeros(n_nodes, dtype=bool)), dtype=bool)
+
+        for node in np.flatnonzero(tree.children_left != TREE_LEAF):
+            col, category = pipeline.encodings[tree.feature[node]]
+            self.column[node] = self.columns.index(col)
+            if category is None:
+                self.threshold[node] = tree.threshold[node]
+            else:
+                self.categorical[node] = True
+                self.threshold[node] = (MISSING_CODE if pd.isna(category)
+                                        else self.categories[col].index(str(category)))
+
+        self.predict_row = self._generate() if tree.max_depth <= MAX_GENERATED_DEPTH else self._walk_row
+
+    def _check_columns(self, columns):
+        missing = [col for col in self.columns if col not in columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    def encode(self, frame):
+        """The raw columns as one float32 matrix, categorical columns as category codes."""
+        self._check_columns(frame.columns)
+        Z = np.empty((len(frame), len(self.columns)), dtype=np.float32, order="F")
+        for j, col in enumerate(self.columns):
+            if col in self.categories:
+                Z[:, j] = category_codes(frame[col], self.categories[col])
+            else:
+                try:
+                    Z[:, j] = pd.to_numeric(frame[col])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Column '{col}' must be numeric.")
+        return Z
+
+    def predict_codes(self, frame):
+        Z = self.encode(frame)
+        rows = np.arange(len(frame))
+        nodes = np.zeros(len(frame), dtype=np.intp)
+        leaves = nodes.copy()
+        while len(rows):
+            internal = self.children_left[nodes] != TREE_LEAF
+            rows, nodes = rows[internal], nodes[internal]
+            values = Z[rows, self.column[nodes]]
+            threshold = self.threshold[nodes]
+            goes_left = np.where(self.categorical[nodes], values != threshold,
+                                 (values <= threshold) | (np.isnan(values) & self.missing_left[nodes]))
+            nodes = np.where(goes_left, self.children_left[nodes], self.children_right[nodes])
+            leaves[rows] = nodes
+        return self.leaf_class[leaves]
+
+    def predict(self, frame):
+        return [self.classes[code] for code in self.predict_codes(frame)]
+
+    def _row_values(self, row):
+        self._check_columns(row)
+        values = []
+        for col in self.columns:
+            value = row[col]
+            missing = value is None or value != value
+            if col in self.categories:
+                values.append(None if missing else str(value))
+            else:
+                try:
+                    values.append(float("nan") if missing else float(value))
+                except (TypeError, ValueError):
+                    raise ValueError(f"Column '{col}' must be numeric.")
+        return values
+
+    def _walk_row(self, row):
+        values = self._row_values(row)
+        node = 0
+        while self.children_left[node] != TREE_LEAF:
+            value = values[self.column[node]]
+            if self.categorical[node]:
+                code = int(self.threshold[node])
+                goes_left = value is not None if code == MISSING_CODE else value != self.categories[
+                    self.columns[self.column[node]]][code]
+            else:
+                goes_left = np.float32(value) <= self.threshold[node] or (value != value and self.missing_left[node])
+            node = self.children_left[node] if goes_left else self.children_right[node]
+        return self.classes[self.leaf_class[node]]
+
+    def _condition(self, node):
+        """Python test that sends a row to the node's left child."""
+        var = f"v{self.column[node]}"
+        if self.categorical[node]:
+            code = int(self.threshold[node])
+            if code == MISSING_CODE:
+                return f"{var} is not None"
+            return f"{var} != {self.categories[self.columns[self.column[node]]][code]!r}"
+        cut, inclusive = float32_cut(self.threshold[node])
+        if self.missing_left[node]:
+            return f"not {var} {'>' if inclusive else '>='} {cut!r}"
+        return f"{var} {'<=' if inclusive else '<'} {cut!r}"
+
+    def source(self):
+        lines = ["def predict_row(row):",
+                 f"    {', '.join(f'v{j}' for j in range(len(self.columns)))}{',' if len(self.columns) == 1 else ''} "
+                 f"= row_values(row)" if self.columns else "    pass"]
+        stack = [(0, 1)]
+        while stack:
+            node, depth = stack.pop()
+            indent = "    " * depth
+            if isinstance(node, str):
+                lines.append(indent + node)
+            elif self.children_left[node] == TREE_LEAF:
+                lines.append(f"{indent}return classes[{self.leaf_class[node]}]")
+            else:
+                lines.append(f"{indent}if {self._condition(node)}:")
+                stack += [(self.children_right[node], depth + 1), ("else:", depth), (self.children_left[node], depth + 1)]
+        return "\n".join(lines)
+
+    def _generate(self):
+        # a split of missing from present values has an infinite threshold
+        namespace = {"classes": self.classes, "row_values": self._row_values, "inf": np.inf}
+        exec(compile(self.source(), "<compiled tree>", "exec"), namespace)
+        return namespace["predict_row"]
@@ -58,4 +58,17 @@ def setup_and_teardown():
 def temp_storage(monkeypatch):
     with tempfile.TemporaryDirectory() as temp_dir:
         monkeypatch.setenv("STORAGE_DIR", temp_dir)
-        yield temp_dir
\ No newline at end of file
+        yield temp_dir
+
+def train_pipeline(data, target_column):
+    """A ModelPipeline around an unpruned tree fit on the whole frame, as an analysis stores it."""
+    from services.DataPreprocessor import DataPreprocessor
+    from services.ModelPipeline import ModelPipeline
+    from sklearn.tree import DecisionTreeClassifier
+
+    preprocessor = DataPreprocessor(data.copy())
+    X, y, feature_names = preprocessor.prepare_data(target_column)
+    model = DecisionTreeClassifier(random_state=0).fit(X, y)
+    return ModelPipeline(model, numeric_columns=preprocessor.numeric_columns, categories=preprocessor.categories,
+                         used_features=feature_names, classes=preprocessor.label_encoder.classes_.tolist(),
+                         target_column=target_column, bool_columns=preprocessor.bool_columns)
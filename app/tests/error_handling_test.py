@@ -6,8 +6,11 @@ import os
 
 import io
 
+import pandas as pd
+
 from models.temp_file_model import TempFile
-from tests.conftest import TestingSessionLocal, override_get_db
+from services.ModelStore import save_model
+from tests.conftest import TestingSessionLocal, override_get_db, train_pipeline
 from tests.test_api import logged_in_user
 from utils.auth import create_access_token
 from celery_app.tasks import analyse_data
@@ -252,3 +255,44 @@ def test_expired_access_token_allows_refresh(client,logged_in_user):
     response_refresh = client.post("/auth/refresh", headers={"Authorization": f"Bearer {refresh_token}"})
     assert response_refresh.status_code == 200
     assert response_refresh.json()["access_token"] != access_token
+
+def test_upload_too_large_file(client, logged_in_user, monkeypatch):
+    token, _ = logged_in_user
+    monkeypatch.setenv("MAX_UPLOAD_SIZE", "10")
+
+    fake_file = io.BytesIO(b"a,b\n" * 20)
+    response = client.post(
+        "/file/upload-csv/show_column",
+        files={"file": ("too_large.csv", fake_file, "text/csv")},
+        headers={"Authorization": f"Bearer {token['access_token']}"}
+    )
+    assert response.status_code == 413
+    assert response.json() == {"detail": "File too large"}
+
+def test_predict_csv_too_large_file(client, logged_in_user, monkeypatch):
+    token, _ = logged_in_user
+    data = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv"))
+    model = save_model(next(override_get_db()), train_pipeline(data, "Drug"), 1)
+    monkeypatch.setenv("MAX_UPLOAD_SIZE", "10")
+
+    fake_file = io.BytesIO(data.to_csv(index=False).encode())
+    response = client.post(
+        f"/model/{model.id}/predict-csv",
+        files={"file": ("too_large.csv", fake_file, "text/csv")},
+        headers={"Authorization": f"Bearer {token['access_token']}"}
+    )
+    assert response.status_code == 413
+    assert response.json() == {"detail": "File too large"}
+
+def test_upload_file_drops_id_columns(client, logged_in_user):
+    token, _ = logged_in_user
+
+    rows = "\n".join(f"{i},{'ab'[i % 2]},{i % 7}" for i in range(30))
+    fake_file = io.BytesIO(f"user_id,group,value\n{rows}\n".encode())
+    response = client.post(
+        "/file/upload-csv/show_column",
+        files={"file": ("ids.csv", fake_file, "text/csv")},
+        headers={"Authorization": f"Bearer {token['access_token']}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["columns"] == ["group", "value"]
@@ -2,11 +2,16 @@ from datetime import timezone, datetime
 
 import pytest
 import os
+import shutil
+import pandas as pd
 import routers.ws
 from anyio import sleep
 from celery_app.tasks import analyse_data
 from models.temp_file_model import TempFile
-from tests.conftest import override_get_db
+from services import DatasetStore
+from services.DatasetStore import dataset_dir, store_dataset
+from services.ModelStore import save_model
+from tests.conftest import override_get_db, train_pipeline
 
 
 def test_create_user(client):
@@ -208,8 +213,13 @@ def test_select_decision_column_and_generate_tree(logged_in_user, logout_before,
             )
 
         assert result is not None
-        expected_prefix = "iVBORw0KGgoAAAANSUhEUgAA"
-        assert result["image_base64"].startswith(expected_prefix)
+        response = client.get(
+            f"/graph/{result['graph_id']}",
+            headers={"Authorization": f"Bearer {token['access_token']}"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content.startswith(b"\x89PNG")
 
 @pytest.fixture
 def prepare_test_show_and_download_files(logged_in_user, uploaded_file_id,client):
@@ -292,3 +302,236 @@ def test_download_user_file(logout_before,prepare_test_show_and_download_files,
         assert "drug200.csv" in response.headers["content-disposition"]
 
 
+
+def test_upload_same_file_twice_is_stored_once(logged_in_user, client, temp_storage):
+    token, _ = logged_in_user
+    file_path = os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv")
+    file_path = os.path.abspath(file_path)
+
+    file_ids = []
+    for _ in range(2):
+        with open(file_path, "rb") as f:
+            response = client.post(
+                "/file/upload-csv/show_column",
+                files={"file": ("drug200.csv", f, "text/csv")},
+                headers={"Authorization": f"Bearer {token['access_token']}"}
+            )
+        assert response.status_code == 200
+        file_ids.append(response.json()["file_id"])
+
+    db = next(override_get_db())
+    files = db.query(TempFile).filter(TempFile.id.in_(file_ids)).all()
+    assert len(files) == 2
+    assert files[0].dataset_id == files[1].dataset_id
+    assert files[0].tmp_path == files[1].tmp_path
+    assert len([name for name in os.listdir(os.path.join(temp_storage, "datasets")) if name.endswith(".csv")]) == 1
+
+
+def test_concurrent_upload_keeps_first_stored_files(temp_storage, monkeypatch):
+    file_path = os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv")
+    db = next(override_get_db())
+
+    def upload():
+        tmp_path = os.path.join(dataset_dir(), f"upload-{len(os.listdir(dataset_dir()))}.csv")
+        shutil.copy(file_path, tmp_path)
+        return store_dataset(db, tmp_path, "same-content", os.path.getsize(tmp_path))
+
+    first = upload()
+    stored = set(os.listdir(dataset_dir()))
+    # the second upload looked for the content before the first one committed it
+    monkeypatch.setattr(DatasetStore, "_touch_dataset", lambda db, content_hash: None)
+    second = upload()
+
+    assert second.id == first.id
+    assert set(os.listdir(dataset_dir())) == stored
+
+def test_start_analysis_returns_cached_result(prepare_test_show_and_download_files, client):
+    token = prepare_test_show_and_download_files["token"]
+    file_path = os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv")
+    file_path = os.path.abspath(file_path)
+
+    with open(file_path, "rb") as f:
+        response_file = client.post(
+            "/file/upload-csv/show_column",
+            files={"file": ("drug200.csv", f, "text/csv")},
+            headers={"Authorization": f"Bearer {token['access_token']}"}
+        )
+
+    response = client.post(
+        "/file/start-analysis",
+        json={
+            "target_column": "Drug",
+            "file_id": response_file.json()["file_id"],
+            "type_search": True,
+            "save_file": False
+        },
+        headers={"Authorization": f"Bearer {token['access_token']}"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["cached"] is True
+    assert response.json()["result"] == prepare_test_show_and_download_files["response_data"]
+
+def run_analysis_task(file_id, **options):
+    db = next(override_get_db())
+    file = db.query(TempFile).filter(TempFile.id == file_id).first()
+    return analyse_data.run(
+        file_id=file.id,
+        tmp_path=file.tmp_path,
+        target_column="Drug",
+        save_file=False,
+        user_id=1,
+        original_filename=file.original_filename,
+        db=db,
+        **{"type_search": False, **options}
+    )
+
+
+@pytest.mark.parametrize("type_search,feature_selection,out_of_core", [
+    (False, "backward", True),
+    ("halving", "backward", False),
+    ("pruning", "importance", False),
+], ids=["random-out-of-core", "halving", "pruning-importance"])
+def test_analyse_data(uploaded_file_id, type_search, feature_selection, out_of_core, monkeypatch):
+    import celery_app.tasks
+    monkeypatch.setattr(celery_app.tasks.result_cache, "get", lambda key: None)
+    monkeypatch.setattr(celery_app.tasks, "use_out_of_core", lambda path: out_of_core)
+
+    def delay(graph_id):
+        raise ConnectionError("broker unavailable")
+
+    # a graph render that cannot be queued leaves the finished analysis published
+    monkeypatch.setattr(celery_app.tasks.render_graph, "delay", delay)
+
+    result = run_analysis_task(uploaded_file_id, type_search=type_search, feature_selection=feature_selection)
+
+    assert len(result["graph_id"]) == 64
+    assert float(result["full_model_metrics"]["accuracy"]) > 0.8
+    assert result["feature_selection"] == feature_selection
+    assert result["tree_engine"] == "sklearn"
+    assert set(result["timings"]) == {"search", "feature_selection", "retrain"}
+    assert result["search_report"]["full_model"]["candidates_evaluated"] > 0
+    assert result["memory_report"].get("out_of_core", False) is out_of_core
+    assert result["search_sample"]["training_rows"] == 140
+
+
+def test_analysis_cut_short_by_time_budget_is_not_reused(uploaded_file_id, monkeypatch):
+    from functools import partial
+    import celery_app.tasks
+    from models.trained_model import TrainedModel
+    from services.ModelTrainer import ModelTrainer
+    cached = []
+    monkeypatch.setattr(celery_app.tasks.result_cache, "get", lambda key: None)
+    monkeypatch.setattr(celery_app.tasks.result_cache, "set", lambda key, result: cached.append(key))
+    monkeypatch.setattr(celery_app.tasks, "ModelTrainer", partial(ModelTrainer, time_budget=1e-9))
+
+    result = run_analysis_task(uploaded_file_id)
+
+    assert result["search_report"]["full_model"]["stopped_early"] is True
+    assert cached == []
+    db = next(override_get_db())
+    assert db.query(TrainedModel).filter(TrainedModel.id == result["model_id"]).one().analysis_key is None
+
+
+def test_graph_rendered_once(logged_in_user, client, monkeypatch):
+    import celery_app.tasks
+    import services.GraphStore
+    token, _ = logged_in_user
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    graph_id = celery_app.tasks.graph_store.add('digraph Tree {\n0 [label="gini = 0.5"] ;\n}\n')
+    celery_app.tasks.graph_store.redis.delete(f"graph:{graph_id}:svg")
+
+    renders = []
+    render_dot = services.GraphStore.render_dot
+    monkeypatch.setattr(services.GraphStore, "render_dot",
+                        lambda dot_source, format_file: renders.append(format_file) or render_dot(dot_source, format_file))
+
+    for _ in range(2):
+        response = client.get(f"/graph/{graph_id}?format=svg", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/svg+xml"
+        assert b"<svg" in response.content
+    assert renders == ["svg"]
+
+    response = client.get(f"/graph/{graph_id}?format=dot", headers=headers)
+    assert response.text.startswith("digraph Tree {")
+
+    assert client.get(f"/graph/{graph_id}?format=gif", headers=headers).status_code == 400
+    assert client.get(f"/graph/{'0' * 64}", headers=headers).status_code == 404
+
+
+def test_predict_with_trained_model(logged_in_user, client):
+    token, _ = logged_in_user
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    data = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv"))
+    model = save_model(next(override_get_db()), train_pipeline(data, "Drug"), 1)
+
+    rows = data.drop(columns="Drug").head(50)
+    response = client.post(f"/model/{model.id}/predict", json={"rows": rows.to_dict(orient="records")},
+                           headers=headers)
+
+    assert response.status_code == 200, response.text
+    predictions = response.json()["predictions"]
+    assert predictions == data["Drug"].head(50).tolist()
+
+    response = client.post(f"/model/{model.id}/predict", json={"rows": [{"Age": 30}]}, headers=headers)
+    assert response.status_code == 400
+
+    with open(os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv"), "rb") as f:
+        response = client.post(f"/model/{model.id}/predict-csv", files={"file": ("drug200.csv", f, "text/csv")},
+                               headers=headers)
+    assert response.status_code == 200, response.text
+    lines = response.text.splitlines()
+    assert lines[0] == "Drug"
+    assert lines[1:51] == predictions
+    assert len(lines) == len(data) + 1
+
+    response = client.post("/model/999/predict", json={"rows": [{"Age": 30}]}, headers=headers)
+    assert response.status_code == 404
+
+
+def test_predict_csv_reads_bool_features(logged_in_user, client):
+    token, _ = logged_in_user
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    data = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv"))
+    data["Insured"] = data.index < 150
+    # only the bool column tells the uninsured class apart
+    data["Drug"] = data["Drug"].where(data["Insured"], "none")
+    pipeline = train_pipeline(data, "Drug")
+    assert "Insured" in pipeline.input_columns
+    model = save_model(next(override_get_db()), pipeline, 1)
+
+    source = data.drop(columns="Drug").to_csv(index=False).encode()
+    response = client.post(f"/model/{model.id}/predict-csv", files={"file": ("score.csv", source, "text/csv")},
+                           headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.text.splitlines()[1:] == data["Drug"].tolist()
+
+
+def test_trained_model_belongs_to_its_user(prepare_test_show_and_download_files, client):
+    owner_token = prepare_test_show_and_download_files["token"]
+    model_id = prepare_test_show_and_download_files["response_data"]["model_id"]
+    client.post("/auth/register", json={"email": "other@example.com", "password": "Password1!"})
+    token = client.post("/auth/login", json={"email": "other@example.com", "password": "Password1!"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    rows = {"rows": [{"Age": 30, "Sex": "F", "BP": "HIGH", "Cholesterol": "HIGH", "Na_to_K": 20.0}]}
+
+    assert client.post(f"/model/{model_id}/predict", json=rows, headers=headers).status_code == 404
+
+    with open(os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv"), "rb") as f:
+        file_id = client.post("/file/upload-csv/show_column", files={"file": ("drug200.csv", f, "text/csv")},
+                              headers=headers).json()["file_id"]
+    response = client.post(
+        "/file/start-analysis",
+        json={"target_column": "Drug", "file_id": file_id, "type_search": True, "save_file": False},
+        headers=headers
+    )
+    assert response.json()["cached"] is True
+    own_model_id = response.json()["result"]["model_id"]
+    assert own_model_id != model_id
+
+    assert client.post(f"/model/{own_model_id}/predict", json=rows, headers=headers).status_code == 200
+    response = client.post(f"/model/{own_model_id}/predict", json=rows,
+                           headers={"Authorization": f"Bearer {owner_token['access_token']}"})
+    assert response.status_code == 404
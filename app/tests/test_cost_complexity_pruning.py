@@ -0,0 +1,45 @@
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.model_selection import StratifiedKFold
+from sklearn.tree import DecisionTreeClassifier
+
+from services.CostComplexityPruning import TREE_LEAF, candidate_alphas, pruned_accuracy, pruning_thresholds
+
+
+def pruned_leaf_count(tree, thresholds, alpha):
+    """Leaves of the grown tree pruned at alpha: nodes that are leaves at alpha under no pruned ancestor."""
+    count, stack = 0, [0]
+    while stack:
+        node = stack.pop()
+        if thresholds[node] <= alpha:
+            count += 1
+        else:
+            stack += [tree.children_left[node], tree.children_right[node]]
+    return count
+
+
+@pytest.mark.parametrize("params", [{}, {"max_depth": 4}, {"min_samples_leaf": 5}])
+def test_pruning_path_scores_match_trees_refit_with_ccp_alpha(params):
+    X, y = make_classification(n_samples=600, n_features=6, n_informative=4, n_classes=3, flip_y=0.1,
+                               random_state=0)
+
+    for train, test in StratifiedKFold(n_splits=3, shuffle=True, random_state=0).split(X, y):
+        grown = DecisionTreeClassifier(random_state=0, **params).fit(X[train], y[train])
+        thresholds = pruning_thresholds(grown.tree_)
+        alphas = candidate_alphas(thresholds)
+        assert len(alphas) > 3
+
+        scores = pruned_accuracy(grown, X[test], y[test], thresholds, alphas)
+        for alpha, score in zip(alphas, scores):
+            refit = DecisionTreeClassifier(random_state=0, ccp_alpha=alpha, **params).fit(X[train], y[train])
+            assert pruned_leaf_count(grown.tree_, thresholds, alpha) == refit.get_n_leaves()
+            assert score == refit.score(X[test], y[test])
+
+
+def test_leaves_are_leaves_at_every_alpha_and_only_the_root_is_left_past_the_last_step():
+    X, y = make_classification(n_samples=300, n_features=5, random_state=1)
+    tree = DecisionTreeClassifier(random_state=0).fit(X, y).tree_
+    thresholds = pruning_thresholds(tree)
+
+    assert (thresholds[tree.children_left == TREE_LEAF] == 0).all()
+    assert pruned_leaf_count(tree, thresholds, thresholds[0]) == 1
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from services.CsvReader import read_csv
+from services.SchemaProbe import SchemaProbe
+
+
+def test_both_engines_read_the_same_frame_for_the_same_hints(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 300
+    data = pd.DataFrame({
+        "age": rng.integers(15, 75, rows).astype(float),
+        "ratio": rng.random(rows).round(4),
+        "sex": rng.choice(["F", "M"], rows),
+        "insured": rng.choice([True, False], rows),
+        # text the arrow parser would otherwise read as timestamps
+        "visited": pd.date_range("2024-01-01", periods=rows, freq="h").astype(str),
+        "label": rng.choice(["drugA", "drugB"], rows),
+    })
+    data.loc[5, "ratio"] = np.nan
+    data.loc[7, "sex"] = np.nan
+    data.loc[250, "age"] = np.nan
+    path = tmp_path / "data.csv"
+    data.to_csv(path, index=False)
+    hints = SchemaProbe(str(path)).dtype_hints()
+
+    c_frame = read_csv(str(path), engine="c", dtypes=hints)
+    arrow_frame = read_csv(str(path), engine="pyarrow", dtypes=hints)
+
+    pd.testing.assert_frame_equal(arrow_frame, c_frame)
+    assert c_frame["sex"].isna().sum() == 1
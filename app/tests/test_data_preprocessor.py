@@ -0,0 +1,126 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from services.DataPreprocessor import DataPreprocessor, detect_and_drop_id, profile_columns
+from services.ModelPipeline import ModelPipeline
+from services.ModelTrainer import ModelTrainer
+from services.PrintGraph import PrintGraph
+
+DRUG_CSV = os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv")
+
+
+def analyse(sparse_output):
+    data = pd.read_csv(DRUG_CSV)
+    preprocessor = DataPreprocessor(data)
+    X, y, feature_names = preprocessor.prepare_data("Drug", sparse_output=sparse_output)
+    trainer = ModelTrainer(X, y, search_type="grid", feature_names=feature_names, n_jobs=1)
+    full_metrics = trainer.train_model()
+    selected_columns = trainer.find_best_attributes()
+    selected_metrics = trainer.train_model(selected_columns)
+
+    classes = preprocessor.label_encoder.classes_.tolist()
+    dot = PrintGraph(trainer.model, trainer.used_features, classes, all_feature_names=feature_names).to_dot()
+    pipeline = ModelPipeline(trainer.model, numeric_columns=preprocessor.numeric_columns,
+                             categories=preprocessor.categories, used_features=trainer.used_features,
+                             classes=classes, target_column="Drug")
+    return X, (full_metrics, list(selected_columns), selected_metrics, dot,
+               pipeline.predict(data.drop(columns="Drug")))
+
+
+def test_sparse_features_train_the_same_tree_as_dense_ones():
+    X_sparse, sparse_analysis = analyse(sparse_output=True)
+    X_dense, dense_analysis = analyse(sparse_output=False)
+
+    assert sparse.issparse(X_sparse) and X_sparse.format == "csc"
+    assert isinstance(X_dense, pd.DataFrame)
+    assert sparse_analysis == dense_analysis
+
+
+def per_column_id_decisions(table):
+    """The column-by-column id detection profile_columns replaced."""
+    potential_ids = []
+    for col in table.columns:
+        name_match = "id" in col.lower() or "uuid" in col.lower()
+        high_uniqueness = table[col].nunique() / len(table) > 0.8
+        too_many_uniques = table[col].nunique() > 1000
+        likely_id_type = table[col].dtype in ["int64", "object"]
+        if (name_match or high_uniqueness or too_many_uniques) and likely_id_type:
+            potential_ids.append(col)
+    return potential_ids
+
+
+def test_vectorized_id_detection_drops_the_columns_the_per_column_loop_dropped():
+    rng = np.random.default_rng(0)
+    rows = 2000
+    table = pd.DataFrame({
+        "user_id": np.arange(rows),
+        "UUID": [f"u{i:05d}" for i in range(rows)],
+        "paid": rng.random(rows).round(2),
+        "serial": rng.permutation(rows),
+        "Grid": rng.integers(0, 5, rows),
+        "city": rng.permutation([f"c{i % 1100}" for i in range(rows)]),
+        "BP": rng.choice(["HIGH", "LOW"], rows),
+        "Age": rng.integers(15, 75, rows),
+        "Drug": rng.choice(["drugA", "drugB"], rows),
+    })
+
+    dropped = per_column_id_decisions(table)
+    assert set(dropped) == {"user_id", "UUID", "serial", "Grid", "city"}
+    remaining, potential_ids, profile = detect_and_drop_id(table)
+    assert potential_ids == dropped
+    assert remaining.columns.tolist() == [col for col in table.columns if col not in dropped]
+    assert profile.index[profile["categorical"]].tolist() == ["BP", "Drug"]
+
+    # text loaded as categories from a dataset artifact is judged like the object columns
+    as_categories = table.astype({col: "category" for col in ["UUID", "city", "BP", "Drug"]})
+    pd.testing.assert_frame_equal(profile_columns(as_categories)[["n_unique", "categorical", "likely_id"]],
+                                  profile_columns(table)[["n_unique", "categorical", "likely_id"]])
+
+
+def test_compact_features_hold_the_float64_values_in_less_memory():
+    data = pd.read_csv(DRUG_CSV)
+    compact = DataPreprocessor(data.copy())
+    X, y, feature_names = compact.prepare_data("Drug", sparse_output=False)
+    X_wide, y_wide, feature_names_wide = DataPreprocessor(data.copy()).prepare_data("Drug", sparse_output=False,
+                                                                                    compact=False)
+
+    assert (X.dtypes[compact.numeric_columns] == np.float32).all()
+    assert (X.dtypes.drop(compact.numeric_columns) == np.uint8).all()
+    assert (X_wide.dtypes == np.float64).all()
+    pd.testing.assert_index_equal(feature_names, feature_names_wide)
+    pd.testing.assert_series_equal(y, y_wide)
+    # trees compare features as float32, the compact matrix is exactly what they would see
+    np.testing.assert_array_equal(X.to_numpy(dtype=np.float32), X_wide.to_numpy(dtype=np.float32))
+
+    report = compact.memory_report
+    assert report["features_bytes"] == X.memory_usage(index=False).sum()
+    assert report["float64_features_bytes"] == X_wide.memory_usage(index=False).sum()
+    assert report["features_bytes"] < report["float64_features_bytes"] / 2
+    assert report["input_bytes"] == data.memory_usage(deep=True, index=False).sum()
+    assert report["sparse"] is False
+
+
+def test_approximate_profile_finds_the_id_columns_the_exact_profile_finds():
+    rng = np.random.default_rng(0)
+    rows = 20_000
+    table = pd.DataFrame({
+        "user_id": np.arange(rows),
+        "token": [f"t{i}" for i in rng.permutation(rows)],
+        "serial": rng.permutation(rows),
+        "city": rng.permutation([f"c{i % 3000}" for i in range(rows)]),
+        "shop": rng.choice([f"s{i}" for i in range(200)], rows),
+        "BP": rng.choice(["HIGH", "LOW", np.nan], rows),
+        "Age": rng.integers(15, 75, rows),
+        "Drug": rng.choice(["drugA", "drugB"], rows),
+    })
+
+    exact = profile_columns(table)
+    approximate = profile_columns(table, approximate=True)
+
+    pd.testing.assert_series_equal(approximate["likely_id"], exact["likely_id"])
+    assert exact.index[exact["likely_id"]].tolist() == ["user_id", "token", "serial", "city"]
+    # sketch counts stay within a few percent of the exact ones
+    np.testing.assert_allclose(approximate["n_unique"], exact["n_unique"], rtol=0.03)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from services.DatasetArtifact import iter_dataset_chunks, load_artifact
+from services.SchemaProbe import SchemaProbe
+
+
+def test_artifact_reads_back_the_frame_pandas_parses_from_the_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 500
+    data = pd.DataFrame({
+        "Age": rng.integers(15, 75, rows),
+        "Na_to_K": rng.normal(15, 5, rows).round(3),
+        "Insured": rng.choice([True, False], rows),
+        "BP": rng.choice(["HIGH", "LOW", "NORMAL"], rows),
+        "Drug": rng.choice(["drugA", "drugB", "drugX"], rows),
+    })
+    data.loc[[3, 250], "Na_to_K"] = np.nan
+    path = tmp_path / "data.csv"
+    data.to_csv(path, index=False)
+    # missing values written the ways pandas recognises them
+    lines = path.read_text().splitlines()
+    lines[5] = lines[5].replace("HIGH", "NA").replace("LOW", "NA").replace("NORMAL", "NA")
+    lines[6] = lines[6].replace("HIGH", "null").replace("LOW", "null").replace("NORMAL", "null")
+    path.write_text("\n".join(lines) + "\n")
+    artifact_path = tmp_path / "data.arrow"
+
+    probe = SchemaProbe(str(path), str(artifact_path), chunk_rows=128)
+
+    assert probe.artifact_path == str(artifact_path)
+    expected = pd.read_csv(path)
+    assert expected["BP"].isna().sum() == 2
+    artifact = load_artifact(str(artifact_path))
+    assert artifact.dtypes.to_dict() == expected.dtypes.to_dict()
+    # arrow gives missing text as None, pandas as NaN, both read as missing downstream
+    pd.testing.assert_frame_equal(artifact.astype(object).where(artifact.notna(), None),
+                                  expected.astype(object).where(expected.notna(), None))
+    chunks = pd.concat(list(iter_dataset_chunks(str(path), str(artifact_path))), ignore_index=True)
+    pd.testing.assert_frame_equal(chunks, artifact)
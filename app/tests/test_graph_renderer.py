@@ -0,0 +1,61 @@
+import pytest
+
+import services.GraphRenderer as GraphRenderer
+from services.GraphRenderer import GRAPH_RENDER_MAX_TIMEOUTS, GRAPH_RENDER_TIMEOUT, RendererPool, render_dot
+
+
+class HangingRenderer:
+    started = 0
+
+    def __init__(self, format_file):
+        HangingRenderer.started += 1
+
+    def render(self, dot_source):
+        raise TimeoutError("dot did not finish rendering in time")
+
+    def close(self):
+        pass
+
+
+def test_timed_out_renderer_is_replaced_until_timeouts_repeat(monkeypatch):
+    monkeypatch.setattr(GraphRenderer, "DotRenderer", HangingRenderer)
+    monkeypatch.setattr(GraphRenderer, "pipe_dot", lambda dot_source, format_file, timeout: b"piped")
+    monkeypatch.setattr(GraphRenderer, "_pools", {"png": RendererPool("png")})
+    HangingRenderer.started = 0
+
+    for attempt in range(1, GRAPH_RENDER_MAX_TIMEOUTS + 1):
+        assert not GraphRenderer._pools["png"].disabled
+        # a timed-out graph is not rendered a second time by a one-off dot
+        with pytest.raises(TimeoutError):
+            render_dot("digraph {}", "png")
+        assert HangingRenderer.started == attempt
+
+    # repeated timeouts skip the pool for the cooldown instead of waiting on every render
+    assert GraphRenderer._pools["png"].disabled
+    assert render_dot("digraph {}", "png") == b"piped"
+    assert HangingRenderer.started == GRAPH_RENDER_MAX_TIMEOUTS
+
+
+def test_graph_the_pool_cannot_render_gets_what_is_left_of_the_timeout(monkeypatch):
+    class RejectingRenderer(HangingRenderer):
+        def render(self, dot_source):
+            raise ValueError("dot did not write a PNG")
+
+    timeouts = []
+    monkeypatch.setattr(GraphRenderer, "DotRenderer", RejectingRenderer)
+    monkeypatch.setattr(GraphRenderer, "pipe_dot",
+                        lambda dot_source, format_file, timeout: timeouts.append(timeout) or b"piped")
+    monkeypatch.setattr(GraphRenderer, "_pools", {"png": RendererPool("png")})
+
+    assert render_dot("digraph {}", "png") == b"piped"
+    assert 0 < timeouts[0] <= GRAPH_RENDER_TIMEOUT
+
+
+def test_pooled_dot_renders_graphs_one_after_another():
+    pool = RendererPool("svg")
+    try:
+        for _ in range(2):
+            assert pool.render("digraph {\n    a -> b\n}\n").rstrip().endswith(b"</svg>")
+        assert pool.started == 1
+    finally:
+        pool.close()
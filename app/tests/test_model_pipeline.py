@@ -0,0 +1,68 @@
+import io
+import itertools
+import os
+import pickle
+
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from routers.model import PREDICT_ERROR_MARKER, first_chunk, stream_predictions
+from services.CsvReader import read_csv_chunks
+from services.ModelPipeline import ModelPipeline
+from tests.conftest import train_pipeline
+
+DRUG_CSV = os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv")
+
+
+@pytest.fixture
+def drug_pipeline():
+    data = pd.read_csv(DRUG_CSV)
+    return train_pipeline(data, "Drug"), data.drop(columns="Drug")
+
+
+def test_pipeline_pickled_before_compiled_trees_still_predicts(drug_pipeline):
+    pipeline, rows = drug_pipeline
+    old_state = {name: value for name, value in pipeline.__dict__.items()
+                 if name not in ("split_features", "category_texts", "_compiled")}
+    old = ModelPipeline.__new__(ModelPipeline)
+    old.__dict__.update(old_state)
+
+    loaded = pickle.loads(pickle.dumps(old))
+
+    assert loaded.split_features == pipeline.split_features
+    assert loaded.predict(rows) == pipeline.predict(rows)
+    assert loaded.predict_rows(rows.head(20).to_dict(orient="records")) == pipeline.predict(rows.head(20))
+
+
+def test_prediction_stream_ends_with_marker_row_when_a_later_chunk_fails(drug_pipeline):
+    pipeline, rows = drug_pipeline
+    rows = rows.astype({"Na_to_K": object})
+    rows.loc[150, "Na_to_K"] = "not a number"
+    source = io.StringIO(rows.to_csv(index=False))
+
+    chunks = read_csv_chunks(source, 100, dtypes=pipeline.input_dtypes, usecols=pipeline.csv_columns)
+    lines = "".join(stream_predictions(pipeline, source, chunks)).splitlines()
+
+    assert lines[0] == "Drug"
+    assert lines[1:101] == pipeline.predict(rows.head(100))
+    assert lines[-1].startswith(PREDICT_ERROR_MARKER)
+    assert len(lines) == 102
+    assert source.closed
+
+
+def test_root_only_tree_predicts_one_row_per_scored_row():
+    data = pd.read_csv(DRUG_CSV)
+    features = ["Age", "Na_to_K"]
+    codes, classes = pd.factorize(data["Drug"], sort=True)
+    # pruned back to its root, the tree splits on no column
+    model = DecisionTreeClassifier(ccp_alpha=1.0).fit(data[features].to_numpy(), codes)
+    pipeline = ModelPipeline(model, numeric_columns=features, categories={}, used_features=features,
+                             classes=classes.tolist(), target_column="Drug")
+    assert model.tree_.node_count == 1 and pipeline.input_columns == []
+    source = io.BytesIO(data.drop(columns="Drug").head(100).to_csv(index=False).encode())
+
+    first, chunks = first_chunk(pipeline, source)
+    lines = "".join(stream_predictions(pipeline, source, itertools.chain([first], chunks))).splitlines()
+
+    assert lines == ["Drug"] + [data["Drug"].mode()[0]] * 100
@@ -0,0 +1,37 @@
+import os
+from types import SimpleNamespace
+
+from services.DatasetStore import storage_path
+from services.ModelStore import MODEL_DIR, link_model, load_pipeline, save_model
+from tests.conftest import override_get_db
+
+
+def test_analysis_trained_again_stores_the_new_pipeline():
+    db = next(override_get_db())
+    first = save_model(db, SimpleNamespace(target_column="Drug", input_columns=["Age", "Sex"]), 1,
+                       analysis_key="a" * 64)
+    # the cached result expired, training again may give another tree than the stored one
+    again = save_model(db, SimpleNamespace(target_column="Drug", input_columns=["Age"]), 1, analysis_key="a" * 64)
+
+    assert again.id != first.id
+    assert again.storage_path != first.storage_path
+    assert load_pipeline(again).input_columns == ["Age"]
+
+
+def test_cached_model_is_shared_with_another_user():
+    db = next(override_get_db())
+    model = save_model(db, SimpleNamespace(target_column="Drug", input_columns=["Age"]), 1, analysis_key="a" * 64)
+
+    linked = link_model(db, model.id, 2)
+
+    assert linked != model.id
+    assert link_model(db, model.id, 2) == linked
+    assert os.listdir(storage_path(MODEL_DIR)) == [os.path.basename(model.storage_path)]
+
+
+def test_model_with_removed_file_is_not_linked():
+    db = next(override_get_db())
+    model = save_model(db, SimpleNamespace(target_column="Drug", input_columns=["Age"]), 1)
+    os.remove(storage_path(model.storage_path))
+
+    assert link_model(db, model.id, 1) is None
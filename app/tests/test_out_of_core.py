@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.ChunkedPreprocessor import ChunkedPreprocessor
+from services.DatasetArtifact import load_dataset
+from services.DataPreprocessor import DataPreprocessor
+from services.ModelTrainer import take_rows, training_array
+
+DRUG_CSV = os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv")
+
+
+def test_encoded_memmap_is_trained_on_without_a_copy(tmp_path):
+    X, y, feature_names = ChunkedPreprocessor(DRUG_CSV, work_dir=tmp_path, chunk_rows=64).prepare_data("Drug")
+
+    assert isinstance(X, np.memmap)
+    assert X.flags.f_contiguous
+    assert np.shares_memory(training_array(X), X)
+
+    rows = np.array([7, 3, 150, 42])
+    taken = take_rows(X, rows)
+    assert taken.flags.f_contiguous
+    np.testing.assert_array_equal(taken, np.asarray(X)[rows])
+
+
+def test_rows_sampled_from_memmap_over_the_training_budget_stay_column_major(tmp_path):
+    X, y, feature_names = ChunkedPreprocessor(DRUG_CSV, work_dir=tmp_path, chunk_rows=64,
+                                              train_memory_bytes=100 * 16 * 4).prepare_data("Drug")
+
+    assert not isinstance(X, np.memmap)
+    assert X.flags.f_contiguous
+    assert len(X) == len(y) < 200
+
+
+def test_chunked_encoding_matches_in_memory_preprocessor(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 300
+    data = pd.DataFrame({
+        "patient_id": np.arange(rows),
+        "Age": rng.integers(15, 75, rows),
+        "Na_to_K": rng.normal(15, 5, rows).round(3),
+        "BP": rng.choice(["HIGH", "LOW", "NORMAL"], rows),
+        "Cholesterol": rng.choice(["HIGH", "NORMAL"], rows),
+        "Drug": rng.choice(["drugA", "drugB", "drugX"], rows),
+    })
+    # missing categories get their own indicator column, a missing number stays NaN
+    data.loc[rng.choice(rows, 20, replace=False), "BP"] = np.nan
+    data.loc[[3, 250], "Na_to_K"] = np.nan
+    path = tmp_path / "data.csv"
+    data.to_csv(path, index=False)
+
+    in_memory = DataPreprocessor(load_dataset(str(path)))
+    X, y, feature_names = in_memory.prepare_data("Drug")
+    chunked = ChunkedPreprocessor(str(path), work_dir=tmp_path, chunk_rows=64)
+    X_chunked, y_chunked, feature_names_chunked = chunked.prepare_data("Drug")
+
+    assert chunked.dropped_ids == in_memory.dropped_ids == ["patient_id"]
+    assert "BP_nan" in feature_names
+    pd.testing.assert_index_equal(feature_names_chunked, feature_names)
+    np.testing.assert_array_equal(np.asarray(X_chunked), X.to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(y_chunked.to_numpy(), y.to_numpy())
+    assert chunked.label_encoder.classes_.tolist() == in_memory.label_encoder.classes_.tolist()
+    assert chunked.numeric_columns == in_memory.numeric_columns
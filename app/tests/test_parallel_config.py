@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import services.ParallelConfig as ParallelConfig
+from services.ParallelConfig import available_cpus, cgroup_cpu_limit, n_jobs_for, worker_n_jobs
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Points the cgroup files at tmp_path, a file is written by cgroup(name, content)."""
+    for name in ("CGROUP_V2_CPU_MAX", "CGROUP_V1_CPU_QUOTA", "CGROUP_V1_CPU_PERIOD"):
+        monkeypatch.setattr(ParallelConfig, name, str(tmp_path / name))
+    monkeypatch.setattr(ParallelConfig, "SEARCH_N_JOBS", 0)
+    monkeypatch.setattr(ParallelConfig.os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+
+    def write(name, content):
+        (tmp_path / name).write_text(content)
+
+    return write
+
+
+def test_cgroup_v2_quota_limits_the_cpus(cgroup):
+    cgroup("CGROUP_V2_CPU_MAX", "250000 100000\n")
+
+    assert cgroup_cpu_limit() == 2.5
+    assert available_cpus() == 2
+
+
+def test_cgroup_v2_without_quota_falls_back_to_v1(cgroup):
+    cgroup("CGROUP_V2_CPU_MAX", "max 100000\n")
+    assert cgroup_cpu_limit() is None
+
+    cgroup("CGROUP_V1_CPU_QUOTA", "400000\n")
+    cgroup("CGROUP_V1_CPU_PERIOD", "100000\n")
+    assert cgroup_cpu_limit() == 4
+    assert available_cpus() == 4
+
+
+def test_unlimited_cgroup_v1_leaves_the_affinity(cgroup):
+    cgroup("CGROUP_V1_CPU_QUOTA", "-1\n")
+    cgroup("CGROUP_V1_CPU_PERIOD", "100000\n")
+
+    assert cgroup_cpu_limit() is None
+    assert available_cpus() == 16
+
+
+def test_quota_below_one_cpu_still_runs_one_job(cgroup):
+    cgroup("CGROUP_V2_CPU_MAX", "50000 100000\n")
+
+    assert available_cpus() == 1
+    assert worker_n_jobs(concurrency=4) == 1
+
+
+def test_cpus_are_split_between_the_worker_tasks(cgroup):
+    cgroup("CGROUP_V2_CPU_MAX", "800000 100000\n")
+
+    assert worker_n_jobs(concurrency=1) == 8
+    assert worker_n_jobs(concurrency=3) == 2
+    assert worker_n_jobs(concurrency=0) == 8
+
+
+def test_search_n_jobs_overrides_the_split(cgroup, monkeypatch):
+    cgroup("CGROUP_V2_CPU_MAX", "800000 100000\n")
+    monkeypatch.setattr(ParallelConfig, "SEARCH_N_JOBS", 3)
+
+    assert worker_n_jobs(concurrency=4) == 3
+    assert n_jobs_for(np.empty((ParallelConfig.PARALLEL_MIN_CELLS, 1))) == 3
+    # small matrices are searched in one process anyway
+    assert n_jobs_for(np.empty((10, 10))) == 1
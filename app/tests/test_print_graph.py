@@ -0,0 +1,23 @@
+import sys
+
+from sklearn.tree import DecisionTreeClassifier
+
+from benchmarks.recursive_print_graph import RecursivePrintGraph, one_hot_table
+from services.PrintGraph import PrintGraph
+
+
+def test_iterative_dot_matches_recursive_generator_on_categorical_tree():
+    X, y = one_hot_table(400, 6)
+    feature_names = X.columns.tolist()
+    class_names = sorted(set(y))
+    clf = DecisionTreeClassifier(random_state=0).fit(X.to_numpy(), y)
+    assert any(feature_names[i].startswith("city_") for i in clf.tree_.feature if i >= 0)
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 10 * clf.tree_.max_depth))
+    try:
+        expected = RecursivePrintGraph(clf, feature_names, class_names).to_dot()
+    finally:
+        sys.setrecursionlimit(limit)
+
+    assert PrintGraph(clf, feature_names, class_names).to_dot() == expected
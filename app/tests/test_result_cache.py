@@ -0,0 +1,25 @@
+import pytest
+
+from services import ResultCache
+from services.HistogramTree import TreeEngine
+from services.ResultCache import analysis_cache_key
+
+
+@pytest.mark.parametrize("name, value", [
+    ("TREE_ENGINE", TreeEngine.HISTOGRAM),
+    ("SEARCH_TIME_BUDGET", 30.0),
+    ("SUBSAMPLE_MIN_ROWS", 1000),
+    ("SEARCH_SAMPLE_CELLS", 1000),
+    ("WARM_START_BUDGET", 3),
+    ("SPARSE_THRESHOLD_BYTES", 0),
+    ("APPROXIMATE_PROFILE_MIN_ROWS", 0),
+    ("OUT_OF_CORE_THRESHOLD_BYTES", 0),
+    ("TRAIN_MEMORY_BYTES", 1024),
+])
+def test_worker_settings_that_change_the_model_change_the_cache_key(monkeypatch, name, value):
+    params = {"target_column": "Drug", "type_search": "grid", "feature_selection": "backward"}
+    key = analysis_cache_key("a" * 64, **params)
+
+    monkeypatch.setattr(ResultCache, name, value)
+
+    assert analysis_cache_key("a" * 64, **params) != key
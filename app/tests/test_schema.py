@@ -0,0 +1,22 @@
+import sqlalchemy as sa
+
+from scripts.add_dataset_columns import NEW_COLUMNS, add_dataset_columns
+
+
+def test_tables_from_before_datasets_get_the_new_columns(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(sa.text("CREATE TABLE temp_files (id INTEGER PRIMARY KEY, user_id INTEGER, "
+                                   "tmp_path VARCHAR NOT NULL, original_filename VARCHAR NOT NULL, created_at DATETIME)"))
+        connection.execute(sa.text("CREATE TABLE user_files (id INTEGER PRIMARY KEY, user_id INTEGER, "
+                                   "filename VARCHAR NOT NULL, storage_path VARCHAR NOT NULL, size_bytes BIGINT, "
+                                   "expires_at DATETIME, uploaded_at DATETIME)"))
+
+    add_dataset_columns(engine)
+    # a second run finds nothing to add
+    add_dataset_columns(engine)
+
+    inspector = sa.inspect(engine)
+    for table, columns in NEW_COLUMNS.items():
+        assert set(columns) <= {column["name"] for column in inspector.get_columns(table)}
+    assert "datasets" in inspector.get_table_names()
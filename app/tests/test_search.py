@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+import pytest
+from joblib import effective_n_jobs
+from scipy import sparse
+from sklearn.datasets import make_classification
+from sklearn.model_selection import train_test_split
+
+from services.GridSearch import GridSearch
+from services.HalvingSearch import HalvingSearch
+from services.ModelTrainer import take_rows, training_array
+from services.PruningPathSearch import PruningPathSearch
+
+
+def classification_data():
+    return make_classification(n_samples=1500, n_features=8, n_informative=4, n_classes=3, random_state=0)
+
+
+def test_budgeted_halving_runs_every_round_within_a_large_budget():
+    X, y = classification_data()
+    search = HalvingSearch(time_budget=600)
+    search.fit(X, y)
+
+    report = search.get_report()
+    assert report["candidates_evaluated"] == report["candidates_total"] == 60
+    assert report["stopped_early"] is False
+    # 60 candidates, factor 3: 60, 20, 7 and 3 of them are scored on growing samples
+    assert np.bincount(search.get_cv_results()["iter"]).tolist() == [60, 20, 7, 3]
+
+
+def test_budgeted_halving_refits_best_candidate_scored_when_time_runs_out():
+    X, y = classification_data()
+    search = HalvingSearch(time_budget=1e-9)
+    search.fit(X, y)
+
+    report = search.get_report()
+    assert report["stopped_early"] is True
+    assert report["candidates_evaluated"] >= 1
+    assert search.get_best_model().predict(X).shape == y.shape
+
+
+def test_budgeted_search_scores_one_batch_of_candidates_per_round_of_jobs():
+    X, y = classification_data()
+    search = GridSearch(n_jobs=2, time_budget=1e-9)
+    search.fit(X, y)
+
+    assert search.get_report()["candidates_evaluated"] == 2
+
+
+def test_budgeted_pruning_path_search_scores_a_batch_per_core_with_all_cores():
+    X, y = classification_data()
+    search = PruningPathSearch(n_jobs=-1, time_budget=1e-9)
+    search.fit(X, y)
+
+    assert search.get_report()["candidates_evaluated"] == min(effective_n_jobs(-1), 15)
+
+
+def test_search_runs_on_a_fixed_subsample_and_the_model_on_every_training_row(monkeypatch):
+    import services.ModelTrainer
+    from services.ModelTrainer import ModelTrainer
+    monkeypatch.setattr(services.ModelTrainer, "SUBSAMPLE_MIN_ROWS", 200)
+    monkeypatch.setattr(services.ModelTrainer, "SEARCH_SAMPLE_CELLS", 300 * 8)
+    X, y = classification_data()
+
+    trainers = [ModelTrainer(X, y, search_type="pruning", feature_names=[f"x{i}" for i in range(8)], n_jobs=1)
+                for _ in range(2)]
+    for trainer in trainers:
+        trainer.train_model()
+
+    sample = trainers[0].sample_report
+    assert sample["search_rows"] == 300 < sample["training_rows"]
+    assert trainers[1].sample_report == sample
+    assert trainers[0].search.get_best_params() == trainers[1].search.get_best_params()
+    # the chosen configuration is refit on the whole training split
+    assert trainers[0].model.tree_.n_node_samples[0] == sample["training_rows"]
+
+
+def test_histogram_engine_tree_is_applied_to_feature_values():
+    from services.HistogramTree import TreeEngine
+    from services.ModelTrainer import ModelTrainer
+    X, y = classification_data()
+
+    trainer = ModelTrainer(X, y, search_type="pruning", feature_names=[f"x{i}" for i in range(8)], n_jobs=1,
+                           engine=TreeEngine.HISTOGRAM)
+    metrics = trainer.train_model()
+
+    assert trainer.engine is TreeEngine.HISTOGRAM
+    assert metrics["accuracy"] > 0.6
+    # the thresholds were mapped back from bin codes, on raw test rows the model scores as it did on their codes
+    _, test = train_test_split(np.arange(len(y)), test_size=0.3, stratify=y, random_state=0)
+    assert (trainer.model.predict(X[test].astype(np.float32)) == y[test]).mean() == metrics["accuracy"]
+
+
+def test_histogram_tree_splits_missing_from_present_values():
+    import pandas as pd
+    from services.HistogramTree import HistogramDecisionTreeClassifier, TreeEngine
+    from services.ModelPipeline import ModelPipeline
+    from services.ModelTrainer import ModelTrainer
+    from services.PrintGraph import PrintGraph
+    X, y = classification_data()
+    # a missing first feature alone gives away class 2
+    X[y == 2, 0] = np.nan
+    names = [f"x{i}" for i in range(8)]
+
+    tree = HistogramDecisionTreeClassifier(max_depth=2).fit(X, y)
+    assert tree.tree_.threshold[0] == np.inf
+    assert (tree.predict(X[y == 2]) == 2).all()
+
+    trainer = ModelTrainer(X, y, search_type="pruning", feature_names=names, n_jobs=1, engine=TreeEngine.HISTOGRAM)
+    trainer.train_model()
+    assert np.isinf(trainer.model.tree_.threshold).any()
+
+    pipeline = ModelPipeline(trainer.model, numeric_columns=names, categories={}, used_features=names,
+                             classes=[0, 1, 2], target_column="y")
+    rows = pd.DataFrame(X, columns=names)
+    expected = trainer.model.predict(X.astype(np.float32)).tolist()
+    assert pipeline.predict(rows) == expected
+    assert [pipeline.compiled.predict_row(row) for row in rows.to_dict(orient="records")] == expected
+    assert "≤ inf" in PrintGraph(trainer.model, names, ["0", "1", "2"]).to_dot()
+
+
+def test_neighbourhood_steps_integers_by_one_and_floats_by_two():
+    from services.NeighbourhoodSearch import neighbourhood
+    candidates = neighbourhood({"max_depth": 4, "min_samples_leaf": 1, "ccp_alpha": 0.01, "max_features": None},
+                               budget=100)
+
+    assert candidates[0] == {"max_depth": 4, "min_samples_leaf": 1, "ccp_alpha": 0.01, "max_features": None}
+    assert sorted({c["max_depth"] for c in candidates}) == [3, 4, 5]
+    # integer params stay at least 1, None has no neighbours
+    assert sorted({c["min_samples_leaf"] for c in candidates}) == [1, 2]
+    assert sorted({c["ccp_alpha"] for c in candidates}) == [0.005, 0.01, 0.02]
+    assert {c["max_features"] for c in candidates} == {None}
+    assert len(candidates) == 3 * 2 * 3
+    # closest first: one param moved by one step before two
+    assert all(sum(c[name] != candidates[0][name] for name in c) == 1 for c in candidates[1:5])
+
+
+def test_neighbourhood_skips_neighbours_the_earlier_search_scored_clearly_worse():
+    from services.NeighbourhoodSearch import neighbourhood
+    best = {"max_depth": 4, "ccp_alpha": 0.01}
+    cv_results = {
+        "params": [best, {"max_depth": 5, "ccp_alpha": 0.01}, {"max_depth": 3, "ccp_alpha": 0.01},
+                   {"max_depth": 4, "ccp_alpha": 0.02}, {"max_depth": 4, "ccp_alpha": 0.005},
+                   {"max_depth": 4, "ccp_alpha": 0.02}],
+        "mean_test_score": [0.9, 0.89, 0.85, 0.5, 0.8, 0.9],
+        "std_test_score": [0.02, 0.01, 0.01, 0.01, 0.01, 0.01],
+        # halving: only the scores of the last round count, ccp_alpha 0.02 was scored low on a small sample
+        "iter": [1, 1, 1, 0, 1, 1],
+    }
+
+    candidates = neighbourhood(best, cv_results, budget=100)
+
+    assert {"max_depth": 5, "ccp_alpha": 0.01} in candidates
+    assert {"max_depth": 4, "ccp_alpha": 0.02} in candidates
+    # below the best's mean minus its standard deviation
+    assert {"max_depth": 3, "ccp_alpha": 0.01} not in candidates
+    assert {"max_depth": 4, "ccp_alpha": 0.005} not in candidates
+    # never scored
+    assert {"max_depth": 3, "ccp_alpha": 0.005} in candidates
+    assert len(candidates) == 9 - 2
+
+    # the budget keeps the closest candidates
+    assert neighbourhood(best, cv_results, budget=3) == [best, {"max_depth": 5, "ccp_alpha": 0.01},
+                                                         {"max_depth": 4, "ccp_alpha": 0.02}]
+
+
+def feature_matrices():
+    X, _ = classification_data()
+    # compact features: float32 numbers next to uint8 indicators
+    frame = pd.concat([pd.DataFrame(X[:, :4].astype(np.float32)),
+                       pd.DataFrame((X[:, 4:] > 0).astype(np.uint8), columns=range(4, 8))], axis=1)
+    return {
+        "dense": X,
+        "frame": frame,
+        "csc": sparse.csc_matrix(np.where(X > 1, X, 0)),
+        "bins": np.clip(X * 10 + 128, 0, 255).astype(np.uint8),
+    }
+
+
+@pytest.mark.parametrize("kind", ["dense", "frame", "csc", "bins"])
+def test_rows_are_gathered_in_the_layout_trees_read(kind):
+    X = feature_matrices()[kind]
+    rows = np.random.default_rng(0).permutation(X.shape[0])[:300]
+    # the row-major gather the shared training matrix replaced
+    expected = (X.toarray() if sparse.issparse(X) else np.asarray(X))[rows]
+
+    array = training_array(X)
+    taken = take_rows(array, rows)
+
+    if kind == "csc":
+        assert array.format == taken.format == "csc"
+        assert array.dtype == taken.dtype == np.float32
+        taken = taken.toarray()
+    elif kind == "bins":
+        assert array.dtype == taken.dtype == np.uint8
+        assert array.flags.c_contiguous and taken.flags.c_contiguous
+    else:
+        assert array.dtype == taken.dtype == np.float32
+        assert array.flags.f_contiguous and taken.flags.f_contiguous
+    np.testing.assert_array_equal(taken, expected.astype(taken.dtype))
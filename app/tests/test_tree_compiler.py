@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.tree import DecisionTreeClassifier
+
+from services.ModelPipeline import ModelPipeline
+from services.TreeCompiler import MAX_GENERATED_DEPTH
+from tests.conftest import train_pipeline
+
+DRUG_CSV = os.path.join(os.path.dirname(__file__), "..", "csvFile", "drug200.csv")
+
+
+def assert_compiled_matches(pipeline, rows):
+    expected = pipeline.predict(rows)
+    records = rows.to_dict(orient="records")
+    assert [pipeline.compiled.predict_row(row) for row in records] == expected
+    assert pipeline.compiled.predict(rows) == expected
+
+
+def test_compiled_tree_matches_pipeline_on_drug200():
+    data = pd.read_csv(DRUG_CSV)
+    pipeline = train_pipeline(data, "Drug")
+
+    assert_compiled_matches(pipeline, data.drop(columns="Drug"))
+
+
+def test_compiled_tree_matches_pipeline_on_missing_and_unseen_values():
+    data = pd.read_csv(DRUG_CSV)
+    # a missing blood pressure singles out drugC, so the tree splits on the missing-value category
+    data.loc[data["Drug"] == "drugC", "BP"] = np.nan
+    data.loc[::7, "Na_to_K"] = np.nan
+    pipeline = train_pipeline(data, "Drug")
+    bp_nan = pipeline.used_features.index("BP_nan")
+    assert bp_nan in pipeline.split_features
+
+    rows = data.drop(columns="Drug")
+    unseen = rows.head(20).astype(object)
+    unseen["BP"] = ["EXTREME", None] * 10
+    unseen["Cholesterol"] = "VERY HIGH"
+    unseen.loc[unseen.index[::3], "Na_to_K"] = None
+    assert_compiled_matches(pipeline, pd.concat([rows, unseen], ignore_index=True))
+
+
+def test_tree_deeper_than_generated_code_is_walked():
+    # alternating labels along one feature grow a chain of splits, one row peeled off per level
+    x = np.arange(200, dtype=np.float64)
+    model = DecisionTreeClassifier(random_state=0).fit(x.reshape(-1, 1), np.arange(200) % 2)
+    assert model.get_depth() > MAX_GENERATED_DEPTH
+    pipeline = ModelPipeline(model, numeric_columns=["x"], categories={}, used_features=["x"], classes=["even", "odd"],
+                             target_column="parity")
+
+    assert pipeline.compiled.predict_row == pipeline.compiled._walk_row
+    assert_compiled_matches(pipeline, pd.DataFrame({"x": np.concatenate([x, x + 0.5, [-1.0, 250.0, np.nan]])}))
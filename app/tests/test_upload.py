@@ -0,0 +1,52 @@
+import asyncio
+import os
+
+import pytest
+from starlette.requests import Request
+
+from utils.upload import UploadTooLargeError, spool_upload
+
+BOUNDARY = "upload-boundary"
+
+
+def multipart_chunks(content, chunk_size=64):
+    head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="data.csv"\r\n'
+            f"Content-Type: text/csv\r\n\r\n").encode()
+    body = head + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return [body[start:start + chunk_size] for start in range(0, len(body), chunk_size)]
+
+
+def streamed_request(chunks):
+    """A request without Content-Length whose body arrives chunk by chunk, received counts the chunks read."""
+    received = []
+
+    async def receive():
+        received.append(chunks[len(received)])
+        return {"type": "http.request", "body": received[-1], "more_body": len(received) < len(chunks)}
+
+    scope = {"type": "http", "method": "POST", "path": "/", "query_string": b"",
+             "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]}
+    return Request(scope, receive), received
+
+
+def test_upload_is_spooled_while_it_arrives(tmp_path):
+    content = b"a,b\n" + b"1,2\n" * 100
+    request, _ = streamed_request(multipart_chunks(content))
+
+    upload = asyncio.run(spool_upload(request, "file", 10_000, directory=tmp_path))
+
+    with open(upload.path, "rb") as f:
+        assert f.read() == content
+    assert upload.size == len(content)
+    assert (upload.filename, upload.content_type) == ("data.csv", "text/csv")
+
+
+def test_oversized_upload_is_rejected_before_the_rest_arrives(tmp_path):
+    chunks = multipart_chunks(b"1,2\n" * 1000)
+    request, received = streamed_request(chunks)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(request, "file", 100, directory=tmp_path))
+
+    assert len(received) < len(chunks) // 10
+    assert os.listdir(tmp_path) == []
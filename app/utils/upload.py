@@ -0,0 +1,126 @@
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple
+
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class SpooledUpload(NamedTuple):
+    path: str
+    size: int
+    content_hash: str
+    filename: str
+    content_type: str
+
+
+def max_upload_size() -> int:
+    return int(os.getenv("MAX_UPLOAD_SIZE"))
+
+
+def content_length_exceeded(content_length: str | None, max_size: int) -> bool:
+    if content_length is None or not content_length.isdigit():
+        return False
+    return int(content_length) > max_size + MULTIPART_OVERHEAD
+
+
+class FieldSpooler:
+    """MultipartParser callbacks that write one file field to a temp file as its bytes are parsed."""
+
+    def __init__(self, field_name: str, max_size: int, directory: str | None = None):
+        self.field_name = field_name.encode()
+        self.max_size = max_size
+        self.directory = directory
+        self.headers = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.file = None
+        self.writing = False
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.filename = ""
+        self.content_type = ""
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data, start, end):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        # a repeated field is ignored, like a form keeps its first value
+        self.writing = self.file is None and options.get(b"name") == self.field_name
+        if self.writing:
+            self.filename = options.get(b"filename", b"").decode("utf-8", errors="replace")
+            self.content_type = self.headers.get(b"content-type", b"").decode("latin-1")
+            self.file = tempfile.NamedTemporaryFile(mode="wb", suffix=".csv", delete=False, dir=self.directory)
+
+    def on_part_data(self, data, start, end):
+        if not self.writing:
+            return
+        self.size += end - start
+        if self.size > self.max_size:
+            raise UploadTooLargeError("File too large")
+        chunk = data[start:end]
+        self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def on_part_end(self):
+        self.writing = False
+
+    def result(self):
+        return SpooledUpload(self.file.name, self.size, self.digest.hexdigest(), self.filename, self.content_type)
+
+
+async def spool_upload(request: Request, field_name: str, max_size: int, directory: str | None = None):
+    """Copy a file field of the multipart body to a temp file, counting and hashing bytes as they arrive.
+
+    The body is parsed from the request stream, so an upload over max_size is rejected at the chunk that
+    passes it, before the rest is received. None when the request has no such field.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        return None
+
+    spooler = FieldSpooler(field_name, max_size, directory)
+    parser = MultipartParser(options[b"boundary"], spooler.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except BaseException:
+        if spooler.file is not None:
+            spooler.file.close()
+            os.remove(spooler.file.name)
+        raise
+
+    if spooler.file is None:
+        return None
+    spooler.file.close()
+    return spooler.result()
@@ -34,7 +34,7 @@ func CleanExpiredFile(db *sql.DB) error {
 		return err
 	}
 
-	rows, err := tx.Query("SELECT id, storage_path from user_files WHERE expires_at < NOW() OR user_id IS NULL")
+	rows, err := tx.Query("SELECT id, storage_path, dataset_id IS NOT NULL from user_files WHERE expires_at < NOW() OR user_id IS NULL")
 	if err != nil {
 		tx.Rollback()
 		return err
@@ -42,18 +42,30 @@ func CleanExpiredFile(db *sql.DB) error {
 	defer rows.Close()
 	var fileIDs []int
 	var paths []string
+	var shared []bool
 
 	for rows.Next() {
 		var id int
 		var storagePath string
-		if err := rows.Scan(&id, &storagePath); err != nil {
+		var isDataset bool
+		if err := rows.Scan(&id, &storagePath, &isDataset); err != nil {
 			tx.Rollback()
 			return err
 		}
 		fileIDs = append(fileIDs, id)
 		paths = append(paths, storagePath)
+		shared = append(shared, isDataset)
 	}
 	for i, relativePath := range paths {
+		if shared[i] {
+			// dataset files are shared between users, CleanUnusedDatasets removes them
+			if _, err := tx.Exec("DELETE FROM user_files WHERE id = $1", fileIDs[i]); err != nil {
+				tx.Rollback()
+				return err
+			}
+			continue
+		}
+
 		relativePath = strings.ReplaceAll(relativePath, `\`, `/`)
 		path := filepath.Join(os.Getenv("StorageDirectory"), relativePath)
 
@@ -105,6 +117,119 @@ func CleanTempFiles(db *sql.DB) error {
 	return nil
 }
 
+func CleanUnusedDatasets(db *sql.DB) error {
+	// the conditions are checked by the DELETE itself, an upload reusing a dataset in the meantime
+	// updates last_used_at first and keeps the row, only files of rows actually deleted are removed
+	tx, err := db.Begin()
+	if err != nil {
+		return err
+	}
+	rows, err := tx.Query("DELETE FROM datasets d " +
+		"WHERE last_used_at < NOW() - INTERVAL '1 hour' " +
+		"AND NOT EXISTS (SELECT 1 FROM temp_files t WHERE t.dataset_id = d.id) " +
+		"AND NOT EXISTS (SELECT 1 FROM user_files f WHERE f.dataset_id = d.id) " +
+		"RETURNING storage_path, COALESCE(artifact_path, '')")
+	if err != nil {
+		tx.Rollback()
+		return err
+	}
+
+	var paths []string
+	for rows.Next() {
+		var storagePath, artifactPath string
+		if err := rows.Scan(&storagePath, &artifactPath); err != nil {
+			rows.Close()
+			tx.Rollback()
+			return err
+		}
+		paths = append(paths, storagePath, artifactPath)
+	}
+	if err := rows.Err(); err != nil {
+		rows.Close()
+		tx.Rollback()
+		return err
+	}
+	rows.Close()
+	if err := tx.Commit(); err != nil {
+		return err
+	}
+
+	removeErr := removeStoredFiles(paths, "dataset")
+	fmt.Println("Removed unused datasets:", len(paths)/2)
+	return removeErr
+}
+
+func CleanUnusedModels(db *sql.DB) error {
+	// users of a cached analysis share its model file, the file goes with the last row that uses it
+	tx, err := db.Begin()
+	if err != nil {
+		return err
+	}
+	rows, err := tx.Query("DELETE FROM trained_models " +
+		"WHERE user_id IS NULL OR last_used_at < NOW() - INTERVAL '30 day' " +
+		"RETURNING storage_path")
+	if err != nil {
+		tx.Rollback()
+		return err
+	}
+
+	var deleted []string
+	for rows.Next() {
+		var storagePath string
+		if err := rows.Scan(&storagePath); err != nil {
+			rows.Close()
+			tx.Rollback()
+			return err
+		}
+		deleted = append(deleted, storagePath)
+	}
+	if err := rows.Err(); err != nil {
+		rows.Close()
+		tx.Rollback()
+		return err
+	}
+	rows.Close()
+
+	var paths []string
+	seen := make(map[string]bool)
+	for _, storagePath := range deleted {
+		if seen[storagePath] {
+			continue
+		}
+		seen[storagePath] = true
+		var shared bool
+		if err := tx.QueryRow("SELECT EXISTS (SELECT 1 FROM trained_models WHERE storage_path = $1)", storagePath).Scan(&shared); err != nil {
+			tx.Rollback()
+			return err
+		}
+		if !shared {
+			paths = append(paths, storagePath)
+		}
+	}
+	if err := tx.Commit(); err != nil {
+		return err
+	}
+
+	removeErr := removeStoredFiles(paths, "model")
+	fmt.Println("Removed unused models:", len(deleted))
+	return removeErr
+}
+
+func removeStoredFiles(paths []string, kind string) error {
+	var removeErr error
+	for _, relativePath := range paths {
+		if relativePath == "" {
+			continue
+		}
+		relativePath = strings.ReplaceAll(relativePath, `\`, `/`)
+		path := filepath.Join(os.Getenv("StorageDirectory"), relativePath)
+		if err := os.Remove(path); err != nil && !os.IsNotExist(err) && removeErr == nil {
+			removeErr = fmt.Errorf("error removing %s file %s: %w", kind, path, err)
+		}
+	}
+	return removeErr
+}
+
 func RunCleanup(db *sql.DB) error {
 	if err := CleanExpiredFile(db); err != nil {
 
@@ -122,6 +247,12 @@ func RunCleanup(db *sql.DB) error {
 	if err := CleanTempFiles(db); err != nil {
 		return fmt.Errorf("error cleaning up temp files: %v", err)
 	}
+	if err := CleanUnusedDatasets(db); err != nil {
+		return fmt.Errorf("error cleaning up unused datasets: %v", err)
+	}
+	if err := CleanUnusedModels(db); err != nil {
+		return fmt.Errorf("error cleaning up unused models: %v", err)
+	}
 	fmt.Println("Cleaned complete")
 	return nil
 }
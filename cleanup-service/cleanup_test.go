@@ -76,7 +76,7 @@ func TestCleanInactiveUsers(t *testing.T) {
 }
 
 func TestCleanExpiredFile(t *testing.T) {
-	db := setupTempTable(t, "user_files", "id SERIAL PRIMARY KEY,storage_path TEXT,  expires_at TIMESTAMP, user_id INTEGER")
+	db := setupTempTable(t, "user_files", "id SERIAL PRIMARY KEY,storage_path TEXT,  expires_at TIMESTAMP, user_id INTEGER, dataset_id INTEGER")
 	tempDir := t.TempDir()
 	err := os.Setenv("StorageDirectory", tempDir)
 	if err != nil {
@@ -148,12 +148,14 @@ func TestRunCleanup(t *testing.T) {
 	}(db)
 
 	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS users (id SERIAL PRIMARY KEY, last_login TIMESTAMP)")
-	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS user_files (id SERIAL PRIMARY KEY, storage_path TEXT, expires_at TIMESTAMP, user_id INTEGER)")
+	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS user_files (id SERIAL PRIMARY KEY, storage_path TEXT, expires_at TIMESTAMP, user_id INTEGER, dataset_id INTEGER)")
 	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS blacklist_tokens (id SERIAL PRIMARY KEY, expires_at TIMESTAMP)")
 	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS refresh_tokens (id SERIAL PRIMARY KEY, expires_at TIMESTAMP, user_id INTEGER)")
-	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS temp_files (id SERIAL PRIMARY KEY, created_at timestamptz, user_id INTEGER)")
+	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS temp_files (id SERIAL PRIMARY KEY, created_at timestamptz, user_id INTEGER, dataset_id INTEGER)")
+	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS datasets (id SERIAL PRIMARY KEY, storage_path TEXT, artifact_path TEXT, last_used_at timestamptz)")
+	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS trained_models (id SERIAL PRIMARY KEY, storage_path TEXT, user_id INTEGER, last_used_at timestamptz)")
 
-	_, _ = db.Exec("TRUNCATE users, user_files, blacklist_tokens, refresh_tokens, temp_files")
+	_, _ = db.Exec("TRUNCATE users, user_files, blacklist_tokens, refresh_tokens, temp_files, datasets, trained_models")
 
 	tempDir := t.TempDir()
 	err = os.Setenv("StorageDirectory", tempDir)
@@ -265,7 +267,7 @@ func TestIsEmpty(t *testing.T) {
 }
 
 func TestCleanExpiredFile_MissingFile(t *testing.T) {
-	db := setupTempTable(t, "user_files", "id SERIAL PRIMARY KEY, storage_path TEXT, expires_at TIMESTAMP, user_id INTEGER")
+	db := setupTempTable(t, "user_files", "id SERIAL PRIMARY KEY, storage_path TEXT, expires_at TIMESTAMP, user_id INTEGER, dataset_id INTEGER")
 	defer func(db *sql.DB) {
 		err := db.Close()
 		if err != nil {
@@ -311,3 +313,97 @@ func TestCleanTempFiles(t *testing.T) {
 		t.Errorf("expected 1 files, got %d", fileCount)
 	}
 }
+
+func TestCleanUnusedDatasets(t *testing.T) {
+	db := setupTempTable(t, "datasets", "id SERIAL PRIMARY KEY, storage_path TEXT, artifact_path TEXT, last_used_at TIMESTAMP")
+	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS temp_files (id SERIAL PRIMARY KEY, created_at TIMESTAMP, user_id INTEGER, dataset_id INTEGER)")
+	_, _ = db.Exec("CREATE TEMP TABLE IF NOT EXISTS user_files (id SERIAL PRIMARY KEY, storage_path TEXT, expires_at TIMESTAMP, user_id INTEGER, dataset_id INTEGER)")
+	_, _ = db.Exec("TRUNCATE temp_files, user_files")
+
+	tempDir := t.TempDir()
+	err := os.Setenv("StorageDirectory", tempDir)
+	if err != nil {
+		t.Errorf("error setting StorageDirectory: %v", err)
+	}
+	for _, name := range []string{"unused.csv", "unused.arrow", "used.csv", "recent.csv"} {
+		if err := os.WriteFile(filepath.Join(tempDir, name), []byte(name), 0644); err != nil {
+			t.Errorf("error writing dataset file: %v", err)
+		}
+	}
+
+	_, _ = db.Exec("INSERT INTO datasets (id, storage_path, artifact_path, last_used_at) VALUES (1, 'unused.csv', 'unused.arrow', NOW() - INTERVAL '2 hour')")
+	_, _ = db.Exec("INSERT INTO datasets (id, storage_path, artifact_path, last_used_at) VALUES (2, 'used.csv', NULL, NOW() - INTERVAL '2 hour')")
+	_, _ = db.Exec("INSERT INTO user_files (storage_path, expires_at, user_id, dataset_id) VALUES ('used.csv', NOW() + INTERVAL '1 day', 123, 2)")
+	// reused by an upload since the last run
+	_, _ = db.Exec("INSERT INTO datasets (id, storage_path, artifact_path, last_used_at) VALUES (3, 'recent.csv', NULL, NOW())")
+
+	err = CleanUnusedDatasets(db)
+	if err != nil {
+		t.Fatalf("unexpected error: %v", err)
+	}
+
+	var count int
+	row := db.QueryRow("SELECT COUNT(*) FROM datasets")
+	err = row.Scan(&count)
+	if err != nil {
+		t.Errorf("unexpected error: %v", err)
+	}
+	if count != 2 {
+		t.Errorf("expected 2 datasets remaining, got %d", count)
+	}
+	if _, err := os.Stat(filepath.Join(tempDir, "unused.csv")); !os.IsNotExist(err) {
+		t.Errorf("expected unused dataset file to be deleted")
+	}
+	if _, err := os.Stat(filepath.Join(tempDir, "unused.arrow")); !os.IsNotExist(err) {
+		t.Errorf("expected unused dataset artifact to be deleted")
+	}
+	for _, name := range []string{"used.csv", "recent.csv"} {
+		if _, err := os.Stat(filepath.Join(tempDir, name)); err != nil {
+			t.Errorf("expected dataset file %s to be kept", name)
+		}
+	}
+}
+
+func TestCleanUnusedModels(t *testing.T) {
+	db := setupTempTable(t, "trained_models", "id SERIAL PRIMARY KEY, storage_path TEXT, user_id INTEGER, last_used_at TIMESTAMP")
+
+	tempDir := t.TempDir()
+	err := os.Setenv("StorageDirectory", tempDir)
+	if err != nil {
+		t.Errorf("error setting StorageDirectory: %v", err)
+	}
+	for _, name := range []string{"unused.joblib", "shared.joblib", "recent.joblib"} {
+		if err := os.WriteFile(filepath.Join(tempDir, name), []byte(name), 0644); err != nil {
+			t.Errorf("error writing model file: %v", err)
+		}
+	}
+
+	_, _ = db.Exec("INSERT INTO trained_models (storage_path, user_id, last_used_at) VALUES ('unused.joblib', 1, NOW() - INTERVAL '31 day')")
+	// the owner no longer uses the model, another user of the cached analysis still does
+	_, _ = db.Exec("INSERT INTO trained_models (storage_path, user_id, last_used_at) VALUES ('shared.joblib', 1, NOW() - INTERVAL '31 day')")
+	_, _ = db.Exec("INSERT INTO trained_models (storage_path, user_id, last_used_at) VALUES ('shared.joblib', 2, NOW())")
+	_, _ = db.Exec("INSERT INTO trained_models (storage_path, user_id, last_used_at) VALUES ('recent.joblib', NULL, NOW())")
+
+	err = CleanUnusedModels(db)
+	if err != nil {
+		t.Fatalf("unexpected error: %v", err)
+	}
+
+	var count int
+	row := db.QueryRow("SELECT COUNT(*) FROM trained_models")
+	err = row.Scan(&count)
+	if err != nil {
+		t.Errorf("unexpected error: %v", err)
+	}
+	if count != 1 {
+		t.Errorf("expected 1 model remaining, got %d", count)
+	}
+	for _, name := range []string{"unused.joblib", "recent.joblib"} {
+		if _, err := os.Stat(filepath.Join(tempDir, name)); !os.IsNotExist(err) {
+			t.Errorf("expected model file %s to be deleted", name)
+		}
+	}
+	if _, err := os.Stat(filepath.Join(tempDir, "shared.joblib")); err != nil {
+		t.Errorf("expected shared model file to be kept")
+	}
+}